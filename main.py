@@ -1,59 +1,70 @@
 import argparse
+from datetime import datetime
 from dotenv import load_dotenv
 import json
 from guppy import hpy
 import os
+import sys
 from wikibaseintegrator.wbi_config import config as wbi_config
+from repository.catalog_snapshot import CatalogSnapshot
 from repository.data_repository import DataRepository
-from usecase.download_dataset_as_zip import download_dataset_as_zip_for_cron_job
-from usecase.process_agencies_count_for_gtfs_metadata import (
-    process_agencies_count_for_gtfs_metadata,
+from repository.dataset_store import DatasetStore, DEFAULT_MAX_STORE_SIZE
+from repository.download_report import DownloadReport
+from repository.entity_export import EntityExport
+from repository.dataset_version_history import DatasetVersionHistory
+from repository.http_validator_cache import HttpValidatorCache
+from usecase.download_dataset_as_zip import (
+    download_dataset_as_zip_for_cron_job,
+    count_download_hosts,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_MAX_WORKERS_PER_HOST,
+)
+from utilities.download_utils import (
+    DownloadSession,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_HEDGE_DELAY,
+    DEFAULT_MAX_DOWNLOAD_SIZE,
 )
 from usecase.extract_datasets_infos_from_database import (
     extract_gtfs_datasets_infos_from_database,
+    extract_sha1_index_from_database,
 )
 from usecase.load_dataset import load_dataset
-from usecase.process_timezones_for_gtfs_metadata import (
-    process_timezones_for_gtfs_metadata,
-)
-from usecase.process_geopraphical_boundaries_for_gtfs_metadata import (
-    process_bounding_box_for_gtfs_metadata,
-    process_bounding_octagon_for_gtfs_metadata,
+from usecase.process_content_hash import (
+    process_content_hash,
+    add_datasets_to_version_history,
 )
-from usecase.process_main_language_code_for_gtfs_metadata import (
-    process_main_language_code_for_gtfs_metadata,
+from usecase.process_gtfs_metadata import (
+    process_gtfs_metadata,
+    get_processed_metadata,
 )
 from usecase.process_sha1 import process_sha1
-from usecase.process_routes_count_by_type_for_gtfs_metadata import (
-    process_routes_count_by_type_for_gtfs_metadata,
-)
-from usecase.process_service_date_for_gtfs_metadata import (
-    process_start_service_date_for_gtfs_metadata,
-    process_end_service_date_for_gtfs_metadata,
-)
-from usecase.process_stops_count_by_type_for_gtfs_metadata import (
-    process_stops_count_by_type_for_gtfs_metadata,
-)
-from usecase.process_timestamp_for_gtfs_metadata import (
-    process_start_timestamp_for_gtfs_metadata,
-    process_end_timestamp_for_gtfs_metadata,
-)
 from usecase.create_dataset_entity_for_gtfs_metadata import (
     create_dataset_entity_for_gtfs_metadata,
 )
-from usecase.process_country_codes_for_gtfs_metadata import (
-    process_country_codes_for_gtfs_metadata,
-)
+from usecase.replay_entity_export import replay_entity_export
 from utilities.constants import (
+    DEFAULT_MAX_HASHING_WORKERS,
     API_URL,
     SPARQL_BIGDATA_URL,
     SVC_URL,
     USERNAME,
     PASSWORD,
 )
+from utilities.wikibase_write_session import WikibaseWriteSession
+from utilities.wikibase_write_queue import (
+    WikibaseWriteQueue,
+    DEFAULT_MAX_QUEUE_SIZE,
+    DEFAULT_MAX_WRITERS,
+)
+from utilities.wikibase_read_client import (
+    WikibaseReadClient,
+    DEFAULT_MAX_CONCURRENCY,
+)
 from utilities.validators import validate_api_url, validate_sparql_bigdata_url
 
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="MobilityDatabase Interface Script")
     parser.add_argument(
@@ -67,7 +78,8 @@ if __name__ == "__main__":
         "--path-to-tmp-data",
         action="store",
         default="./data/tmp/",
-        help="Path to the folder where to temporary store downloaded datasets for processing.",
+        help="Path to the folder where to temporary store downloaded datasets for processing, "
+        "and the partial downloads to resume.",
     )
     parser.add_argument(
         "--path-to-env-var",
@@ -81,7 +93,147 @@ if __name__ == "__main__":
         default="./staging_credentials.json",
         help="Path to the credentials.",
     )
+    parser.add_argument(
+        "--max-download-workers",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Maximum number of datasets downloaded concurrently.",
+    )
+    parser.add_argument(
+        "--max-download-workers-per-host",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_WORKERS_PER_HOST,
+        help="Maximum number of datasets downloaded concurrently from the same host.",
+    )
+    parser.add_argument(
+        "--download-connect-timeout",
+        action="store",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help="Number of seconds to wait for a connection to a dataset server.",
+    )
+    parser.add_argument(
+        "--download-read-timeout",
+        action="store",
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help="Number of seconds to wait for a dataset server between two bytes.",
+    )
+    parser.add_argument(
+        "--download-max-retries",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help="Maximum number of retries of a download failing with a server or connection error.",
+    )
+    parser.add_argument(
+        "--max-download-size",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_DOWNLOAD_SIZE,
+        help="Maximum size of a downloaded dataset in bytes, larger datasets are discarded.",
+    )
+    parser.add_argument(
+        "--download-hedge-delay",
+        action="store",
+        type=float,
+        default=DEFAULT_HEDGE_DELAY,
+        help="Number of seconds to wait for a dataset server before downloading the dataset from its mirror URL.",
+    )
+    parser.add_argument(
+        "--path-to-catalog-snapshot",
+        action="store",
+        default="./data/cache/catalog.sqlite",
+        help="Path to the SQLite file where to keep the snapshot of the catalog of sources, "
+        "refreshed with the items changed since the last run.",
+    )
+    parser.add_argument(
+        "--max-read-concurrency",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Maximum number of concurrent read requests to the Wikibase instance.",
+    )
+    parser.add_argument(
+        "--max-write-workers",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_WRITERS,
+        help="Number of background writers of the dataset versions to the Wikibase instance.",
+    )
+    parser.add_argument(
+        "--write-queue-size",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_QUEUE_SIZE,
+        help="Maximum number of processed datasets waiting to be written, "
+        "the processing waits for the writers beyond it.",
+    )
+    parser.add_argument(
+        "--write-maxlag",
+        action="store",
+        type=int,
+        default=None,
+        help="Maximum replication lag of the Wikibase instance in seconds, "
+        "above which the writes wait for it to catch up.",
+    )
+    parser.add_argument(
+        "--path-to-entity-export",
+        action="store",
+        default=None,
+        help="Path to a newline-delimited JSON file where to export the new dataset versions "
+        "instead of writing them to the Wikibase instance.",
+    )
+    parser.add_argument(
+        "--replay-entity-export",
+        action="store_true",
+        help="Write the dataset versions of the entity export to the Wikibase instance "
+        "instead of processing the datasets, keeping only the ones which could not be written in the export.",
+    )
+    parser.add_argument(
+        "--path-to-http-validator-cache",
+        action="store",
+        default="./data/cache/http_validators.json",
+        help="Path to the file where to keep the HTTP validators of the downloaded datasets.",
+    )
+    parser.add_argument(
+        "--path-to-dataset-store",
+        action="store",
+        default="./data/store",
+        help="Path to the folder where to keep the downloaded datasets by SHA-1 hash.",
+    )
+    parser.add_argument(
+        "--dataset-store-max-size",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_STORE_SIZE,
+        help="Maximum size of the dataset store in bytes, the least recently used datasets are removed beyond it. "
+        "The datasets of the current run are always kept, 0 keeps only them.",
+    )
+    parser.add_argument(
+        "--max-hashing-workers",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_HASHING_WORKERS,
+        help="Maximum number of datasets whose content is hashed concurrently.",
+    )
+    parser.add_argument(
+        "--path-to-version-history",
+        action="store",
+        default="./data/cache/dataset_versions.json",
+        help="Path to the file where to keep the content hashes of the dataset versions processed.",
+    )
+    parser.add_argument(
+        "--path-to-download-reports",
+        action="store",
+        default="./data/reports",
+        help="Path to the folder where to save the report of the downloads of each run.",
+    )
     args = parser.parse_args()
+    if args.replay_entity_export and args.path_to_entity_export is None:
+        parser.error("--replay-entity-export requires --path-to-entity-export.")
 
     # Load environment from dotenv file and credentials json file
     load_dotenv(args.path_to_env_var)
@@ -103,72 +255,152 @@ if __name__ == "__main__":
     wbi_config["SPARQL_ENDPOINT_URL"] = sparql_bigdata_url
     wbi_config["WIKIBASE_URL"] = SVC_URL
 
+    # Replay an entity export, keeping only the dataset versions which could not be written for the next replay
+    if args.replay_entity_export:
+        write_session = WikibaseWriteSession(
+            os.environ[USERNAME], os.environ[PASSWORD], maxlag=args.write_maxlag
+        )
+        entity_export = EntityExport(args.path_to_entity_export)
+        failed_dataset_versions = replay_entity_export(
+            entity_export,
+            write_session,
+            max_writers=args.max_write_workers,
+            max_size=args.write_queue_size,
+        )
+        write_session.close()
+        entity_export.close()
+        sys.exit(1 if failed_dataset_versions else 0)
+
     # Initialize DataRepository
     data_repository = DataRepository()
 
     # Process data
     # Download datasets zip files
-    datasets_infos = extract_gtfs_datasets_infos_from_database()
+    catalog_snapshot = CatalogSnapshot(args.path_to_catalog_snapshot)
+    read_client = WikibaseReadClient(max_concurrency=args.max_read_concurrency)
+    datasets_infos = extract_gtfs_datasets_infos_from_database(
+        catalog_snapshot, read_client
+    )
+    sha1_index = extract_sha1_index_from_database(catalog_snapshot)
+    read_client.close()
+    catalog_snapshot.close()
 
     # Download datasets zip files
+    dataset_store = DatasetStore(
+        args.path_to_dataset_store, max_size=args.dataset_store_max_size
+    )
+    # Keep a connection pool for each host, so the pools are not evicted before being reused
+    download_session = DownloadSession(
+        pool_connections=count_download_hosts(datasets_infos),
+        pool_maxsize=args.max_download_workers_per_host,
+        connect_timeout=args.download_connect_timeout,
+        read_timeout=args.download_read_timeout,
+        max_retries=args.download_max_retries,
+        max_download_size=args.max_download_size,
+    )
     datasets_infos = download_dataset_as_zip_for_cron_job(
-        args.path_to_tmp_data, datasets_infos
+        args.path_to_tmp_data,
+        datasets_infos,
+        max_workers=args.max_download_workers,
+        max_workers_per_host=args.max_download_workers_per_host,
+        http_validator_cache=HttpValidatorCache(args.path_to_http_validator_cache),
+        download_session=download_session,
+        hedge_delay=args.download_hedge_delay,
+        dataset_store=dataset_store,
+        download_report=DownloadReport(
+            os.path.join(
+                args.path_to_download_reports,
+                f"download_report_{datetime.now().strftime('%Y%m%dT%H%M%S')}.json",
+            )
+        ),
     )
+    download_session.close()
 
-    # Process the SHA-1 hashes
-    datasets_infos = process_sha1(datasets_infos)
+    # Process the SHA-1 hashes, computed while the datasets were downloaded
+    datasets_infos = process_sha1(datasets_infos, dataset_store, sha1_index=sha1_index)
+
+    # Process the content hashes, discarding the datasets zipped again with the same content
+    version_history = DatasetVersionHistory(args.path_to_version_history)
+    datasets_infos = process_content_hash(
+        datasets_infos, version_history, max_workers=args.max_hashing_workers
+    )
 
     # Load the datasets in memory in the data repository
-    data_repository = load_dataset(data_repository, datasets_infos, args.data_type)
+    data_repository = load_dataset(
+        data_repository, datasets_infos, args.data_type, dataset_store
+    )
+
+    # Log in once for all the writes of the run, or export the dataset versions to write them later,
+    # and write the dataset versions in the background while the next datasets are processed
+    write_session = WikibaseWriteSession(
+        os.environ[USERNAME], os.environ[PASSWORD], maxlag=args.write_maxlag
+    )
+    entity_export = (
+        EntityExport(args.path_to_entity_export)
+        if args.path_to_entity_export is not None
+        else None
+    )
+    write_queue = WikibaseWriteQueue(
+        lambda dataset_representation: create_dataset_entity_for_gtfs_metadata(
+            dataset_representation, write_session, entity_export
+        ),
+        max_size=args.write_queue_size,
+        max_writers=args.max_write_workers,
+    )
 
-    # Process each dataset representation in the data_repository
+    # Process each dataset representation in the data_repository,
+    # only recomputing the metadata depending on the tables changed since the previous dataset version
+    datasets_infos_by_entity_code = {
+        dataset_infos.entity_code: dataset_infos for dataset_infos in datasets_infos
+    }
     for (
         dataset_key,
         dataset_representation,
     ) in data_repository.get_dataset_representations().items():
-        dataset_representation = process_country_codes_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_start_service_date_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_end_service_date_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_start_timestamp_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_end_timestamp_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_main_language_code_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_timezones_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_bounding_box_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_bounding_octagon_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_agencies_count_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_routes_count_by_type_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = process_stops_count_by_type_for_gtfs_metadata(
-            dataset_representation
-        )
-        dataset_representation = create_dataset_entity_for_gtfs_metadata(
-            dataset_representation
+        dataset_infos = datasets_infos_by_entity_code[dataset_key]
+        dataset_representation = process_gtfs_metadata(
+            dataset_representation,
+            table_digests=dataset_infos.table_digests,
+            previous_version=version_history.get_latest_version(dataset_key),
         )
+        dataset_infos.metadata = get_processed_metadata(dataset_representation)
+        write_queue.put(dataset_representation)
 
-        # Print results
+    # Wait for the writes, the datasets which could not be written are processed again on the next run
+    failed_dataset_keys = {
+        dataset_representation.metadata.source_entity_code
+        for dataset_representation in write_queue.close()
+    }
+    write_session.close()
+    if entity_export is not None:
+        entity_export.close()
+
+    # The exported dataset versions are not written yet, they are kept out of the version history
+    written_datasets_infos = (
+        [
+            dataset_infos
+            for dataset_infos in datasets_infos
+            if dataset_infos.entity_code not in failed_dataset_keys
+        ]
+        if entity_export is None
+        else []
+    )
+
+    # Print results
+    for dataset_key in data_repository.get_dataset_representations():
         data_repository.print_dataset_representation(dataset_key)
 
+    # Keep the content hashes of the processed datasets
+    add_datasets_to_version_history(written_datasets_infos, version_history)
+
+    # Remove the least recently used datasets from the dataset store, keeping the ones of this run
+    dataset_store.collect_garbage(
+        protected_sha1_hashes={
+            dataset_infos.sha1_hash for dataset_infos in datasets_infos
+        }
+    )
+    dataset_store.save()
+
     # Print memory usage
     print("\n--------------- Memory Usage ---------------\n")
     print(hpy().heap())
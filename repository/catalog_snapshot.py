@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+from threading import Lock
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS catalogs (
+        catalog_code TEXT PRIMARY KEY,
+        refreshed_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS sources (
+        entity_code TEXT PRIMARY KEY,
+        catalog_code TEXT NOT NULL,
+        name TEXT,
+        urls TEXT NOT NULL,
+        lastrevid INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS dataset_versions (
+        entity_code TEXT PRIMARY KEY,
+        source_entity_code TEXT NOT NULL,
+        lastrevid INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS sha1_hashes (
+        version_entity_code TEXT NOT NULL,
+        sha1_hash TEXT NOT NULL,
+        PRIMARY KEY (version_entity_code, sha1_hash)
+    );
+    CREATE INDEX IF NOT EXISTS dataset_versions_source_index
+        ON dataset_versions (source_entity_code);
+"""
+
+
+class CatalogSnapshot:
+    def __init__(self, path_to_snapshot):
+        """Constructor for ``CatalogSnapshot``.
+        The snapshot keeps a local SQLite copy of the sources of the catalogs, with their name, their stable URLs
+        and the SHA-1 hashes of their dataset versions, and the last revision ID of each item,
+        so it can be refreshed with the items changed since the last refresh only.
+        :param path_to_snapshot: Path to the SQLite database file of the snapshot.
+        """
+        directory = os.path.dirname(path_to_snapshot)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__lock = Lock()
+        self.__connection = sqlite3.connect(path_to_snapshot, check_same_thread=False)
+        self.__connection.executescript(SCHEMA)
+
+    def get_refreshed_at(self, catalog_code):
+        """
+        :param catalog_code: The entity code of the catalog of sources.
+        :return: The timestamp of the last refresh of the catalog, None if the catalog was never refreshed.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT refreshed_at FROM catalogs WHERE catalog_code = ?",
+                (catalog_code,),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def set_refreshed_at(self, catalog_code, refreshed_at):
+        """Set the timestamp of the last refresh of a catalog.
+        :param catalog_code: The entity code of the catalog of sources.
+        :param refreshed_at: The timestamp of the refresh, in the MediaWiki API ISO 8601 format.
+        """
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO catalogs (catalog_code, refreshed_at) VALUES (?, ?)",
+                (catalog_code, refreshed_at),
+            )
+
+    def get_lastrevid(self, entity_code):
+        """
+        :param entity_code: The entity code of a source or of a dataset version.
+        :return: The revision ID of the item in the snapshot, None if the item is not in the snapshot.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT lastrevid FROM sources WHERE entity_code = ? "
+                "UNION ALL SELECT lastrevid FROM dataset_versions WHERE entity_code = ?",
+                (entity_code, entity_code),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def is_source(self, entity_code):
+        """
+        :param entity_code: The entity code of an item.
+        :return: True if the item is a source in the snapshot, False otherwise.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT 1 FROM sources WHERE entity_code = ?", (entity_code,)
+            ).fetchone()
+        return row is not None
+
+    def set_source(self, entity_code, catalog_code, name, urls, lastrevid):
+        """Add or update a source of a catalog.
+        :param entity_code: The source entity code.
+        :param catalog_code: The entity code of the catalog of the source.
+        :param name: The English label of the source.
+        :param urls: The stable URLs of the source.
+        :param lastrevid: The revision ID of the source item.
+        """
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO sources "
+                "(entity_code, catalog_code, name, urls, lastrevid) VALUES (?, ?, ?, ?, ?)",
+                (entity_code, catalog_code, name, json.dumps(urls), lastrevid),
+            )
+
+    def remove_source(self, entity_code):
+        """Remove a source and its dataset versions.
+        :param entity_code: The source entity code.
+        """
+        with self.__lock:
+            self.__connection.execute(
+                "DELETE FROM sha1_hashes WHERE version_entity_code IN "
+                "(SELECT entity_code FROM dataset_versions WHERE source_entity_code = ?)",
+                (entity_code,),
+            )
+            self.__connection.execute(
+                "DELETE FROM dataset_versions WHERE source_entity_code = ?",
+                (entity_code,),
+            )
+            self.__connection.execute(
+                "DELETE FROM sources WHERE entity_code = ?", (entity_code,)
+            )
+
+    def set_dataset_version(
+        self, entity_code, source_entity_code, sha1_hashes, lastrevid
+    ):
+        """Add or update a dataset version of a source.
+        :param entity_code: The dataset version entity code.
+        :param source_entity_code: The entity code of the source of the dataset version.
+        :param sha1_hashes: The SHA-1 hashes of the dataset version.
+        :param lastrevid: The revision ID of the dataset version item.
+        """
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO dataset_versions "
+                "(entity_code, source_entity_code, lastrevid) VALUES (?, ?, ?)",
+                (entity_code, source_entity_code, lastrevid),
+            )
+            self.__connection.execute(
+                "DELETE FROM sha1_hashes WHERE version_entity_code = ?",
+                (entity_code,),
+            )
+            self.__connection.executemany(
+                "INSERT OR IGNORE INTO sha1_hashes (version_entity_code, sha1_hash) VALUES (?, ?)",
+                [(entity_code, sha1_hash) for sha1_hash in sha1_hashes],
+            )
+
+    def is_dataset_version(self, entity_code):
+        """
+        :param entity_code: The entity code of an item.
+        :return: True if the item is a dataset version in the snapshot, False otherwise.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT 1 FROM dataset_versions WHERE entity_code = ?", (entity_code,)
+            ).fetchone()
+        return row is not None
+
+    def remove_dataset_version(self, entity_code):
+        """Remove a dataset version and its SHA-1 hashes.
+        :param entity_code: The dataset version entity code.
+        """
+        with self.__lock:
+            self.__connection.execute(
+                "DELETE FROM sha1_hashes WHERE version_entity_code = ?",
+                (entity_code,),
+            )
+            self.__connection.execute(
+                "DELETE FROM dataset_versions WHERE entity_code = ?", (entity_code,)
+            )
+
+    def get_source_entity_codes(self, catalog_code):
+        """
+        :param catalog_code: The entity code of the catalog of sources.
+        :return: The entity codes of the sources of the catalog.
+        """
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT entity_code FROM sources WHERE catalog_code = ? ORDER BY entity_code",
+                (catalog_code,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_sources(self, catalog_code):
+        """
+        :param catalog_code: The entity code of the catalog of sources.
+        :return: A dictionary with the name, the stable URLs and the set of dataset version SHA-1 hashes,
+        by source entity code.
+        """
+        with self.__lock:
+            source_rows = self.__connection.execute(
+                "SELECT entity_code, name, urls FROM sources WHERE catalog_code = ? ORDER BY entity_code",
+                (catalog_code,),
+            ).fetchall()
+            sha1_rows = self.__connection.execute(
+                "SELECT dataset_versions.source_entity_code, sha1_hashes.sha1_hash "
+                "FROM sha1_hashes JOIN dataset_versions "
+                "ON sha1_hashes.version_entity_code = dataset_versions.entity_code "
+                "JOIN sources ON dataset_versions.source_entity_code = sources.entity_code "
+                "WHERE sources.catalog_code = ?",
+                (catalog_code,),
+            ).fetchall()
+
+        sources = {
+            entity_code: (name, json.loads(urls), set())
+            for entity_code, name, urls in source_rows
+        }
+        for source_entity_code, sha1_hash in sha1_rows:
+            sources[source_entity_code][2].add(sha1_hash)
+        return sources
+
+    def get_dataset_versions(self):
+        """
+        :return: The (SHA-1 hash, source entity code, dataset version entity code) triples
+        of the dataset versions of every catalog.
+        """
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT sha1_hashes.sha1_hash, dataset_versions.source_entity_code, dataset_versions.entity_code "
+                "FROM sha1_hashes JOIN dataset_versions "
+                "ON sha1_hashes.version_entity_code = dataset_versions.entity_code "
+                "ORDER BY dataset_versions.entity_code"
+            ).fetchall()
+
+    def save(self):
+        """Commit the changes to the SQLite database file of the snapshot."""
+        with self.__lock:
+            self.__connection.commit()
+
+    def close(self):
+        """Commit the changes and close the SQLite database file of the snapshot."""
+        self.save()
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,201 @@
+import json
+import os
+import shutil
+import time
+from threading import Lock
+
+BLOBS_DIRECTORY = "blobs"
+REFERENCES_DIRECTORY = "references"
+INDEX_FILE_NAME = "index.json"
+ZIP_EXTENSION = ".zip"
+DEFAULT_MAX_STORE_SIZE = 10 * 1024 * 1024 * 1024
+
+SIZE = "size"
+LAST_ACCESS = "last_access"
+REFERENCES = "references"
+
+
+class DatasetStore:
+    def __init__(self, path_to_store, max_size=None):
+        """Constructor for ``DatasetStore``.
+        The store keeps the dataset zip files by SHA-1 hash, so a file published by several sources
+        is only stored once. Each source entity code references the files it published with a hardlink
+        (or the path to the file itself if hardlinks are not supported).
+        :param path_to_store: Path to the folder where the dataset zip files are stored.
+        :param max_size: The maximum size of the store in bytes, None for an unbounded store.
+        The least recently used files are removed by `collect_garbage` to fit in the maximum size.
+        """
+        if max_size is not None and (not isinstance(max_size, int) or max_size < 0):
+            raise TypeError("Max size must be a valid positive integer or None.")
+        self.__path_to_store = path_to_store
+        self.__max_size = max_size
+        self.__lock = Lock()
+        self.__index = {}
+        os.makedirs(os.path.join(path_to_store, BLOBS_DIRECTORY), exist_ok=True)
+        os.makedirs(os.path.join(path_to_store, REFERENCES_DIRECTORY), exist_ok=True)
+        path_to_index = os.path.join(path_to_store, INDEX_FILE_NAME)
+        if os.path.isfile(path_to_index):
+            try:
+                with open(path_to_index) as f:
+                    self.__index = json.load(f)
+            except (OSError, ValueError):
+                print(
+                    f"Could not read the dataset store index {path_to_index}, starting with an empty index.\n"
+                )
+        # Forget the files removed from the store since the index was saved
+        self.__index = {
+            sha1_hash: entry
+            for sha1_hash, entry in self.__index.items()
+            if os.path.isfile(self.get_blob_path(sha1_hash))
+        }
+
+    def get_blob_path(self, sha1_hash):
+        """
+        :param sha1_hash: The SHA-1 hash of the dataset zip file.
+        :return: The path to the stored dataset zip file for the SHA-1 hash.
+        """
+        return os.path.join(
+            self.__path_to_store,
+            BLOBS_DIRECTORY,
+            sha1_hash[:2],
+            f"{sha1_hash}{ZIP_EXTENSION}",
+        )
+
+    def get_reference_path(self, entity_code, sha1_hash):
+        """
+        :param entity_code: The source entity code.
+        :param sha1_hash: The SHA-1 hash of the dataset zip file.
+        :return: The path to the reference of the source entity code to the stored dataset zip file.
+        """
+        return os.path.join(
+            self.__path_to_store,
+            REFERENCES_DIRECTORY,
+            entity_code,
+            f"{sha1_hash}{ZIP_EXTENSION}",
+        )
+
+    def contains(self, sha1_hash):
+        """
+        :param sha1_hash: The SHA-1 hash of the dataset zip file.
+        :return: True if a dataset zip file with the SHA-1 hash is in the store, False otherwise.
+        """
+        with self.__lock:
+            return sha1_hash in self.__index
+
+    def find_sha1_hash(self, path_to_dataset):
+        """Find the SHA-1 hash of a dataset zip file of the store from its path, without reading the file.
+        :param path_to_dataset: The path to a stored dataset zip file or to one of its references.
+        :return: The SHA-1 hash of the dataset zip file, None if the file is not in the store.
+        """
+        file_name = os.path.basename(path_to_dataset)
+        if not file_name.endswith(ZIP_EXTENSION):
+            return None
+        sha1_hash = file_name[: -len(ZIP_EXTENSION)]
+        with self.__lock:
+            if sha1_hash not in self.__index:
+                return None
+        candidate_paths = [self.get_blob_path(sha1_hash)]
+        entity_code = os.path.basename(os.path.dirname(path_to_dataset))
+        candidate_paths.append(self.get_reference_path(entity_code, sha1_hash))
+        for candidate_path in candidate_paths:
+            if os.path.abspath(candidate_path) == os.path.abspath(path_to_dataset):
+                return sha1_hash
+        return None
+
+    def add(self, entity_code, path_to_dataset, sha1_hash):
+        """Add a dataset zip file to the store, and reference it for a source entity code.
+        The file is moved into the store. If a file with the same SHA-1 hash is already stored,
+        the file is removed instead, and the stored file is referenced.
+        :param entity_code: The source entity code.
+        :param path_to_dataset: The path to the dataset zip file.
+        :param sha1_hash: The SHA-1 hash of the dataset zip file.
+        :return: The path to the reference of the source entity code to the stored dataset zip file.
+        """
+        blob_path = self.get_blob_path(sha1_hash)
+        with self.__lock:
+            if sha1_hash in self.__index:
+                os.remove(path_to_dataset)
+                print(
+                    f"SHA-1 hash {sha1_hash} already stored, {path_to_dataset} deduplicated\n"
+                )
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                shutil.move(path_to_dataset, blob_path)
+                self.__index[sha1_hash] = {
+                    SIZE: os.path.getsize(blob_path),
+                    LAST_ACCESS: time.time(),
+                    REFERENCES: [],
+                }
+        return self.add_reference(entity_code, sha1_hash)
+
+    def add_reference(self, entity_code, sha1_hash):
+        """Reference a stored dataset zip file for a source entity code.
+        :param entity_code: The source entity code.
+        :param sha1_hash: The SHA-1 hash of the stored dataset zip file.
+        :return: The path to the reference, None if no dataset zip file with the SHA-1 hash is stored.
+        """
+        blob_path = self.get_blob_path(sha1_hash)
+        reference_path = self.get_reference_path(entity_code, sha1_hash)
+        with self.__lock:
+            entry = self.__index.get(sha1_hash)
+            if entry is None:
+                return None
+            entry[LAST_ACCESS] = time.time()
+            if entity_code not in entry[REFERENCES]:
+                entry[REFERENCES].append(entity_code)
+            if os.path.isfile(reference_path):
+                return reference_path
+            try:
+                os.makedirs(os.path.dirname(reference_path), exist_ok=True)
+                os.link(blob_path, reference_path)
+            except OSError:
+                # The file system does not support hardlinks, the stored file is referenced directly
+                return blob_path
+        return reference_path
+
+    def get_size(self):
+        """
+        :return: The total size of the stored dataset zip files in bytes.
+        """
+        with self.__lock:
+            return sum(entry[SIZE] for entry in self.__index.values())
+
+    def collect_garbage(self, max_size=None, protected_sha1_hashes=()):
+        """Remove the least recently used dataset zip files and their references until the store fits in its maximum size.
+        :param max_size: The maximum size of the store in bytes. If None, the maximum size of the store is used.
+        :param protected_sha1_hashes: The SHA-1 hashes of the dataset zip files to keep, e.g. the ones in use.
+        :return: The SHA-1 hashes of the removed dataset zip files.
+        """
+        if max_size is None:
+            max_size = self.__max_size
+        if max_size is None:
+            return []
+        removed_sha1_hashes = []
+        with self.__lock:
+            size = sum(entry[SIZE] for entry in self.__index.values())
+            for sha1_hash, entry in sorted(
+                self.__index.items(), key=lambda item: item[1][LAST_ACCESS]
+            ):
+                if size <= max_size:
+                    break
+                if sha1_hash in protected_sha1_hashes:
+                    continue
+                for entity_code in entry[REFERENCES]:
+                    reference_path = self.get_reference_path(entity_code, sha1_hash)
+                    if os.path.isfile(reference_path):
+                        os.remove(reference_path)
+                os.remove(self.get_blob_path(sha1_hash))
+                size -= entry[SIZE]
+                removed_sha1_hashes.append(sha1_hash)
+            for sha1_hash in removed_sha1_hashes:
+                del self.__index[sha1_hash]
+        return removed_sha1_hashes
+
+    def save(self):
+        """Persist the store index to its JSON file."""
+        path_to_index = os.path.join(self.__path_to_store, INDEX_FILE_NAME)
+        tmp_path = f"{path_to_index}.tmp"
+        with self.__lock:
+            with open(tmp_path, "w") as f:
+                json.dump(self.__index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path_to_index)
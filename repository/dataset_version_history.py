@@ -0,0 +1,85 @@
+import json
+import os
+from threading import Lock
+
+SHA1_HASH = "sha1_hash"
+CONTENT_HASH = "content_hash"
+TABLE_DIGESTS = "table_digests"
+METADATA = "metadata"
+
+
+class DatasetVersionHistory:
+    def __init__(self, path_to_history):
+        """Constructor for ``DatasetVersionHistory``.
+        The history keeps, for each source entity code, the SHA-1 hash, the content hash, the table digests
+        and the processed metadata of the dataset versions processed, in the order they were processed.
+        :param path_to_history: Path to the JSON file where the history is persisted.
+        """
+        self.__path_to_history = path_to_history
+        self.__lock = Lock()
+        self.__versions = {}
+        if os.path.isfile(path_to_history):
+            try:
+                with open(path_to_history) as f:
+                    self.__versions = json.load(f)
+            except (OSError, ValueError):
+                print(
+                    f"Could not read the dataset version history {path_to_history}, starting with an empty history.\n"
+                )
+
+    def add_version(
+        self, entity_code, sha1_hash, content_hash, table_digests, metadata=None
+    ):
+        """Add a processed dataset version to the history of a source.
+        :param entity_code: The source entity code.
+        :param sha1_hash: The SHA-1 hash of the dataset zip file.
+        :param content_hash: The content hash of the dataset.
+        :param table_digests: The digest of each table of the dataset by member name.
+        :param metadata: The metadata attribute values processed for the dataset by attribute name, if any.
+        """
+        version = {
+            SHA1_HASH: sha1_hash,
+            CONTENT_HASH: content_hash,
+            TABLE_DIGESTS: table_digests,
+            METADATA: metadata if metadata is not None else {},
+        }
+        with self.__lock:
+            self.__versions.setdefault(entity_code, []).append(version)
+
+    def get_versions(self, entity_code):
+        """
+        :param entity_code: The source entity code.
+        :return: The dataset versions processed for the source, the oldest first.
+        """
+        with self.__lock:
+            return list(self.__versions.get(entity_code, []))
+
+    def get_latest_version(self, entity_code):
+        """
+        :param entity_code: The source entity code.
+        :return: The last dataset version processed for the source, None if no version was processed.
+        """
+        versions = self.get_versions(entity_code)
+        return versions[-1] if versions else None
+
+    def find_version_by_content_hash(self, entity_code, content_hash):
+        """
+        :param entity_code: The source entity code.
+        :param content_hash: The content hash of a dataset.
+        :return: The dataset version processed for the source with the content hash, None if there is none.
+        """
+        for version in self.get_versions(entity_code):
+            if version[CONTENT_HASH] == content_hash:
+                return version
+        return None
+
+    def save(self):
+        """Persist the history to its JSON file."""
+        directory = os.path.dirname(self.__path_to_history)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.__path_to_history}.tmp"
+        with self.__lock:
+            with open(tmp_path, "w") as f:
+                json.dump(self.__versions, f, indent=2, sort_keys=True, default=str)
+        os.replace(tmp_path, self.__path_to_history)
@@ -0,0 +1,75 @@
+import json
+import os
+from datetime import datetime
+from threading import Lock
+
+DOWNLOADS = "downloads"
+SUMMARY = "summary"
+STARTED_AT = "started_at"
+DOWNLOADS_COUNT = "downloads_count"
+TOTAL_BYTES = "total_bytes"
+TOTAL_TIME = "total_time"
+TOTAL_RETRIES = "total_retries"
+RESULTS_COUNT = "results_count"
+RESULT = "result"
+BYTES = "bytes"
+RETRIES = "retries"
+
+
+class DownloadReport:
+    def __init__(self, path_to_report):
+        """Constructor for ``DownloadReport``.
+        The report keeps the telemetry of the downloads of a run, to be saved as a JSON file.
+        :param path_to_report: Path to the JSON file where the report is saved.
+        """
+        self.__path_to_report = path_to_report
+        self.__started_at = datetime.now().isoformat(timespec="seconds")
+        self.__lock = Lock()
+        self.__downloads = []
+
+    def add_download(self, download_telemetry):
+        """Add the telemetry of a download to the report.
+        :param download_telemetry: The DownloadTelemetry of the download.
+        """
+        with self.__lock:
+            self.__downloads.append(download_telemetry.to_dict())
+
+    def get_downloads(self):
+        """
+        :return: The telemetry of the downloads, the longest download first.
+        """
+        with self.__lock:
+            return sorted(
+                self.__downloads,
+                key=lambda download: download[TOTAL_TIME] or 0,
+                reverse=True,
+            )
+
+    def get_summary(self):
+        """
+        :return: The number of downloads, their total size, time and retries, and the number of downloads by result.
+        """
+        downloads = self.get_downloads()
+        results_count = {}
+        for download in downloads:
+            results_count[download[RESULT]] = results_count.get(download[RESULT], 0) + 1
+        return {
+            DOWNLOADS_COUNT: len(downloads),
+            TOTAL_BYTES: sum(download[BYTES] for download in downloads),
+            TOTAL_TIME: sum(download[TOTAL_TIME] or 0 for download in downloads),
+            TOTAL_RETRIES: sum(download[RETRIES] for download in downloads),
+            RESULTS_COUNT: results_count,
+        }
+
+    def save(self):
+        """Save the report to its JSON file."""
+        directory = os.path.dirname(self.__path_to_report)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        report = {
+            STARTED_AT: self.__started_at,
+            SUMMARY: self.get_summary(),
+            DOWNLOADS: self.get_downloads(),
+        }
+        with open(self.__path_to_report, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,176 @@
+from hashlib import sha1
+import json
+import os
+from threading import Lock
+
+SOURCE_ENTITY_CODE = "source_entity_code"
+DATASET_VERSION = "dataset_version"
+DATASET_VERSION_ENTITY_CODE = "dataset_version_entity_code"
+SHA1_HASH = "sha1_hash"
+
+WRITTEN_EXTENSION = ".written"
+
+
+class EntityExport:
+    def __init__(self, path_to_export):
+        """Constructor for ``EntityExport``.
+        The export keeps the dataset versions to create on the Database in a newline-delimited JSON file,
+        one dataset version per line with the entity code of its source and its labels and claims
+        in the Wikibase JSON format, so they can be loaded in bulk later instead of being written one by one.
+        The dataset versions written by a replay are recorded in a file next to the export,
+        so an interrupted replay does not write them again.
+        :param path_to_export: Path to the newline-delimited JSON file of the export.
+        """
+        directory = os.path.dirname(path_to_export)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__path_to_export = path_to_export
+        self.__path_to_written = f"{path_to_export}{WRITTEN_EXTENSION}"
+        self.__lock = Lock()
+        self.__file = None
+        self.__written_file = None
+        self.__sha1_hashes = None
+
+    @staticmethod
+    def create_key(dataset_version):
+        """Create the key identifying a dataset version of the export, to record that it was written.
+        :param dataset_version: The dataset version, with the entity code of its source and its labels and claims.
+        :return: The key of the dataset version.
+        """
+        content = json.dumps(
+            [dataset_version[SOURCE_ENTITY_CODE], dataset_version[DATASET_VERSION]],
+            sort_keys=True,
+        )
+        return sha1(content.encode()).hexdigest()
+
+    def add_dataset_version(
+        self,
+        source_entity_code,
+        dataset_version_json,
+        dataset_version_entity_code=None,
+        sha1_hash=None,
+    ):
+        """Add a dataset version to the export.
+        A dataset version with the same source and SHA-1 hash as one already in the export is not added again.
+        :param source_entity_code: The entity code of the source of the dataset version.
+        :param dataset_version_json: The labels and claims of the dataset version, in the Wikibase JSON format.
+        :param dataset_version_entity_code: The entity code of the dataset version, if it was already created.
+        :param sha1_hash: The SHA-1 hash of the dataset version, if any.
+        :return: True if the dataset version was added, False if it was already in the export.
+        """
+        dataset_version = {
+            SOURCE_ENTITY_CODE: source_entity_code,
+            DATASET_VERSION: dataset_version_json,
+        }
+        if dataset_version_entity_code is not None:
+            dataset_version[DATASET_VERSION_ENTITY_CODE] = dataset_version_entity_code
+        if sha1_hash is not None:
+            dataset_version[SHA1_HASH] = sha1_hash
+        line = json.dumps(dataset_version)
+        with self.__lock:
+            if self.__sha1_hashes is None:
+                self.__sha1_hashes = self.__load_sha1_hashes()
+            if sha1_hash is not None:
+                if (source_entity_code, sha1_hash) in self.__sha1_hashes:
+                    return False
+                self.__sha1_hashes.add((source_entity_code, sha1_hash))
+            if self.__file is None:
+                self.__file = open(self.__path_to_export, "a")
+            self.__file.write(f"{line}\n")
+        return True
+
+    def __load_sha1_hashes(self):
+        """
+        :return: The set of the source entity codes and SHA-1 hashes of the dataset versions in the export file.
+        """
+        sha1_hashes = set()
+        if not os.path.isfile(self.__path_to_export):
+            return sha1_hashes
+        with open(self.__path_to_export) as f:
+            for line in f:
+                if line.strip():
+                    dataset_version = json.loads(line)
+                    if dataset_version.get(SHA1_HASH) is not None:
+                        sha1_hashes.add(
+                            (
+                                dataset_version[SOURCE_ENTITY_CODE],
+                                dataset_version[SHA1_HASH],
+                            )
+                        )
+        return sha1_hashes
+
+    def get_dataset_versions(self):
+        """
+        :return: A generator of the dataset versions of the export, as dictionaries with the entity code
+        of the source and the labels and claims of the dataset version.
+        """
+        self.save()
+        if not os.path.isfile(self.__path_to_export):
+            return
+        with open(self.__path_to_export) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def get_pending_dataset_versions(self):
+        """
+        :return: A generator of the dataset versions of the export not written by a previous replay yet.
+        """
+        written_keys = set()
+        if os.path.isfile(self.__path_to_written):
+            with open(self.__path_to_written) as f:
+                written_keys = {line.strip() for line in f if line.strip()}
+        for dataset_version in self.get_dataset_versions():
+            if self.create_key(dataset_version) not in written_keys:
+                yield dataset_version
+
+    def set_written(self, dataset_version):
+        """Record that a dataset version of the export was written, so it is skipped if the replay is interrupted.
+        :param dataset_version: The dataset version written.
+        """
+        key = self.create_key(dataset_version)
+        with self.__lock:
+            if self.__written_file is None:
+                self.__written_file = open(self.__path_to_written, "a")
+            self.__written_file.write(f"{key}\n")
+            self.__written_file.flush()
+
+    def replace_dataset_versions(self, dataset_versions):
+        """Replace the dataset versions of the export, e.g. with the ones which could not be written by a replay.
+        The export is written to a temporary file first, then moved over the export file,
+        so an interrupted replacement keeps the previous export. The record of the written dataset versions
+        is then removed.
+        :param dataset_versions: The dataset versions replacing the ones of the export, as dictionaries with
+        the entity code of the source, the labels and claims and the entity code of the dataset version, if any.
+        """
+        tmp_path = f"{self.__path_to_export}.tmp"
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+            with open(tmp_path, "w") as f:
+                for dataset_version in dataset_versions:
+                    f.write(f"{json.dumps(dataset_version)}\n")
+            os.replace(tmp_path, self.__path_to_export)
+            self.__sha1_hashes = None
+            if self.__written_file is not None:
+                self.__written_file.close()
+                self.__written_file = None
+            if os.path.isfile(self.__path_to_written):
+                os.remove(self.__path_to_written)
+
+    def save(self):
+        """Flush the dataset versions added to the newline-delimited JSON file of the export."""
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.flush()
+
+    def close(self):
+        """Flush and close the newline-delimited JSON file of the export."""
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+            self.__file = None
+            if self.__written_file is not None:
+                self.__written_file.close()
+            self.__written_file = None
@@ -0,0 +1,133 @@
+import json
+import os
+from threading import Lock
+
+ETAG = "etag"
+LAST_MODIFIED = "last_modified"
+CONTENT_LENGTH = "content_length"
+SHA1_HASH = "sha1_hash"
+ACCEPT_RANGES = "accept_ranges"
+ZIP_FINGERPRINT = "zip_fingerprint"
+
+ETAG_HEADER = "ETag"
+LAST_MODIFIED_HEADER = "Last-Modified"
+CONTENT_LENGTH_HEADER = "Content-Length"
+ACCEPT_RANGES_HEADER = "Accept-Ranges"
+IF_NONE_MATCH_HEADER = "If-None-Match"
+IF_MODIFIED_SINCE_HEADER = "If-Modified-Since"
+BYTES_RANGE_UNIT = "bytes"
+
+
+class HttpValidatorCache:
+    def __init__(self, path_to_cache):
+        """Constructor for ``HttpValidatorCache``.
+        The cache keeps the HTTP validators (ETag, Last-Modified, Content-Length), the SHA-1 hash
+        and the zip fingerprint of the last dataset downloaded for each source entity code and URL.
+        :param path_to_cache: Path to the JSON file where the cache is persisted.
+        """
+        self.__path_to_cache = path_to_cache
+        self.__lock = Lock()
+        self.__validators = {}
+        if os.path.isfile(path_to_cache):
+            try:
+                with open(path_to_cache) as f:
+                    self.__validators = json.load(f)
+            except (OSError, ValueError):
+                print(
+                    f"Could not read the HTTP validator cache {path_to_cache}, starting with an empty cache.\n"
+                )
+
+    @staticmethod
+    def create_key(entity_code, url):
+        """Create the cache key for a source entity code and URL.
+        :param entity_code: The source entity code.
+        :param url: The URL of the source dataset.
+        :return: The cache key.
+        """
+        return f"{entity_code} {url}"
+
+    def get_validators(self, entity_code, url):
+        """
+        :param entity_code: The source entity code.
+        :param url: The URL of the source dataset.
+        :return: The validators for the source entity code and URL if they exist in the cache.
+        """
+        with self.__lock:
+            return self.__validators.get(self.create_key(entity_code, url))
+
+    def set_validators(
+        self, entity_code, url, response_headers, sha1_hash, zip_fingerprint=None
+    ):
+        """Set the validators for a source entity code and URL from the headers of a download response.
+        :param entity_code: The source entity code.
+        :param url: The URL of the source dataset.
+        :param response_headers: The headers of the response the dataset was downloaded with.
+        :param sha1_hash: The SHA-1 hash of the downloaded dataset.
+        :param zip_fingerprint: The fingerprint of the downloaded dataset zip central directory.
+        """
+        validators = {
+            ETAG: response_headers.get(ETAG_HEADER),
+            LAST_MODIFIED: response_headers.get(LAST_MODIFIED_HEADER),
+            CONTENT_LENGTH: response_headers.get(CONTENT_LENGTH_HEADER),
+            ACCEPT_RANGES: response_headers.get(ACCEPT_RANGES_HEADER),
+            SHA1_HASH: sha1_hash,
+            ZIP_FINGERPRINT: zip_fingerprint,
+        }
+        with self.__lock:
+            self.__validators[self.create_key(entity_code, url)] = validators
+
+    def remove_validators(self, entity_code, url):
+        """Remove the validators for a source entity code and URL, e.g. when the dataset was downloaded from a mirror.
+        :param entity_code: The source entity code.
+        :param url: The URL of the source dataset.
+        """
+        with self.__lock:
+            self.__validators.pop(self.create_key(entity_code, url), None)
+
+    def get_conditional_headers(self, entity_code, url, previous_sha1_hashes):
+        """Create the conditional request headers for a source entity code and URL.
+        The headers are only created if the last dataset downloaded is already in the database,
+        so a dataset that failed to be processed is downloaded again.
+        :param entity_code: The source entity code.
+        :param url: The URL of the source dataset.
+        :param previous_sha1_hashes: The SHA-1 hashes of the dataset versions in the database.
+        :return: The conditional request headers, empty if no validators can be used.
+        """
+        headers = {}
+        validators = self.get_validators(entity_code, url)
+        if validators is None or validators.get(SHA1_HASH) not in previous_sha1_hashes:
+            return headers
+        if validators.get(ETAG):
+            headers[IF_NONE_MATCH_HEADER] = validators[ETAG]
+        if validators.get(LAST_MODIFIED):
+            headers[IF_MODIFIED_SINCE_HEADER] = validators[LAST_MODIFIED]
+        return headers
+
+    def get_zip_fingerprint(self, entity_code, url, previous_sha1_hashes):
+        """Get the zip fingerprint to compare with a range request probe for a source entity code and URL.
+        The fingerprint is only returned if the last dataset downloaded is already in the database
+        and the server advertised the support of byte range requests.
+        :param entity_code: The source entity code.
+        :param url: The URL of the source dataset.
+        :param previous_sha1_hashes: The SHA-1 hashes of the dataset versions in the database.
+        :return: The zip fingerprint of the last dataset downloaded, None if it can not be used.
+        """
+        validators = self.get_validators(entity_code, url)
+        if (
+            validators is None
+            or validators.get(SHA1_HASH) not in previous_sha1_hashes
+            or validators.get(ACCEPT_RANGES) != BYTES_RANGE_UNIT
+        ):
+            return None
+        return validators.get(ZIP_FINGERPRINT)
+
+    def save(self):
+        """Persist the cache to its JSON file."""
+        directory = os.path.dirname(self.__path_to_cache)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.__path_to_cache}.tmp"
+        with self.__lock:
+            with open(tmp_path, "w") as f:
+                json.dump(self.__validators, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.__path_to_cache)
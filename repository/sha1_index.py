@@ -0,0 +1,53 @@
+from threading import Lock
+
+
+class Sha1Index:
+    def __init__(self):
+        """Constructor for ``Sha1Index``.
+        The index keeps, for each SHA-1 hash of the database, the source and dataset version entity codes
+        of the dataset versions with this SHA-1 hash, to check the SHA-1 hash of a dataset against
+        the whole catalog at once.
+        """
+        self.__lock = Lock()
+        self.__entries = {}
+
+    def add(self, sha1_hash, source_entity_code, version_entity_code=None):
+        """Add a dataset version to the index.
+        :param sha1_hash: The SHA-1 hash of the dataset version.
+        :param source_entity_code: The entity code of the source of the dataset version.
+        :param version_entity_code: The entity code of the dataset version, None if it is not in the database yet.
+        """
+        with self.__lock:
+            entries = self.__entries.setdefault(sha1_hash, [])
+            if (source_entity_code, version_entity_code) not in entries:
+                entries.append((source_entity_code, version_entity_code))
+
+    def get_entries(self, sha1_hash):
+        """
+        :param sha1_hash: A SHA-1 hash.
+        :return: The (source entity code, dataset version entity code) pairs of the dataset versions
+        with the SHA-1 hash.
+        """
+        with self.__lock:
+            return list(self.__entries.get(sha1_hash, []))
+
+    def get_source_entity_codes(self, sha1_hash):
+        """
+        :param sha1_hash: A SHA-1 hash.
+        :return: The entity codes of the sources with a dataset version with the SHA-1 hash.
+        """
+        return {
+            source_entity_code
+            for source_entity_code, version_entity_code in self.get_entries(sha1_hash)
+        }
+
+    def contains(self, sha1_hash, source_entity_code=None):
+        """
+        :param sha1_hash: A SHA-1 hash.
+        :param source_entity_code: The entity code of a source, None to search every source.
+        :return: True if a dataset version of the source has the SHA-1 hash, False otherwise.
+        """
+        source_entity_codes = self.get_source_entity_codes(sha1_hash)
+        if source_entity_code is None:
+            return len(source_entity_codes) > 0
+        return source_entity_code in source_entity_codes
@@ -0,0 +1,65 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+import os
+from repository.catalog_snapshot import CatalogSnapshot
+
+
+class CatalogSnapshotTest(TestCase):
+    def test_catalog_snapshot_with_non_existing_file_should_be_empty(self):
+        with TemporaryDirectory() as path_to_data:
+            under_test = CatalogSnapshot(
+                os.path.join(path_to_data, "cache", "catalog.sqlite")
+            )
+            self.assertIsNone(under_test.get_refreshed_at("Q1"))
+            self.assertIsNone(under_test.get_lastrevid("Q80"))
+            self.assertEqual(under_test.get_sources("Q1"), {})
+            under_test.close()
+
+    def test_catalog_snapshot_should_keep_sources_and_sha1_hashes(self):
+        with TemporaryDirectory() as path_to_data:
+            test_path = os.path.join(path_to_data, "catalog.sqlite")
+            test_snapshot = CatalogSnapshot(test_path)
+            test_snapshot.set_refreshed_at("Q1", "2021-06-01T00:00:00Z")
+            test_snapshot.set_source("Q80", "Q1", "test_name", ["test_url"], 10)
+            test_snapshot.set_source("Q90", "Q2", "other_name", ["other_url"], 11)
+            test_snapshot.set_dataset_version("Q81", "Q80", {"test_sha1_hash"}, 12)
+            test_snapshot.close()
+
+            under_test = CatalogSnapshot(test_path)
+            self.assertEqual(under_test.get_refreshed_at("Q1"), "2021-06-01T00:00:00Z")
+            self.assertEqual(under_test.get_lastrevid("Q80"), 10)
+            self.assertEqual(under_test.get_lastrevid("Q81"), 12)
+            self.assertTrue(under_test.is_source("Q80"))
+            self.assertFalse(under_test.is_source("Q81"))
+            self.assertEqual(under_test.get_source_entity_codes("Q1"), ["Q80"])
+            self.assertEqual(
+                under_test.get_sources("Q1"),
+                {"Q80": ("test_name", ["test_url"], {"test_sha1_hash"})},
+            )
+            under_test.close()
+
+    def test_catalog_snapshot_remove_source_should_remove_dataset_versions(self):
+        with TemporaryDirectory() as path_to_data:
+            under_test = CatalogSnapshot(os.path.join(path_to_data, "catalog.sqlite"))
+            under_test.set_source("Q80", "Q1", "test_name", ["test_url"], 10)
+            under_test.set_dataset_version("Q81", "Q80", {"test_sha1_hash"}, 12)
+
+            under_test.remove_source("Q80")
+            self.assertEqual(under_test.get_sources("Q1"), {})
+            self.assertIsNone(under_test.get_lastrevid("Q81"))
+            under_test.close()
+
+    def test_catalog_snapshot_remove_dataset_version_should_remove_sha1_hashes(self):
+        with TemporaryDirectory() as path_to_data:
+            under_test = CatalogSnapshot(os.path.join(path_to_data, "catalog.sqlite"))
+            under_test.set_source("Q80", "Q1", "test_name", ["test_url"], 10)
+            under_test.set_dataset_version("Q81", "Q80", {"test_sha1_hash"}, 12)
+            self.assertTrue(under_test.is_dataset_version("Q81"))
+
+            under_test.remove_dataset_version("Q81")
+            self.assertFalse(under_test.is_dataset_version("Q81"))
+            self.assertEqual(
+                under_test.get_sources("Q1"),
+                {"Q80": ("test_name", ["test_url"], set())},
+            )
+            under_test.close()
@@ -0,0 +1,116 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+import os
+from repository.dataset_store import DatasetStore
+
+TEST_SHA1_HASH = "13ee7c643a033af3942124889d3f6b3b90c28907"
+TEST_OTHER_SHA1_HASH = "a94a8fe5ccb19ba61c4c0873d391e987982fbbd3"
+
+
+def create_test_file(path_to_data, file_name, content):
+    test_path = os.path.join(path_to_data, file_name)
+    with open(test_path, "wb") as f:
+        f.write(content)
+    return test_path
+
+
+class DatasetStoreTest(TestCase):
+    def test_dataset_store_with_invalid_max_size_should_raise_exception(self):
+        with TemporaryDirectory() as path_to_store:
+            self.assertRaises(TypeError, DatasetStore, path_to_store, -1)
+            self.assertRaises(TypeError, DatasetStore, path_to_store, "1")
+
+    def test_dataset_store_add_should_move_file_and_reference_it(self):
+        with TemporaryDirectory() as path_to_data:
+            test_path = create_test_file(path_to_data, "Q80_gtfs.zip", b"test_content")
+            under_test = DatasetStore(os.path.join(path_to_data, "store"))
+
+            reference_path = under_test.add("Q80", test_path, TEST_SHA1_HASH)
+
+            self.assertFalse(os.path.exists(test_path))
+            self.assertTrue(under_test.contains(TEST_SHA1_HASH))
+            self.assertEqual(
+                reference_path, under_test.get_reference_path("Q80", TEST_SHA1_HASH)
+            )
+            with open(reference_path, "rb") as f:
+                self.assertEqual(f.read(), b"test_content")
+            self.assertEqual(under_test.find_sha1_hash(reference_path), TEST_SHA1_HASH)
+            self.assertIsNone(under_test.find_sha1_hash(test_path))
+
+    def test_dataset_store_add_same_file_should_deduplicate(self):
+        with TemporaryDirectory() as path_to_data:
+            under_test = DatasetStore(os.path.join(path_to_data, "store"))
+            under_test.add(
+                "Q80",
+                create_test_file(path_to_data, "Q80_gtfs.zip", b"test_content"),
+                TEST_SHA1_HASH,
+            )
+            test_path = create_test_file(path_to_data, "Q81_gtfs.zip", b"test_content")
+
+            reference_path = under_test.add("Q81", test_path, TEST_SHA1_HASH)
+
+            self.assertFalse(os.path.exists(test_path))
+            self.assertEqual(under_test.get_size(), len(b"test_content"))
+            self.assertTrue(
+                os.path.samefile(
+                    reference_path, under_test.get_blob_path(TEST_SHA1_HASH)
+                )
+            )
+
+    def test_dataset_store_collect_garbage_should_remove_least_recently_used(self):
+        with TemporaryDirectory() as path_to_data:
+            under_test = DatasetStore(os.path.join(path_to_data, "store"))
+            under_test.add(
+                "Q80",
+                create_test_file(path_to_data, "Q80_gtfs.zip", b"test_content"),
+                TEST_SHA1_HASH,
+            )
+            under_test.add(
+                "Q81",
+                create_test_file(path_to_data, "Q81_gtfs.zip", b"test"),
+                TEST_OTHER_SHA1_HASH,
+            )
+            # Using the first file makes the second one the least recently used
+            under_test.add_reference("Q80", TEST_SHA1_HASH)
+
+            removed_sha1_hashes = under_test.collect_garbage(max_size=12)
+
+            self.assertEqual(removed_sha1_hashes, [TEST_OTHER_SHA1_HASH])
+            self.assertFalse(under_test.contains(TEST_OTHER_SHA1_HASH))
+            self.assertFalse(
+                os.path.exists(
+                    under_test.get_reference_path("Q81", TEST_OTHER_SHA1_HASH)
+                )
+            )
+            self.assertTrue(under_test.contains(TEST_SHA1_HASH))
+
+    def test_dataset_store_collect_garbage_should_keep_protected_files(self):
+        with TemporaryDirectory() as path_to_data:
+            under_test = DatasetStore(os.path.join(path_to_data, "store"), max_size=0)
+            under_test.add(
+                "Q80",
+                create_test_file(path_to_data, "Q80_gtfs.zip", b"test_content"),
+                TEST_SHA1_HASH,
+            )
+
+            removed_sha1_hashes = under_test.collect_garbage(
+                protected_sha1_hashes={TEST_SHA1_HASH}
+            )
+
+            self.assertEqual(removed_sha1_hashes, [])
+            self.assertTrue(under_test.contains(TEST_SHA1_HASH))
+
+    def test_dataset_store_save_should_persist_index(self):
+        with TemporaryDirectory() as path_to_data:
+            test_path_to_store = os.path.join(path_to_data, "store")
+            test_store = DatasetStore(test_path_to_store)
+            test_store.add(
+                "Q80",
+                create_test_file(path_to_data, "Q80_gtfs.zip", b"test_content"),
+                TEST_SHA1_HASH,
+            )
+            test_store.save()
+
+            under_test = DatasetStore(test_path_to_store)
+            self.assertTrue(under_test.contains(TEST_SHA1_HASH))
+            self.assertEqual(under_test.get_size(), len(b"test_content"))
@@ -0,0 +1,61 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+import os
+from repository.dataset_version_history import DatasetVersionHistory
+
+TEST_TABLE_DIGESTS = {"stops.txt": "test_stops_digest"}
+
+
+class DatasetVersionHistoryTest(TestCase):
+    def test_dataset_version_history_with_non_existing_file_should_be_empty(self):
+        with TemporaryDirectory() as path_to_data:
+            under_test = DatasetVersionHistory(
+                os.path.join(path_to_data, "history.json")
+            )
+            self.assertEqual(under_test.get_versions("Q80"), [])
+            self.assertIsNone(under_test.get_latest_version("Q80"))
+
+    def test_dataset_version_history_should_find_version_by_content_hash(self):
+        with TemporaryDirectory() as path_to_data:
+            under_test = DatasetVersionHistory(
+                os.path.join(path_to_data, "history.json")
+            )
+            under_test.add_version(
+                "Q80", "test_sha1", "test_content_hash", TEST_TABLE_DIGESTS
+            )
+            under_test.add_version("Q80", "other_sha1", "other_content_hash", {})
+
+            self.assertEqual(
+                under_test.find_version_by_content_hash("Q80", "test_content_hash"),
+                {
+                    "sha1_hash": "test_sha1",
+                    "content_hash": "test_content_hash",
+                    "table_digests": TEST_TABLE_DIGESTS,
+                    "metadata": {},
+                },
+            )
+            self.assertIsNone(
+                under_test.find_version_by_content_hash("Q81", "test_content_hash")
+            )
+            self.assertEqual(
+                under_test.get_latest_version("Q80")["sha1_hash"], "other_sha1"
+            )
+
+    def test_dataset_version_history_save_should_persist_versions(self):
+        with TemporaryDirectory() as path_to_data:
+            test_path = os.path.join(path_to_data, "cache", "history.json")
+            test_history = DatasetVersionHistory(test_path)
+            test_history.add_version(
+                "Q80",
+                "test_sha1",
+                "test_content_hash",
+                TEST_TABLE_DIGESTS,
+                {"agencies_count": 2},
+            )
+            test_history.save()
+
+            under_test = DatasetVersionHistory(test_path)
+            self.assertEqual(len(under_test.get_versions("Q80")), 1)
+            self.assertEqual(
+                under_test.get_latest_version("Q80")["metadata"], {"agencies_count": 2}
+            )
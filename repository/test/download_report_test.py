@@ -0,0 +1,51 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+import json
+import os
+from repository.download_report import DownloadReport
+from utilities.download_telemetry import DownloadTelemetry
+
+
+def create_test_telemetry(entity_code, total_time, result, retries=0):
+    telemetry = DownloadTelemetry(entity_code, f"http://test.com/{entity_code}.zip")
+    telemetry.total_time = total_time
+    telemetry.bytes = 100
+    telemetry.retries = retries
+    telemetry.result = result
+    return telemetry
+
+
+class DownloadReportTest(TestCase):
+    def test_download_report_should_sort_downloads_by_total_time(self):
+        under_test = DownloadReport("report.json")
+        under_test.add_download(create_test_telemetry("Q80", 1, "downloaded"))
+        under_test.add_download(create_test_telemetry("Q81", 3, "failed", 2))
+        under_test.add_download(create_test_telemetry("Q82", None, "failed"))
+
+        self.assertEqual(
+            [download["entity_code"] for download in under_test.get_downloads()],
+            ["Q81", "Q80", "Q82"],
+        )
+        self.assertEqual(
+            under_test.get_summary(),
+            {
+                "downloads_count": 3,
+                "total_bytes": 300,
+                "total_time": 4,
+                "total_retries": 2,
+                "results_count": {"failed": 2, "downloaded": 1},
+            },
+        )
+
+    def test_download_report_save_should_write_json(self):
+        with TemporaryDirectory() as path_to_reports:
+            test_path = os.path.join(path_to_reports, "reports", "report.json")
+            under_test = DownloadReport(test_path)
+            under_test.add_download(create_test_telemetry("Q80", 1, "downloaded"))
+            under_test.save()
+
+            with open(test_path) as f:
+                test_report = json.load(f)
+        self.assertIn("started_at", test_report)
+        self.assertEqual(test_report["summary"]["downloads_count"], 1)
+        self.assertEqual(test_report["downloads"][0]["entity_code"], "Q80")
@@ -0,0 +1,143 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+import json
+import os
+from repository.entity_export import EntityExport
+
+
+class EntityExportTest(TestCase):
+    def test_entity_export_should_write_one_dataset_version_per_line(self):
+        with TemporaryDirectory() as tmp_dir:
+            path_to_export = os.path.join(tmp_dir, "exports", "dataset_versions.ndjson")
+            under_test = EntityExport(path_to_export)
+            under_test.add_dataset_version("Q80", {"claims": []})
+            under_test.add_dataset_version(
+                "Q81", {"claims": [], "labels": {}}, dataset_version_entity_code="Q90"
+            )
+            under_test.close()
+
+            with open(path_to_export) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(
+                lines,
+                [
+                    {"source_entity_code": "Q80", "dataset_version": {"claims": []}},
+                    {
+                        "source_entity_code": "Q81",
+                        "dataset_version": {"claims": [], "labels": {}},
+                        "dataset_version_entity_code": "Q90",
+                    },
+                ],
+            )
+
+    def test_entity_export_should_append_to_existing_export(self):
+        with TemporaryDirectory() as tmp_dir:
+            path_to_export = os.path.join(tmp_dir, "dataset_versions.ndjson")
+            first_export = EntityExport(path_to_export)
+            first_export.add_dataset_version("Q80", {"claims": []})
+            first_export.close()
+
+            under_test = EntityExport(path_to_export)
+            under_test.add_dataset_version("Q81", {"claims": []})
+            self.assertEqual(
+                [
+                    dataset_version["source_entity_code"]
+                    for dataset_version in under_test.get_dataset_versions()
+                ],
+                ["Q80", "Q81"],
+            )
+            under_test.close()
+
+    def test_entity_export_without_file_should_have_no_dataset_versions(self):
+        with TemporaryDirectory() as tmp_dir:
+            under_test = EntityExport(os.path.join(tmp_dir, "dataset_versions.ndjson"))
+            self.assertEqual(list(under_test.get_dataset_versions()), [])
+
+    def test_replace_dataset_versions_should_rewrite_export(self):
+        with TemporaryDirectory() as tmp_dir:
+            path_to_export = os.path.join(tmp_dir, "dataset_versions.ndjson")
+            under_test = EntityExport(path_to_export)
+            under_test.add_dataset_version("Q80", {"claims": []})
+            under_test.add_dataset_version("Q81", {"claims": []})
+            under_test.replace_dataset_versions(
+                [
+                    {
+                        "source_entity_code": "Q81",
+                        "dataset_version": {"claims": []},
+                        "dataset_version_entity_code": "Q91",
+                    }
+                ]
+            )
+            under_test.add_dataset_version("Q82", {"claims": []})
+            under_test.close()
+
+            self.assertEqual(
+                [
+                    dataset_version.get("dataset_version_entity_code")
+                    for dataset_version in EntityExport(
+                        path_to_export
+                    ).get_dataset_versions()
+                ],
+                ["Q91", None],
+            )
+            self.assertEqual(os.listdir(tmp_dir), ["dataset_versions.ndjson"])
+
+    def test_entity_export_with_same_sha1_hash_should_not_add_dataset_version_twice(
+        self,
+    ):
+        with TemporaryDirectory() as tmp_dir:
+            path_to_export = os.path.join(tmp_dir, "dataset_versions.ndjson")
+            first_export = EntityExport(path_to_export)
+            self.assertTrue(
+                first_export.add_dataset_version(
+                    "Q80", {"claims": []}, sha1_hash="test_sha1"
+                )
+            )
+            first_export.close()
+
+            # The export is run again before being replayed
+            under_test = EntityExport(path_to_export)
+            self.assertFalse(
+                under_test.add_dataset_version(
+                    "Q80", {"claims": []}, sha1_hash="test_sha1"
+                )
+            )
+            self.assertTrue(
+                under_test.add_dataset_version(
+                    "Q81", {"claims": []}, sha1_hash="test_sha1"
+                )
+            )
+            self.assertEqual(
+                [
+                    (
+                        dataset_version["source_entity_code"],
+                        dataset_version["sha1_hash"],
+                    )
+                    for dataset_version in under_test.get_dataset_versions()
+                ],
+                [("Q80", "test_sha1"), ("Q81", "test_sha1")],
+            )
+            under_test.close()
+
+    def test_pending_dataset_versions_should_skip_written_dataset_versions(self):
+        with TemporaryDirectory() as tmp_dir:
+            path_to_export = os.path.join(tmp_dir, "dataset_versions.ndjson")
+            first_export = EntityExport(path_to_export)
+            first_export.add_dataset_version("Q80", {"claims": []})
+            first_export.add_dataset_version("Q81", {"claims": []})
+            written_dataset_version = next(first_export.get_dataset_versions())
+            written_dataset_version["dataset_version_entity_code"] = "Q90"
+            first_export.set_written(written_dataset_version)
+            # The replay is interrupted before the export is replaced
+            first_export.close()
+
+            under_test = EntityExport(path_to_export)
+            self.assertEqual(
+                [
+                    dataset_version["source_entity_code"]
+                    for dataset_version in under_test.get_pending_dataset_versions()
+                ],
+                ["Q81"],
+            )
+            under_test.replace_dataset_versions([])
+            self.assertEqual(os.listdir(tmp_dir), ["dataset_versions.ndjson"])
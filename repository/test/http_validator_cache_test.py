@@ -0,0 +1,136 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+import os
+from repository.http_validator_cache import (
+    HttpValidatorCache,
+    ETAG,
+    LAST_MODIFIED,
+    CONTENT_LENGTH,
+    ACCEPT_RANGES,
+    SHA1_HASH,
+    ZIP_FINGERPRINT,
+    IF_NONE_MATCH_HEADER,
+    IF_MODIFIED_SINCE_HEADER,
+)
+
+TEST_ENTITY_CODE = "Q80"
+TEST_URL = "http://test.com/gtfs.zip"
+TEST_HEADERS = {
+    "ETag": '"test_etag"',
+    "Last-Modified": "Fri, 01 Jan 2021 00:00:00 GMT",
+    "Content-Length": "42",
+    "Accept-Ranges": "bytes",
+}
+
+
+class HttpValidatorCacheTest(TestCase):
+    def test_http_validator_cache_with_non_existing_file_should_be_empty(self):
+        with TemporaryDirectory() as path_to_cache:
+            under_test = HttpValidatorCache(os.path.join(path_to_cache, "cache.json"))
+            self.assertIsNone(under_test.get_validators(TEST_ENTITY_CODE, TEST_URL))
+
+    def test_http_validator_cache_set_validators_should_save_and_load(self):
+        with TemporaryDirectory() as path_to_cache:
+            test_path = os.path.join(path_to_cache, "cache", "cache.json")
+            test_cache = HttpValidatorCache(test_path)
+            test_cache.set_validators(
+                TEST_ENTITY_CODE,
+                TEST_URL,
+                TEST_HEADERS,
+                "test_sha1",
+                "test_fingerprint",
+            )
+            test_cache.save()
+
+            under_test = HttpValidatorCache(test_path).get_validators(
+                TEST_ENTITY_CODE, TEST_URL
+            )
+            self.assertEqual(
+                under_test,
+                {
+                    ETAG: '"test_etag"',
+                    LAST_MODIFIED: "Fri, 01 Jan 2021 00:00:00 GMT",
+                    CONTENT_LENGTH: "42",
+                    ACCEPT_RANGES: "bytes",
+                    SHA1_HASH: "test_sha1",
+                    ZIP_FINGERPRINT: "test_fingerprint",
+                },
+            )
+
+    def test_http_validator_cache_remove_validators(self):
+        with TemporaryDirectory() as path_to_cache:
+            under_test = HttpValidatorCache(os.path.join(path_to_cache, "cache.json"))
+            under_test.set_validators(
+                TEST_ENTITY_CODE, TEST_URL, TEST_HEADERS, "test_sha1"
+            )
+            under_test.remove_validators(TEST_ENTITY_CODE, TEST_URL)
+            self.assertIsNone(under_test.get_validators(TEST_ENTITY_CODE, TEST_URL))
+            # Removing validators that do not exist does nothing
+            under_test.remove_validators(TEST_ENTITY_CODE, TEST_URL)
+
+    def test_http_validator_cache_conditional_headers_with_known_sha1(self):
+        with TemporaryDirectory() as path_to_cache:
+            test_cache = HttpValidatorCache(os.path.join(path_to_cache, "cache.json"))
+            test_cache.set_validators(
+                TEST_ENTITY_CODE, TEST_URL, TEST_HEADERS, "test_sha1"
+            )
+
+            under_test = test_cache.get_conditional_headers(
+                TEST_ENTITY_CODE, TEST_URL, {"test_sha1"}
+            )
+            self.assertEqual(
+                under_test,
+                {
+                    IF_NONE_MATCH_HEADER: '"test_etag"',
+                    IF_MODIFIED_SINCE_HEADER: "Fri, 01 Jan 2021 00:00:00 GMT",
+                },
+            )
+
+    def test_http_validator_cache_conditional_headers_with_unknown_sha1(self):
+        with TemporaryDirectory() as path_to_cache:
+            test_cache = HttpValidatorCache(os.path.join(path_to_cache, "cache.json"))
+            test_cache.set_validators(
+                TEST_ENTITY_CODE, TEST_URL, TEST_HEADERS, "test_sha1"
+            )
+
+            under_test = test_cache.get_conditional_headers(
+                TEST_ENTITY_CODE, TEST_URL, {"other_sha1"}
+            )
+            self.assertEqual(under_test, {})
+
+    def test_http_validator_cache_zip_fingerprint_with_range_support(self):
+        with TemporaryDirectory() as path_to_cache:
+            test_cache = HttpValidatorCache(os.path.join(path_to_cache, "cache.json"))
+            test_cache.set_validators(
+                TEST_ENTITY_CODE,
+                TEST_URL,
+                TEST_HEADERS,
+                "test_sha1",
+                "test_fingerprint",
+            )
+
+            under_test = test_cache.get_zip_fingerprint(
+                TEST_ENTITY_CODE, TEST_URL, {"test_sha1"}
+            )
+            self.assertEqual(under_test, "test_fingerprint")
+
+            under_test = test_cache.get_zip_fingerprint(
+                TEST_ENTITY_CODE, TEST_URL, {"other_sha1"}
+            )
+            self.assertIsNone(under_test)
+
+    def test_http_validator_cache_zip_fingerprint_without_range_support(self):
+        with TemporaryDirectory() as path_to_cache:
+            test_cache = HttpValidatorCache(os.path.join(path_to_cache, "cache.json"))
+            test_cache.set_validators(
+                TEST_ENTITY_CODE,
+                TEST_URL,
+                {"ETag": '"test_etag"'},
+                "test_sha1",
+                "test_fingerprint",
+            )
+
+            under_test = test_cache.get_zip_fingerprint(
+                TEST_ENTITY_CODE, TEST_URL, {"test_sha1"}
+            )
+            self.assertIsNone(under_test)
@@ -0,0 +1,26 @@
+from unittest import TestCase
+from repository.sha1_index import Sha1Index
+
+
+class Sha1IndexTest(TestCase):
+    def test_sha1_index_should_find_dataset_versions_by_sha1_hash(self):
+        under_test = Sha1Index()
+        under_test.add("test_sha1_hash", "Q80", "Q81")
+        under_test.add("test_sha1_hash", "Q80", "Q81")
+        under_test.add("other_sha1_hash", "Q80", "Q82")
+
+        self.assertEqual(under_test.get_entries("test_sha1_hash"), [("Q80", "Q81")])
+        self.assertTrue(under_test.contains("test_sha1_hash"))
+        self.assertTrue(under_test.contains("test_sha1_hash", "Q80"))
+        self.assertFalse(under_test.contains("test_sha1_hash", "Q90"))
+        self.assertFalse(under_test.contains("unknown_sha1_hash"))
+        self.assertEqual(under_test.get_entries("other_sha1_hash"), [("Q80", "Q82")])
+
+    def test_sha1_index_should_find_sha1_hashes_under_several_sources(self):
+        under_test = Sha1Index()
+        under_test.add("test_sha1_hash", "Q80", "Q81")
+        under_test.add("test_sha1_hash", "Q90")
+
+        self.assertEqual(
+            under_test.get_source_entity_codes("test_sha1_hash"), {"Q80", "Q90"}
+        )
@@ -0,0 +1,338 @@
+import argparse
+import os
+from tempfile import TemporaryDirectory
+import time
+from wikibaseintegrator import wbi_core
+from wikibaseintegrator.wbi_config import config as wbi_config
+from repository.catalog_snapshot import CatalogSnapshot
+from repository.entity_export import EntityExport
+from tools.wikibase_stand_in_server import WikibaseStandInServer, ERROR_KINDS
+from usecase.extract_datasets_infos_from_database import (
+    extract_gtfs_datasets_infos_from_database,
+)
+from usecase.replay_entity_export import replay_entity_export
+from utilities.constants import (
+    ID,
+    CLAIMS,
+    MAINSNAK,
+    GTFS_CATALOG_OF_SOURCES_CODE,
+    CATALOG_PROP,
+    SOURCE_ENTITY_PROP,
+    STABLE_URL_PROP,
+    SHA1_HASH_PROP,
+    DATASET_PROP,
+    USERNAME,
+    PASSWORD,
+)
+from utilities.request_utils import create_entity_json
+from utilities.wikibase_read_client import WikibaseReadClient, DEFAULT_MAX_CONCURRENCY
+from utilities.wikibase_write_queue import DEFAULT_MAX_WRITERS
+from utilities.wikibase_write_session import WikibaseWriteSession
+
+BENCHMARK_CATALOG_CODE = "Q1"
+BENCHMARK_ENV = {
+    GTFS_CATALOG_OF_SOURCES_CODE: BENCHMARK_CATALOG_CODE,
+    CATALOG_PROP: "P1",
+    SOURCE_ENTITY_PROP: "P2",
+    STABLE_URL_PROP: "P3",
+    SHA1_HASH_PROP: "P4",
+    DATASET_PROP: "P5",
+    USERNAME: "benchmark_username",
+    PASSWORD: "benchmark_password",
+}
+DEFAULT_SOURCE_COUNT = 100
+DEFAULT_VERSIONS_PER_SOURCE = 3
+DEFAULT_WRITE_COUNT = 100
+
+
+def create_benchmark_entity(entity_code, claims, label=""):
+    """Create the JSON representation of an entity, in the format of a wbgetentities response.
+    :param entity_code: The entity code of the entity.
+    :param claims: The claims of the entity, as Wikibase Integrator data types.
+    :param label: The English label of the entity.
+    :return: The JSON representation of the entity.
+    """
+    entity_json = create_entity_json(claims, label)
+    entity_json[ID] = entity_code
+    claims = {}
+    for claim in entity_json[CLAIMS]:
+        claims.setdefault(claim[MAINSNAK]["property"], []).append(claim)
+    entity_json[CLAIMS] = claims
+    return entity_json
+
+
+def create_benchmark_entities(source_count, versions_per_source):
+    """Create a catalog of sources with their dataset versions, using the properties of the environment.
+    :param source_count: The number of sources of the catalog.
+    :param versions_per_source: The number of dataset versions of each source.
+    :return: The JSON representation of the entities of the catalog by entity code.
+    """
+    catalog_code = os.environ[GTFS_CATALOG_OF_SOURCES_CODE]
+    entities = {catalog_code: create_benchmark_entity(catalog_code, [])}
+    item_number = int(catalog_code[1:])
+    for source_index in range(source_count):
+        item_number += 1
+        source_code = f"Q{item_number}"
+        version_codes = []
+        for version_index in range(versions_per_source):
+            item_number += 1
+            version_code = f"Q{item_number}"
+            version_codes.append(version_code)
+            entities[version_code] = create_benchmark_entity(
+                version_code,
+                [
+                    wbi_core.ItemID(
+                        value=source_code, prop_nr=os.environ[SOURCE_ENTITY_PROP]
+                    ),
+                    wbi_core.String(
+                        value=f"{source_index:020d}{version_index:020d}",
+                        prop_nr=os.environ[SHA1_HASH_PROP],
+                    ),
+                ],
+            )
+        entities[source_code] = create_benchmark_entity(
+            source_code,
+            [
+                wbi_core.ItemID(value=catalog_code, prop_nr=os.environ[CATALOG_PROP]),
+                wbi_core.String(
+                    value=f"http://benchmark.mobilitydatabase.org/{source_code}.zip",
+                    prop_nr=os.environ[STABLE_URL_PROP],
+                ),
+            ]
+            + [
+                wbi_core.ItemID(value=version_code, prop_nr=os.environ[DATASET_PROP])
+                for version_code in version_codes
+            ],
+            f"benchmark_source_{source_index}",
+        )
+    return entities
+
+
+def benchmark_extraction(path_to_data, read_client):
+    """Measure the extraction of the datasets infos, first loading the catalog snapshot, then refreshing it.
+    :param path_to_data: The path to the folder where to keep the catalog snapshot.
+    :param read_client: The WikibaseReadClient fetching the items.
+    :return: The DatasetInfos extracted, the load duration and the refresh duration in seconds.
+    """
+    catalog_snapshot = CatalogSnapshot(os.path.join(path_to_data, "catalog.sqlite"))
+    start_time = time.perf_counter()
+    datasets_infos = extract_gtfs_datasets_infos_from_database(
+        catalog_snapshot, read_client
+    )
+    load_duration = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    extract_gtfs_datasets_infos_from_database(catalog_snapshot, read_client)
+    refresh_duration = time.perf_counter() - start_time
+    catalog_snapshot.close()
+    return datasets_infos, load_duration, refresh_duration
+
+
+def benchmark_writes(
+    path_to_data, write_session, source_entity_codes, write_count, max_writers
+):
+    """Measure the creation of dataset versions and their links to their source, replayed from an entity export.
+    :param path_to_data: The path to the folder where to keep the entity export.
+    :param write_session: The WikibaseWriteSession shared by the writes.
+    :param source_entity_codes: The entity codes of the sources of the dataset versions.
+    :param write_count: The number of dataset versions to create.
+    :param max_writers: The number of concurrent writers.
+    :return: The number of dataset versions which could not be written, and the duration in seconds.
+    """
+    entity_export = EntityExport(os.path.join(path_to_data, "entity_export.ndjson"))
+    for index in range(write_count):
+        source_entity_code = source_entity_codes[index % len(source_entity_codes)]
+        sha1_hash = f"benchmark_sha1_hash_{index}"
+        entity_export.add_dataset_version(
+            source_entity_code,
+            create_entity_json(
+                [
+                    wbi_core.ItemID(
+                        value=source_entity_code,
+                        prop_nr=os.environ[SOURCE_ENTITY_PROP],
+                    ),
+                    wbi_core.String(
+                        value=sha1_hash, prop_nr=os.environ[SHA1_HASH_PROP]
+                    ),
+                ],
+                f"benchmark_dataset_version_{index}",
+            ),
+            sha1_hash=sha1_hash,
+        )
+
+    start_time = time.perf_counter()
+    failed_dataset_versions = replay_entity_export(
+        entity_export, write_session, max_writers=max_writers
+    )
+    duration = time.perf_counter() - start_time
+    entity_export.close()
+    return len(failed_dataset_versions), duration
+
+
+def run_benchmark(
+    server,
+    max_read_concurrency=DEFAULT_MAX_CONCURRENCY,
+    write_count=DEFAULT_WRITE_COUNT,
+    max_writers=DEFAULT_MAX_WRITERS,
+):
+    """Measure the extraction and the write throughput against a Wikibase stand-in server.
+    :param server: The started WikibaseStandInServer.
+    :param max_read_concurrency: The maximum number of read requests in flight.
+    :param write_count: The number of dataset versions to create.
+    :param max_writers: The number of concurrent writers.
+    :return: A dictionary with the measures of the benchmark.
+    """
+    wbi_config["MEDIAWIKI_API_URL"] = server.mediawiki_api_url
+    wbi_config["SPARQL_ENDPOINT_URL"] = server.sparql_endpoint_url
+
+    with TemporaryDirectory() as path_to_data:
+        read_client = WikibaseReadClient(
+            server.mediawiki_api_url, max_concurrency=max_read_concurrency
+        )
+        datasets_infos, load_duration, refresh_duration = benchmark_extraction(
+            path_to_data, read_client
+        )
+        read_client.close()
+
+        failed_count, write_duration = 0, 0
+        if datasets_infos and write_count:
+            write_session = WikibaseWriteSession(
+                os.environ[USERNAME], os.environ[PASSWORD], server.mediawiki_api_url
+            )
+            failed_count, write_duration = benchmark_writes(
+                path_to_data,
+                write_session,
+                [dataset_infos.entity_code for dataset_infos in datasets_infos],
+                write_count,
+                max_writers,
+            )
+            write_session.close()
+
+    return {
+        "source_count": len(datasets_infos),
+        "load_duration": load_duration,
+        "refresh_duration": refresh_duration,
+        "written_count": write_count - failed_count if datasets_infos else 0,
+        "failed_count": failed_count,
+        "write_duration": write_duration,
+        "request_counts": server.get_request_counts(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the extraction and the writes against a Wikibase stand-in server"
+    )
+    parser.add_argument(
+        "--path-to-fixture",
+        action="store",
+        default=None,
+        help="Path to the JSON file with the entities of the catalog, in the format of a wbgetentities response. "
+        "The environment variables must give its catalog and properties. "
+        "A catalog is generated with the properties of the benchmark if None.",
+    )
+    parser.add_argument(
+        "--source-count",
+        action="store",
+        type=int,
+        default=DEFAULT_SOURCE_COUNT,
+        help="Number of sources of the generated catalog.",
+    )
+    parser.add_argument(
+        "--versions-per-source",
+        action="store",
+        type=int,
+        default=DEFAULT_VERSIONS_PER_SOURCE,
+        help="Number of dataset versions of each source of the generated catalog.",
+    )
+    parser.add_argument(
+        "--latency",
+        action="store",
+        type=float,
+        default=0,
+        help="Number of seconds every request waits before being answered.",
+    )
+    parser.add_argument(
+        "--error-rate",
+        action="store",
+        type=float,
+        default=0,
+        help="Probability of a request to fail with an injected error.",
+    )
+    parser.add_argument(
+        "--error-kinds",
+        action="store",
+        nargs="+",
+        choices=ERROR_KINDS,
+        default=None,
+        help="Kinds of the injected errors.",
+    )
+    parser.add_argument(
+        "--max-read-concurrency",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Maximum number of read requests in flight.",
+    )
+    parser.add_argument(
+        "--write-count",
+        action="store",
+        type=int,
+        default=DEFAULT_WRITE_COUNT,
+        help="Number of dataset versions to create.",
+    )
+    parser.add_argument(
+        "--max-writers",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_WRITERS,
+        help="Number of concurrent writers.",
+    )
+    parser.add_argument(
+        "--seed",
+        action="store",
+        type=int,
+        default=None,
+        help="Seed of the random injection of errors.",
+    )
+    args = parser.parse_args()
+
+    server_kwargs = {
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "error_kinds": args.error_kinds,
+        "seed": args.seed,
+    }
+    if args.path_to_fixture is not None:
+        server = WikibaseStandInServer.from_fixture(
+            args.path_to_fixture, **server_kwargs
+        )
+    else:
+        os.environ.update(BENCHMARK_ENV)
+        server = WikibaseStandInServer(
+            entities=create_benchmark_entities(
+                args.source_count, args.versions_per_source
+            ),
+            **server_kwargs,
+        )
+
+    server.start()
+    try:
+        measures = run_benchmark(
+            server, args.max_read_concurrency, args.write_count, args.max_writers
+        )
+    finally:
+        server.stop()
+
+    print(
+        f"Extraction of {measures['source_count']} sources: "
+        f"loaded in {measures['load_duration']:.3f} seconds, "
+        f"refreshed in {measures['refresh_duration']:.3f} seconds"
+    )
+    write_duration = measures["write_duration"]
+    throughput = measures["written_count"] / write_duration if write_duration else 0
+    print(
+        f"Writes: {measures['written_count']} dataset versions written, {measures['failed_count']} failed, "
+        f"in {write_duration:.3f} seconds, {throughput:.1f} dataset versions per second"
+    )
+    print(f"Requests: {measures['request_counts']}")
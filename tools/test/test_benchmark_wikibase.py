@@ -0,0 +1,32 @@
+import os
+from unittest import TestCase, mock
+from wikibaseintegrator.wbi_config import config as wbi_config
+from tools.benchmark_wikibase import (
+    BENCHMARK_ENV,
+    create_benchmark_entities,
+    run_benchmark,
+)
+from tools.wikibase_stand_in_server import WikibaseStandInServer
+
+
+class TestBenchmarkWikibase(TestCase):
+    @mock.patch.dict(wbi_config)
+    @mock.patch.dict(os.environ, BENCHMARK_ENV)
+    def test_run_benchmark_should_extract_sources_and_write_dataset_versions(self):
+        test_entities = create_benchmark_entities(3, 2)
+        self.assertEqual(len(test_entities), 10)
+        self.assertEqual(sorted(test_entities["Q2"]["claims"]), ["P1", "P3", "P5"])
+        self.assertEqual(len(test_entities["Q2"]["claims"]["P5"]), 2)
+
+        server = WikibaseStandInServer(entities=test_entities).start()
+        try:
+            under_test = run_benchmark(server, write_count=4, max_writers=2)
+        finally:
+            server.stop()
+
+        self.assertEqual(under_test["source_count"], 3)
+        self.assertEqual(under_test["written_count"], 4)
+        self.assertEqual(under_test["failed_count"], 0)
+        # Each dataset version is created, then linked to its source
+        self.assertEqual(under_test["request_counts"]["wbeditentity"], 8)
+        self.assertEqual(len(server.get_entity("Q2")["claims"]["P5"]), 4)
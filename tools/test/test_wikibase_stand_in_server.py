@@ -0,0 +1,152 @@
+import asyncio
+import os
+from unittest import TestCase, mock
+from wikibaseintegrator import wbi_core
+from wikibaseintegrator.wbi_config import config as wbi_config
+from utilities.constants import (
+    CATALOG_PROP,
+    SOURCE_ENTITY_PROP,
+    STABLE_URL_PROP,
+    SHA1_HASH_PROP,
+    DATASET_PROP,
+)
+from utilities.request_utils import (
+    create_entity_json,
+    extract_catalog_infos,
+    extract_dataset_version_sha1_hashes,
+    extract_source_entity_codes,
+)
+from utilities.wikibase_read_client import WikibaseReadClient
+from tools.wikibase_stand_in_server import WikibaseStandInServer
+from utilities.wikibase_write_session import WikibaseWriteSession
+
+TEST_ENV = {
+    CATALOG_PROP: "P1",
+    SOURCE_ENTITY_PROP: "P2",
+    STABLE_URL_PROP: "P3",
+    SHA1_HASH_PROP: "P4",
+    DATASET_PROP: "P5",
+}
+
+
+def create_test_entity(entity_code, claims, label=""):
+    entity_json = create_entity_json(claims, label)
+    entity_json["id"] = entity_code
+    entity_json["claims"] = {
+        claim["mainsnak"]["property"]: [claim] for claim in entity_json["claims"]
+    }
+    return entity_json
+
+
+def create_test_entities():
+    return {
+        "Q1": create_test_entity("Q1", []),
+        "Q2": create_test_entity(
+            "Q2",
+            [
+                wbi_core.ItemID(value="Q1", prop_nr="P1"),
+                wbi_core.String(value="http://test.com/q2.zip", prop_nr="P3"),
+            ],
+            "test_source_2",
+        ),
+        "Q3": create_test_entity(
+            "Q3",
+            [
+                wbi_core.ItemID(value="Q1", prop_nr="P1"),
+                wbi_core.String(value="http://test.com/q3.zip", prop_nr="P3"),
+            ],
+            "test_source_3",
+        ),
+        "Q4": create_test_entity(
+            "Q4",
+            [
+                wbi_core.ItemID(value="Q2", prop_nr="P2"),
+                wbi_core.String(value="test_sha1_hash", prop_nr="P4"),
+            ],
+        ),
+    }
+
+
+class TestWikibaseStandInServer(TestCase):
+    def setUp(self):
+        self.server = WikibaseStandInServer(entities=create_test_entities()).start()
+        self.env_patcher = mock.patch.dict(os.environ, TEST_ENV)
+        self.config_patcher = mock.patch.dict(
+            wbi_config,
+            {
+                "MEDIAWIKI_API_URL": self.server.mediawiki_api_url,
+                "SPARQL_ENDPOINT_URL": self.server.sparql_endpoint_url,
+            },
+        )
+        self.env_patcher.start()
+        self.config_patcher.start()
+
+    def tearDown(self):
+        self.config_patcher.stop()
+        self.env_patcher.stop()
+        self.server.stop()
+
+    def test_stand_in_with_invalid_error_rate_should_raise_exception(self):
+        self.assertRaises(TypeError, WikibaseStandInServer, error_rate=2)
+
+    def test_sparql_queries_should_answer_from_catalog(self):
+        self.assertEqual(sorted(extract_source_entity_codes("Q1")), ["Q2", "Q3"])
+        self.assertEqual(
+            extract_catalog_infos("Q1"),
+            {
+                "Q2": {
+                    "label": "test_source_2",
+                    "url": ["http://test.com/q2.zip"],
+                    "sha1": {"test_sha1_hash"},
+                },
+                "Q3": {
+                    "label": "test_source_3",
+                    "url": ["http://test.com/q3.zip"],
+                    "sha1": set(),
+                },
+            },
+        )
+        self.assertEqual(
+            extract_dataset_version_sha1_hashes(), [("test_sha1_hash", "Q2", "Q4")]
+        )
+
+    def test_read_client_should_retry_injected_errors(self):
+        self.server.inject_errors("maxlag")
+        self.server.inject_errors("unavailable")
+        read_client = WikibaseReadClient(self.server.mediawiki_api_url)
+
+        entities_json = asyncio.run(read_client.get_entities_json(["Q2", "Q9"]))
+        read_client.close()
+        self.assertEqual(entities_json["Q2"]["labels"]["en"]["value"], "test_source_2")
+        self.assertEqual(entities_json["Q9"], {})
+        self.assertEqual(self.server.get_request_counts()["wbgetentities"], 3)
+
+    def test_write_session_should_create_and_link_entities(self):
+        write_session = WikibaseWriteSession(
+            "test_username", "test_password", self.server.mediawiki_api_url
+        )
+        self.server.inject_errors("badtoken")
+
+        version_entity_code = write_session.edit_entity(
+            create_entity_json(
+                [
+                    wbi_core.ItemID(value="Q3", prop_nr="P2"),
+                    wbi_core.String(value="test_new_sha1_hash", prop_nr="P4"),
+                ],
+                "test_version",
+            )
+        )
+        link = wbi_core.ItemID(value=version_entity_code, prop_nr="P5")
+        link.set_id("Q3$00000000-0000-0000-0000-000000000001")
+        for _ in range(2):
+            write_session.edit_entity(create_entity_json([link]), "Q3")
+        write_session.close()
+
+        self.assertEqual(version_entity_code, "Q5")
+        self.assertEqual(write_session.get_login_count(), 1)
+        self.assertEqual(len(self.server.get_entity("Q3")["claims"]["P5"]), 1)
+        self.assertEqual(len(self.server.get_entity("Q3")["claims"]["P3"]), 1)
+        self.assertIn(
+            ("test_new_sha1_hash", "Q3", "Q5"), extract_dataset_version_sha1_hashes()
+        )
+        self.assertEqual(self.server.get_request_counts()["wbeditentity"], 4)
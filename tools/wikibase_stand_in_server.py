@@ -0,0 +1,746 @@
+import argparse
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+from threading import Lock, Thread
+import time
+from urllib.parse import parse_qs, urlparse
+import uuid
+from utilities.constants import (
+    ID,
+    ENTITY,
+    ENTITIES,
+    MISSING,
+    LASTREVID,
+    CLAIMS,
+    MAINSNAK,
+    DATAVALUE,
+    VALUE,
+    LABELS,
+    LANGUAGE,
+    RESULTS,
+    BINDINGS,
+    SVC_URL,
+    SVC_ENTITY_URL_PATH,
+    RDFS_LABEL_URL,
+)
+
+API_PATH = "/w/api.php"
+SPARQL_PATH = "/sparql"
+SESSION_COOKIE = "standin_session"
+ANONYMOUS_EDIT_TOKEN = "+\\"
+
+MAXLAG_ERROR = "maxlag"
+SERVICE_UNAVAILABLE_ERROR = "unavailable"
+BADTOKEN_ERROR = "badtoken"
+ERROR_KINDS = [MAXLAG_ERROR, SERVICE_UNAVAILABLE_ERROR, BADTOKEN_ERROR]
+# Actions of the MediaWiki API which need a CSRF token
+WRITE_ACTIONS = ["wbeditentity"]
+LOGIN_ACTIONS = ["clientlogin", "login"]
+
+SPARQL_TOKEN_REGEX = re.compile(
+    r'FILTER\s*\(\s*LANG\s*\(\s*\?\w+\s*\)\s*=\s*"[^"]*"\s*\)|UNION|\?\w+|<[^>]*>(?:/<[^>]*>)?|[{}.]',
+    re.IGNORECASE,
+)
+SPARQL_FILTER_REGEX = re.compile(r'\?(\w+)\s*\)\s*=\s*"([^"]*)"')
+SPARQL_SELECT_REGEX = re.compile(r"SELECT\s+(.*?)\s+WHERE", re.IGNORECASE | re.DOTALL)
+SPARQL_ORDER_BY_REGEX = re.compile(
+    r"ORDER\s+BY\s+((?:\?\w+\s*)+)", re.IGNORECASE | re.DOTALL
+)
+SPARQL_LIMIT_REGEX = re.compile(r"LIMIT\s+(\d+)", re.IGNORECASE)
+SPARQL_OFFSET_REGEX = re.compile(r"OFFSET\s+(\d+)", re.IGNORECASE)
+PROPERTY_PATH_REGEX = re.compile(r"^<[^>]*/prop/(P[0-9]+)>/<[^>]*/prop/statement/\1>$")
+STATEMENT_PATH_REGEX = re.compile(r"^<[^>]*/prop/statement/(P[0-9]+)>$")
+ENTITY_URI_REGEX = re.compile(r"^<[^>]*/entity/(Q[0-9]+)>$")
+ITEM_CODE_REGEX = re.compile(r"^Q([0-9]+)$")
+
+
+class WikibaseStandInServer:
+    def __init__(
+        self,
+        entities=None,
+        host="127.0.0.1",
+        port=0,
+        latency=0,
+        error_rate=0,
+        error_kinds=None,
+        retry_after=0,
+        seed=None,
+    ):
+        """Constructor for ``WikibaseStandInServer``.
+        The server stands in for the Wikibase instance in benchmarks and end-to-end tests. It serves the MediaWiki API
+        actions used by the project, login, tokens, wbgetentities, wbeditentity and recent changes, and a SPARQL
+        endpoint answering the basic graph patterns of the project queries, from a catalog of entities kept in memory.
+        Every request waits `latency` seconds, and fails with one of `error_kinds` with probability `error_rate`,
+        to measure the extraction and the write throughput under realistic conditions.
+        :param entities: The JSON representation of the entities of the catalog by entity code,
+        as returned by wbgetentities.
+        :param host: The host of the server.
+        :param port: The port of the server, a free port if 0.
+        :param latency: The number of seconds every request waits before being answered.
+        :param error_rate: The probability of a request to fail with an injected error.
+        :param error_kinds: The kinds of injected errors among maxlag, unavailable and badtoken, all of them if None.
+        :param retry_after: The number of seconds of the Retry-After header of the maxlag and unavailable errors.
+        :param seed: The seed of the random injection of errors.
+        """
+        if not 0 <= error_rate <= 1:
+            raise TypeError("Error rate must be a valid probability.")
+        error_kinds = error_kinds if error_kinds is not None else ERROR_KINDS
+        if any(error_kind not in ERROR_KINDS for error_kind in error_kinds):
+            raise TypeError(f"Error kinds must be among {ERROR_KINDS}.")
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_kinds = list(error_kinds)
+        self.retry_after = retry_after
+
+        self.__lock = Lock()
+        self.__random = random.Random(seed)
+        self.__entities = {}
+        self.__revision_id = 0
+        self.__recent_changes = []
+        self.__sessions = {}
+        self.__injected_errors = []
+        self.__request_counts = {}
+        for entity_code, entity_json in (entities or {}).items():
+            self.__entities[entity_code] = json.loads(json.dumps(entity_json))
+            self.__revision_id = max(self.__revision_id, entity_json.get(LASTREVID, 0))
+
+        self.__http_server = ThreadingHTTPServer((host, port), WikibaseStandInHandler)
+        self.__http_server.daemon_threads = True
+        self.__http_server.stand_in = self
+        self.__thread = None
+
+    @classmethod
+    def from_fixture(cls, path_to_fixture, **kwargs):
+        """Create a server from a fixture catalog.
+        :param path_to_fixture: Path to a JSON file with the entities of the catalog, in the format of
+        a wbgetentities response.
+        :param kwargs: The keyword arguments of the ``WikibaseStandInServer`` constructor.
+        :return: The WikibaseStandInServer.
+        """
+        with open(path_to_fixture) as f:
+            fixture = json.load(f)
+        return cls(entities=fixture.get(ENTITIES, {}), **kwargs)
+
+    @property
+    def mediawiki_api_url(self):
+        host, port = self.__http_server.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    @property
+    def sparql_endpoint_url(self):
+        host, port = self.__http_server.server_address[:2]
+        return f"http://{host}:{port}{SPARQL_PATH}"
+
+    def start(self):
+        """Serve the requests from a background thread.
+        :return: The WikibaseStandInServer.
+        """
+        self.__thread = Thread(target=self.__http_server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving the requests and close the socket of the server."""
+        self.__http_server.shutdown()
+        self.__http_server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def inject_errors(self, error_kind, count=1):
+        """Make the next requests which can fail with an error fail with it, whatever the error rate.
+        :param error_kind: The kind of error among maxlag, unavailable and badtoken.
+        :param count: The number of requests to fail.
+        """
+        if error_kind not in ERROR_KINDS:
+            raise TypeError(f"Error kind must be among {ERROR_KINDS}.")
+        with self.__lock:
+            self.__injected_errors.extend([error_kind] * count)
+
+    def get_entity(self, entity_code):
+        """
+        :param entity_code: The entity code of an entity.
+        :return: The JSON representation of the entity, None if it is not in the catalog.
+        """
+        with self.__lock:
+            entity_json = self.__entities.get(entity_code)
+            return json.loads(json.dumps(entity_json)) if entity_json else None
+
+    def get_request_counts(self):
+        """
+        :return: The number of requests served by MediaWiki API action, and of SPARQL queries under "sparql".
+        """
+        with self.__lock:
+            return dict(self.__request_counts)
+
+    def count_request(self, action):
+        with self.__lock:
+            self.__request_counts[action] = self.__request_counts.get(action, 0) + 1
+
+    def draw_error(self, action, params):
+        """Draw the error to inject in a request, if any.
+        Like on the Wikibase instance, a maxlag error only answers a request with a maxlag parameter,
+        and a badtoken error a write request. The login requests are not failed.
+        :param action: The MediaWiki API action of the request, "sparql" for a SPARQL query.
+        :param params: The parameters of the request.
+        :return: The kind of error to inject, None if the request must succeed.
+        """
+        if action in LOGIN_ACTIONS or params.get("meta") == "tokens":
+            return None
+        possible_errors = [SERVICE_UNAVAILABLE_ERROR]
+        if "maxlag" in params:
+            possible_errors.append(MAXLAG_ERROR)
+        if action in WRITE_ACTIONS:
+            possible_errors.append(BADTOKEN_ERROR)
+        with self.__lock:
+            for index, error_kind in enumerate(self.__injected_errors):
+                if error_kind in possible_errors:
+                    return self.__injected_errors.pop(index)
+            possible_errors = [
+                error_kind
+                for error_kind in possible_errors
+                if error_kind in self.error_kinds
+            ]
+            if possible_errors and self.__random.random() < self.error_rate:
+                return self.__random.choice(possible_errors)
+        return None
+
+    def create_session(self):
+        """
+        :return: The ID of a new session of the MediaWiki API.
+        """
+        with self.__lock:
+            session_id = uuid.uuid4().hex
+            self.__sessions[session_id] = {"user": None, "csrf_token": None}
+            return session_id
+
+    def login(self, session_id, username):
+        with self.__lock:
+            session = self.__sessions.setdefault(session_id, {"csrf_token": None})
+            session["user"] = username
+
+    def get_csrf_token(self, session_id):
+        """
+        :param session_id: The ID of a session of the MediaWiki API.
+        :return: A new CSRF token of the session, the anonymous token if the session is not logged in.
+        """
+        with self.__lock:
+            session = self.__sessions.get(session_id)
+            if session is None or session["user"] is None:
+                return ANONYMOUS_EDIT_TOKEN
+            session["csrf_token"] = f"{uuid.uuid4().hex}+\\"
+            return session["csrf_token"]
+
+    def is_valid_csrf_token(self, session_id, csrf_token):
+        with self.__lock:
+            session = self.__sessions.get(session_id)
+            return (
+                session is not None
+                and session["csrf_token"] is not None
+                and session["csrf_token"] == csrf_token
+            )
+
+    def revoke_csrf_token(self, session_id):
+        with self.__lock:
+            if session_id in self.__sessions:
+                self.__sessions[session_id]["csrf_token"] = None
+
+    def get_entities(self, entity_codes):
+        """
+        :param entity_codes: The entity codes of the entities to get.
+        :return: The wbgetentities response for the entities.
+        """
+        with self.__lock:
+            return {
+                ENTITIES: {
+                    entity_code: (
+                        json.loads(json.dumps(self.__entities[entity_code]))
+                        if entity_code in self.__entities
+                        else {ID: entity_code, MISSING: ""}
+                    )
+                    for entity_code in entity_codes
+                }
+            }
+
+    def edit_entity(self, entity_json, entity_code=None):
+        """Create or edit an entity like wbeditentity, adding the labels and the claims of the request.
+        A claim with the ID of a claim of the entity replaces it, the other claims are added.
+        :param entity_json: The labels and the claims to add, in the Wikibase JSON format.
+        :param entity_code: The entity code of the entity to edit, None to create a new item.
+        :return: The JSON representation of the entity written, None if the entity to edit does not exist.
+        """
+        with self.__lock:
+            if entity_code is None:
+                entity_code = f"Q{self.get_next_item_number()}"
+                self.__entities[entity_code] = {
+                    "type": "item",
+                    ID: entity_code,
+                    LABELS: {},
+                    CLAIMS: {},
+                }
+            entity = self.__entities.get(entity_code)
+            if entity is None:
+                return None
+
+            entity.setdefault(LABELS, {}).update(entity_json.get(LABELS, {}))
+            claims = entity_json.get(CLAIMS, [])
+            if isinstance(claims, dict):
+                claims = [claim for values in claims.values() for claim in values]
+            for claim in claims:
+                claim = json.loads(json.dumps(claim))
+                property_code = claim[MAINSNAK]["property"]
+                claim.setdefault(ID, f"{entity_code}${uuid.uuid4()}")
+                property_claims = entity.setdefault(CLAIMS, {}).setdefault(
+                    property_code, []
+                )
+                claim_ids = [
+                    property_claim.get(ID) for property_claim in property_claims
+                ]
+                if claim[ID] in claim_ids:
+                    property_claims[claim_ids.index(claim[ID])] = claim
+                else:
+                    property_claims.append(claim)
+
+            self.__revision_id += 1
+            entity[LASTREVID] = self.__revision_id
+            self.__recent_changes.append(
+                {
+                    "title": f"Item:{entity_code}",
+                    "revid": self.__revision_id,
+                    "timestamp": datetime.now(timezone.utc).strftime(
+                        "%Y-%m-%dT%H:%M:%SZ"
+                    ),
+                }
+            )
+            return json.loads(json.dumps(entity))
+
+    def get_next_item_number(self):
+        item_numbers = [
+            int(match.group(1))
+            for match in map(ITEM_CODE_REGEX.match, self.__entities)
+            if match is not None
+        ]
+        return max(item_numbers, default=0) + 1
+
+    def get_recent_changes(self, since):
+        """
+        :param since: The timestamp from which to get the changes, in the MediaWiki API ISO 8601 format.
+        :return: The recent changes since the timestamp, the oldest first.
+        """
+        with self.__lock:
+            return [
+                dict(change)
+                for change in self.__recent_changes
+                if since is None or change["timestamp"] >= since
+            ]
+
+    def execute_sparql_query(self, sparql_query):
+        """Answer a SPARQL query made of triple patterns, UNION groups and language filters,
+        with ORDER BY, LIMIT and OFFSET clauses, from the claims and the labels of the catalog.
+        :param sparql_query: The SPARQL query.
+        :return: The SPARQL JSON results of the query.
+        """
+        select_match = SPARQL_SELECT_REGEX.search(sparql_query)
+        where_index = select_match.end()
+        body = sparql_query[
+            sparql_query.index("{", where_index) + 1 : sparql_query.rindex("}")
+        ]
+        tokens = SPARQL_TOKEN_REGEX.findall(body)
+        group, _ = parse_sparql_group(tokens, 0)
+
+        with self.__lock:
+            solutions = evaluate_sparql_group(group, {}, self.__entities)
+
+        order_by_match = SPARQL_ORDER_BY_REGEX.search(
+            sparql_query, sparql_query.rindex("}")
+        )
+        if order_by_match is not None:
+            order_by = [
+                variable.strip("?") for variable in order_by_match.group(1).split()
+            ]
+            solutions.sort(
+                key=lambda solution: [
+                    solution[variable][VALUE] if variable in solution else ""
+                    for variable in order_by
+                ]
+            )
+        offset_match = SPARQL_OFFSET_REGEX.search(
+            sparql_query, sparql_query.rindex("}")
+        )
+        limit_match = SPARQL_LIMIT_REGEX.search(sparql_query, sparql_query.rindex("}"))
+        offset = int(offset_match.group(1)) if offset_match is not None else 0
+        limit = int(limit_match.group(1)) if limit_match is not None else None
+        solutions = solutions[offset : offset + limit if limit is not None else None]
+
+        selection = select_match.group(1).strip()
+        if selection == "*":
+            variables = sorted(
+                {variable for solution in solutions for variable in solution}
+            )
+        else:
+            variables = [variable.strip("?") for variable in selection.split()]
+        return {
+            "head": {"vars": variables},
+            RESULTS: {
+                BINDINGS: [
+                    {
+                        variable: solution[variable]
+                        for variable in variables
+                        if variable in solution
+                    }
+                    for solution in solutions
+                ]
+            },
+        }
+
+
+class WikibaseStandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.handle_request(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        params = parse_qs(urlparse(self.path).query)
+        content_length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(content_length).decode()
+        params.update(parse_qs(body))
+        self.handle_request(params)
+
+    def handle_request(self, params):
+        stand_in = self.server.stand_in
+        self.new_session_id = None
+        params = {key: values[-1] for key, values in params.items()}
+        path = urlparse(self.path).path
+        if path == SPARQL_PATH:
+            action = "sparql"
+        elif path == API_PATH:
+            action = params.get("action", "")
+        else:
+            self.send_json({"error": {"code": "notfound"}}, status=404)
+            return
+
+        stand_in.count_request(action)
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+        session_id = self.get_session_id()
+
+        error_kind = stand_in.draw_error(action, params)
+        if error_kind == SERVICE_UNAVAILABLE_ERROR:
+            self.send_json(
+                {"error": {"code": "unavailable"}},
+                status=503,
+                headers={"Retry-After": str(stand_in.retry_after)},
+            )
+            return
+        if error_kind == MAXLAG_ERROR:
+            self.send_json(
+                {
+                    "error": {
+                        "code": MAXLAG_ERROR,
+                        "info": "Waiting for replicas",
+                        "lag": stand_in.retry_after,
+                    }
+                },
+                headers={"Retry-After": str(stand_in.retry_after)},
+            )
+            return
+        if error_kind == BADTOKEN_ERROR:
+            stand_in.revoke_csrf_token(session_id)
+
+        if action == "sparql":
+            self.send_json(stand_in.execute_sparql_query(params.get("query", "")))
+        elif action == "query":
+            self.handle_query(params, session_id)
+        elif action in LOGIN_ACTIONS:
+            username = params.get("username", params.get("lgname"))
+            stand_in.login(session_id, username)
+            if action == "clientlogin":
+                self.send_json(
+                    {"clientlogin": {"status": "PASS", "username": username}}
+                )
+            else:
+                self.send_json({"login": {"result": "Success", "lgusername": username}})
+        elif action == "wbgetentities":
+            self.send_json(stand_in.get_entities(params.get("ids", "").split("|")))
+        elif action == "wbeditentity":
+            self.handle_edit_entity(params, session_id)
+        else:
+            self.send_json({"error": {"code": "badvalue", "info": action}})
+
+    def handle_query(self, params, session_id):
+        stand_in = self.server.stand_in
+        if params.get("meta") == "tokens":
+            if params.get("type") == "login":
+                tokens = {"logintoken": f"{uuid.uuid4().hex}+\\"}
+            else:
+                tokens = {"csrftoken": stand_in.get_csrf_token(session_id)}
+            self.send_json({"query": {"tokens": tokens}})
+        elif params.get("list") == "recentchanges":
+            self.send_json(
+                {
+                    "query": {
+                        "recentchanges": stand_in.get_recent_changes(
+                            params.get("rcstart")
+                        )
+                    }
+                }
+            )
+        else:
+            self.send_json({"query": {}})
+
+    def handle_edit_entity(self, params, session_id):
+        stand_in = self.server.stand_in
+        if not stand_in.is_valid_csrf_token(session_id, params.get("token")):
+            self.send_json(
+                {"error": {"code": BADTOKEN_ERROR, "info": "Invalid CSRF token."}}
+            )
+            return
+        entity_json = stand_in.edit_entity(
+            json.loads(params.get("data", "{}")), params.get("id")
+        )
+        if entity_json is None:
+            self.send_json(
+                {"error": {"code": "no-such-entity", "id": params.get("id")}}
+            )
+            return
+        self.send_json({ENTITY: entity_json, "success": 1})
+
+    def get_session_id(self):
+        for cookie in self.headers.get_all("Cookie") or []:
+            for item in cookie.split(";"):
+                name, _, value = item.strip().partition("=")
+                if name == SESSION_COOKIE:
+                    return value
+        self.new_session_id = self.server.stand_in.create_session()
+        return self.new_session_id
+
+    def send_json(self, json_response, status=200, headers=None):
+        body = json.dumps(json_response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if getattr(self, "new_session_id", None) is not None:
+            self.send_header(
+                "Set-Cookie", f"{SESSION_COOKIE}={self.new_session_id}; Path=/"
+            )
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # The requests are counted instead of logged, to keep the benchmark output readable
+        pass
+
+
+def parse_sparql_group(tokens, index):
+    """Parse the triple patterns, the UNION groups and the language filters of a SPARQL group.
+    :param tokens: The tokens of the SPARQL query.
+    :param index: The index of the first token of the group, after its opening brace.
+    :return: The group, and the index of the token following the group.
+    """
+    group = {"triples": [], "unions": [], "filters": []}
+    terms = []
+    while index < len(tokens):
+        token = tokens[index]
+        if token == "}":
+            return group, index + 1
+        if token == "{":
+            union = []
+            subgroup, index = parse_sparql_group(tokens, index + 1)
+            union.append(subgroup)
+            while index < len(tokens) and tokens[index].upper() == "UNION":
+                subgroup, index = parse_sparql_group(tokens, index + 2)
+                union.append(subgroup)
+            group["unions"].append(union)
+            continue
+        if token.upper().startswith("FILTER"):
+            variable, language = SPARQL_FILTER_REGEX.search(token).groups()
+            group["filters"].append((variable, language))
+        elif token != ".":
+            terms.append(token)
+            if len(terms) == 3:
+                group["triples"].append(tuple(terms))
+                terms = []
+        index += 1
+    return group, index
+
+
+def evaluate_sparql_group(group, solution, entities):
+    """
+    :param group: A group parsed with `parse_sparql_group`.
+    :param solution: The bindings of the variables already bound, by variable name.
+    :param entities: The JSON representation of the entities of the catalog by entity code.
+    :return: The solutions of the group extending the solution.
+    """
+    solutions = [solution]
+    for triple in group["triples"]:
+        solutions = [
+            extended_solution
+            for current_solution in solutions
+            for extended_solution in match_sparql_triple(
+                triple, current_solution, entities
+            )
+        ]
+    for union in group["unions"]:
+        solutions = [
+            extended_solution
+            for current_solution in solutions
+            for subgroup in union
+            for extended_solution in evaluate_sparql_group(
+                subgroup, current_solution, entities
+            )
+        ]
+    for variable, language in group["filters"]:
+        solutions = [
+            current_solution
+            for current_solution in solutions
+            if current_solution.get(variable, {}).get("xml:lang") == language
+        ]
+    return solutions
+
+
+def match_sparql_triple(triple, solution, entities):
+    subject, predicate, object_term = triple
+    for subject_binding, object_binding in get_sparql_facts(predicate, entities):
+        extended_solution = bind_sparql_term(subject, subject_binding, solution)
+        if extended_solution is not None:
+            extended_solution = bind_sparql_term(
+                object_term, object_binding, extended_solution
+            )
+        if extended_solution is not None:
+            yield extended_solution
+
+
+def get_sparql_facts(predicate, entities):
+    """Get the (subject, object) bindings of a predicate from the entities of the catalog.
+    A claim path ``p:P/ps:P`` links an item to the values of its claims,
+    a statement predicate ``ps:P`` links the statement nodes of the claims to their values.
+    :param predicate: The predicate of a triple pattern.
+    :param entities: The JSON representation of the entities of the catalog by entity code.
+    :return: A generator of the (subject binding, object binding) pairs.
+    """
+    if predicate == f"<{RDFS_LABEL_URL}>":
+        for entity_code, entity_json in entities.items():
+            for label in entity_json.get(LABELS, {}).values():
+                yield create_entity_binding(entity_code), {
+                    "type": "literal",
+                    VALUE: label[VALUE],
+                    "xml:lang": label[LANGUAGE],
+                }
+        return
+
+    property_match = PROPERTY_PATH_REGEX.match(predicate)
+    statement_match = STATEMENT_PATH_REGEX.match(predicate)
+    if property_match is None and statement_match is None:
+        return
+    property_code = (property_match or statement_match).group(1)
+    for entity_code, entity_json in entities.items():
+        for claim in entity_json.get(CLAIMS, {}).get(property_code, []):
+            object_binding = create_value_binding(claim[MAINSNAK].get(DATAVALUE))
+            if object_binding is None:
+                continue
+            if property_match is not None:
+                subject_binding = create_entity_binding(entity_code)
+            else:
+                statement_id = claim.get(ID, f"{entity_code}${uuid.uuid4()}")
+                subject_binding = {
+                    "type": "uri",
+                    VALUE: f"{SVC_URL}{SVC_ENTITY_URL_PATH}statement/{statement_id.replace('$', '-')}",
+                }
+            yield subject_binding, object_binding
+
+
+def bind_sparql_term(term, binding, solution):
+    """
+    :param term: A term of a triple pattern, a variable or a URI.
+    :param binding: The binding matched by the term.
+    :param solution: The bindings of the variables already bound, by variable name.
+    :return: The solution extended with the binding of the term, None if the binding does not match the term.
+    """
+    if term.startswith("?"):
+        variable = term[1:]
+        if variable in solution:
+            return solution if solution[variable] == binding else None
+        return {**solution, variable: binding}
+    entity_match = ENTITY_URI_REGEX.match(term)
+    if entity_match is not None:
+        return (
+            solution
+            if binding == create_entity_binding(entity_match.group(1))
+            else None
+        )
+    return solution if binding == {"type": "uri", VALUE: term.strip("<>")} else None
+
+
+def create_entity_binding(entity_code):
+    return {"type": "uri", VALUE: f"{SVC_URL}{SVC_ENTITY_URL_PATH}{entity_code}"}
+
+
+def create_value_binding(datavalue):
+    """
+    :param datavalue: The data value of the main snak of a claim.
+    :return: The SPARQL binding of the value, None if the value cannot be matched by the project queries.
+    """
+    if datavalue is None:
+        return None
+    if datavalue.get("type") == "wikibase-entityid":
+        return create_entity_binding(datavalue[VALUE][ID])
+    if datavalue.get("type") == "string":
+        return {"type": "literal", VALUE: datavalue[VALUE]}
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Wikibase and SPARQL stand-in server for benchmarks"
+    )
+    parser.add_argument(
+        "--path-to-fixture",
+        action="store",
+        required=True,
+        help="Path to the JSON file with the entities of the catalog, in the format of a wbgetentities response.",
+    )
+    parser.add_argument("--host", action="store", default="127.0.0.1")
+    parser.add_argument("--port", action="store", type=int, default=8181)
+    parser.add_argument(
+        "--latency",
+        action="store",
+        type=float,
+        default=0,
+        help="Number of seconds every request waits before being answered.",
+    )
+    parser.add_argument(
+        "--error-rate",
+        action="store",
+        type=float,
+        default=0,
+        help="Probability of a request to fail with an injected error.",
+    )
+    parser.add_argument(
+        "--error-kinds",
+        action="store",
+        nargs="+",
+        choices=ERROR_KINDS,
+        default=None,
+        help="Kinds of the injected errors.",
+    )
+    args = parser.parse_args()
+
+    server = WikibaseStandInServer.from_fixture(
+        args.path_to_fixture,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_kinds=args.error_kinds,
+    )
+    print(f"MediaWiki API: {server.mediawiki_api_url}")
+    print(f"SPARQL endpoint: {server.sparql_endpoint_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
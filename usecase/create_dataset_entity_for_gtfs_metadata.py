@@ -1,6 +1,11 @@
 import os
 from wikibaseintegrator import wbi_core
-from utilities.request_utils import import_entity
+from utilities.request_utils import (
+    import_entity_claims,
+    create_entity_json,
+    create_statement_guid,
+)
+from utilities.wikibase_write_session import WikibaseWriteSession
 from utilities.constants import (
     NORMAL,
     PREFERRED,
@@ -56,9 +61,44 @@ def create_geographical_property(order_key, corner_value, property_type):
     )
 
 
-def create_dataset_entity_for_gtfs_metadata(gtfs_representation):
+def link_dataset_version_to_source(
+    source_entity_code, dataset_version_entity_code, write_session
+):
+    """Link a dataset version to its source, by only adding the dataset property claim to the source entity,
+    so the source entity and its claims for every previous dataset version are not fetched.
+    The claim has an ID derived from the dataset version, so writing it again replaces it.
+    :param source_entity_code: The entity code of the source.
+    :param dataset_version_entity_code: The entity code of the dataset version.
+    :param write_session: The WikibaseWriteSession shared by the writes of the run.
+    :return: The entity code of the source.
+    """
+    version_prop = wbi_core.ItemID(
+        value=dataset_version_entity_code,
+        prop_nr=os.environ[DATASET_PROP],
+        if_exists=APPEND,
+    )
+    version_prop.set_id(
+        create_statement_guid(source_entity_code, dataset_version_entity_code)
+    )
+    source_data = [version_prop]
+    return import_entity_claims(
+        os.environ[USERNAME],
+        os.environ[PASSWORD],
+        source_data,
+        item_id=source_entity_code,
+        write_session=write_session,
+    )
+
+
+def create_dataset_entity_for_gtfs_metadata(
+    gtfs_representation, write_session=None, entity_export=None
+):
     """Create a dataset entity for a new dataset version on the Database.
     :param gtfs_representation: The representation of the GTFS dataset to process.
+    :param write_session: The WikibaseWriteSession shared by the writes of the run,
+    a new one with the environment credentials if None.
+    :param entity_export: The EntityExport where to add the dataset entity instead of creating it, if any.
+    The dataset entity is then created when the export is replayed.
     :return: The representation of the GTFS dataset post-execution.
     """
     validate_gtfs_representation(gtfs_representation)
@@ -243,21 +283,31 @@ def create_dataset_entity_for_gtfs_metadata(gtfs_representation):
     # Dataset version entity label
     version_name_label = metadata.dataset_version_name
 
-    metadata.dataset_version_entity_code = import_entity(
-        os.environ[USERNAME], os.environ[PASSWORD], dataset_data, version_name_label
-    )
+    if entity_export is not None:
+        entity_export.add_dataset_version(
+            metadata.source_entity_code,
+            create_entity_json(dataset_data, version_name_label),
+            sha1_hash=metadata.sha1_hash,
+        )
+        return gtfs_representation
 
-    version_prop = wbi_core.ItemID(
-        value=metadata.dataset_version_entity_code,
-        prop_nr=os.environ[DATASET_PROP],
-        if_exists=APPEND,
-    )
-    source_data = [version_prop]
-    metadata.source_entity_code = import_entity(
-        os.environ[USERNAME],
-        os.environ[PASSWORD],
-        source_data,
-        item_id=metadata.source_entity_code,
+    if write_session is None:
+        write_session = WikibaseWriteSession(os.environ[USERNAME], os.environ[PASSWORD])
+
+    # Create the dataset version entity, then link it to its source.
+    # The dataset version entity is only created once when the write is retried.
+    if not is_valid_instance(metadata.dataset_version_entity_code, str):
+        metadata.dataset_version_entity_code = import_entity_claims(
+            os.environ[USERNAME],
+            os.environ[PASSWORD],
+            dataset_data,
+            version_name_label,
+            write_session=write_session,
+        )
+    metadata.source_entity_code = link_dataset_version_to_source(
+        metadata.source_entity_code,
+        metadata.dataset_version_entity_code,
+        write_session,
     )
 
     return gtfs_representation
@@ -1,15 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
+from itertools import zip_longest
+from threading import BoundedSemaphore
+from urllib.parse import urlparse
 import os
 import re
-import requests
 from requests import HTTPError
-from requests.exceptions import SSLError
+from requests.exceptions import SSLError, RequestException
+from utilities.download_utils import (
+    DEFAULT_HEDGE_DELAY,
+    DownloadRejected,
+    DownloadSession,
+    download_file_hedged,
+    probe_remote_zip_fingerprint,
+)
+from repository.http_validator_cache import SHA1_HASH
+from utilities.download_telemetry import DownloadTelemetry, estimate_dns_time
+from utilities.zip_utils import compute_zip_file_fingerprint
 from utilities.validators import validate_datasets_infos
 
 OMD_URL_DOWNLOAD_DATE_REGEX = r"(?<=/)\w+(?=/download)"
 OMD_URL_DOWNLOAD_DATE_FORMAT = "%Y%m%d"
 METADATA_DOWNLOAD_DATE_FORMAT = "%Y-%m-%d"
 
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_WORKERS_PER_HOST = 2
+
+DOWNLOADED_RESULT = "downloaded"
+NOT_MODIFIED_RESULT = "not_modified"
+SAME_ZIP_MEMBERS_RESULT = "same_zip_members"
+EXISTING_SHA1_RESULT = "existing_sha1"
+REJECTED_RESULT = "rejected"
+FAILED_RESULT = "failed"
+
 
 def add_download_date_for_omd_harvesting(dataset_infos):
     date_string = re.search(OMD_URL_DOWNLOAD_DATE_REGEX, dataset_infos.url)
@@ -28,54 +51,320 @@ def add_download_date_for_cron_job(dataset_infos):
     return dataset_infos
 
 
-def download_dataset_as_zip_for_omd_harvesting(path_to_data, datasets_infos):
+def count_download_hosts(datasets_infos):
+    """Count the hosts of the dataset URLs and mirror URLs, to size the connection pools of a DownloadSession.
+    :param datasets_infos: The datasets infos from which to take the urls.
+    :return: The number of distinct hosts, at least 1.
+    """
+    hosts = {
+        urlparse(url).netloc
+        for dataset_infos in datasets_infos
+        for url in [dataset_infos.url] + list(dataset_infos.mirror_urls)
+    }
+    return max(len(hosts), 1)
+
+
+def download_dataset_as_zip_for_omd_harvesting(path_to_data, datasets_infos, **kwargs):
     return download_dataset_as_zip(
-        path_to_data, datasets_infos, add_download_date_for_omd_harvesting
+        path_to_data, datasets_infos, add_download_date_for_omd_harvesting, **kwargs
     )
 
 
-def download_dataset_as_zip_for_cron_job(path_to_data, datasets_infos):
+def download_dataset_as_zip_for_cron_job(path_to_data, datasets_infos, **kwargs):
     return download_dataset_as_zip(
-        path_to_data, datasets_infos, add_download_date_for_cron_job
+        path_to_data, datasets_infos, add_download_date_for_cron_job, **kwargs
     )
 
 
-def download_dataset_as_zip(path_to_data, datasets_infos, download_date_func):
+def download_dataset_as_zip(
+    path_to_data,
+    datasets_infos,
+    download_date_func,
+    max_workers=DEFAULT_MAX_WORKERS,
+    max_workers_per_host=DEFAULT_MAX_WORKERS_PER_HOST,
+    http_validator_cache=None,
+    download_session=None,
+    hedge_delay=DEFAULT_HEDGE_DELAY,
+    dataset_store=None,
+    download_report=None,
+):
     """Download datasets as zip for the given urls.
+    The downloads are executed concurrently, with at most `max_workers` downloads in progress
+    and at most `max_workers_per_host` downloads in progress for the same host.
+    If an HTTP validator cache is given, the requests are conditional and the datasets
+    not modified since their last download are discarded. When the server supports range requests,
+    the central directory of the remote zip is probed first, and the dataset is discarded
+    without being downloaded if its members are the same as in the last download.
+    The downloads share a DownloadSession, reusing the connections to the same host.
+    A dataset with mirror URLs is also downloaded from its first mirror if its URL is slow to answer,
+    and the first download to complete is kept.
+    If a dataset store is given, the downloaded datasets are moved to the store, and the last dataset downloaded
+    for a source is reused from the store instead of being downloaded again when it did not change.
     :param path_to_data: The path to the folder where to store the dataset zip files.
     :param datasets_infos: The datasets infos from which to take the urls.
     :param download_date_func: The function to add the download date to a dataset infos.
-    :return: A list of DatasetInfos for which the datasets zip file have been downloaded.
+    :param max_workers: The maximum number of concurrent downloads.
+    :param max_workers_per_host: The maximum number of concurrent downloads for a single host.
+    :param http_validator_cache: The HttpValidatorCache to use for conditional requests, if any.
+    :param download_session: The DownloadSession to use. If None, a session is created for these downloads.
+    :param hedge_delay: The number of seconds to wait for a dataset URL before downloading from its mirror,
+    None to never download from the mirror URLs.
+    :param dataset_store: The DatasetStore where to keep the downloaded datasets zip files, if any.
+    :param download_report: The DownloadReport where to record the telemetry of the downloads, if any.
+    The report is saved once the downloads are completed.
+    :return: A list of DatasetInfos for which the datasets zip file have been downloaded,
+    in the same order as the given datasets infos.
     """
     if not os.path.isdir(path_to_data):
         raise TypeError("Data path must be a valid path.")
     validate_datasets_infos(datasets_infos)
+    if not isinstance(max_workers, int) or max_workers < 1:
+        raise TypeError("Max workers must be a valid positive integer.")
+    if not isinstance(max_workers_per_host, int) or max_workers_per_host < 1:
+        raise TypeError("Max workers per host must be a valid positive integer.")
+
+    # Group the datasets by host, keeping their position in the datasets infos list
+    datasets_by_host = {}
+    for index, dataset_infos in enumerate(datasets_infos):
+        host = urlparse(dataset_infos.url).netloc
+        datasets_by_host.setdefault(host, []).append((index, dataset_infos))
+    host_semaphores = {
+        host: BoundedSemaphore(max_workers_per_host) for host in datasets_by_host
+    }
+
+    # Interleave the hosts when scheduling the downloads,
+    # so the workers are not all waiting on the same host semaphore
+    scheduled_datasets = [
+        item
+        for items in zip_longest(*datasets_by_host.values())
+        for item in items
+        if item is not None
+    ]
+
+    session = download_session
+    if session is None:
+        session = DownloadSession(
+            pool_connections=count_download_hosts(datasets_infos),
+            pool_maxsize=max_workers_per_host,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            index: executor.submit(
+                download_dataset,
+                path_to_data,
+                dataset_infos,
+                download_date_func,
+                host_semaphores[urlparse(dataset_infos.url).netloc],
+                session,
+                http_validator_cache,
+                hedge_delay,
+                dataset_store,
+                download_report,
+            )
+            for index, dataset_infos in scheduled_datasets
+        }
+
+    if download_session is None:
+        session.close()
+
+    if http_validator_cache is not None:
+        http_validator_cache.save()
+
+    if download_report is not None:
+        download_report.save()
+
+    # Return the downloaded datasets in a deterministic order
     updated_datasets_infos = []
+    for index in sorted(futures):
+        dataset_infos = futures[index].result()
+        if dataset_infos is not None:
+            updated_datasets_infos.append(dataset_infos)
+
+    return updated_datasets_infos
+
+
+def download_dataset(
+    path_to_data,
+    dataset_infos,
+    download_date_func,
+    host_semaphore,
+    session,
+    http_validator_cache=None,
+    hedge_delay=DEFAULT_HEDGE_DELAY,
+    dataset_store=None,
+    download_report=None,
+):
+    """Download a dataset as zip for the given dataset infos.
+    The dataset is streamed to disk and its SHA-1 hash is computed during the download.
+    If the SHA-1 hash is already in the previous SHA-1 hashes, the dataset is discarded.
+    :param path_to_data: The path to the folder where to store the dataset zip file.
+    :param dataset_infos: The dataset infos from which to take the url.
+    :param download_date_func: The function to add the download date to a dataset infos.
+    :param host_semaphore: The semaphore limiting the concurrent downloads for the dataset url host.
+    :param session: The DownloadSession to use.
+    :param http_validator_cache: The HttpValidatorCache to use for conditional requests, if any.
+    :param hedge_delay: The number of seconds to wait for the dataset URL before downloading from its mirror,
+    None to never download from the mirror URLs.
+    :param dataset_store: The DatasetStore where to keep the downloaded dataset zip file, if any.
+    :param download_report: The DownloadReport where to record the telemetry of the download, if any.
+    :return: The DatasetInfos if a new dataset zip file has been downloaded, None otherwise.
+    """
+    url = dataset_infos.url
+    entity_code = dataset_infos.entity_code
+    previous_sha1_hashes = dataset_infos.previous_sha1_hashes
+    slash_index = url.rfind("/")
+    zip_name = url[slash_index + 1 :]
+    zip_path = os.path.join(path_to_data, f"{entity_code}_{zip_name}")
+
+    headers = {}
+    previous_zip_fingerprint = None
+    stored_sha1_hash = None
+    if http_validator_cache is not None:
+        # The last dataset downloaded is not downloaded again if it is already in the database,
+        # or if it is still in the dataset store
+        known_sha1_hashes = previous_sha1_hashes
+        validators = http_validator_cache.get_validators(entity_code, url)
+        if (
+            dataset_store is not None
+            and validators is not None
+            and dataset_store.contains(validators.get(SHA1_HASH))
+        ):
+            stored_sha1_hash = validators.get(SHA1_HASH)
+            known_sha1_hashes = set(previous_sha1_hashes) | {stored_sha1_hash}
+        headers = http_validator_cache.get_conditional_headers(
+            entity_code, url, known_sha1_hashes
+        )
+        previous_zip_fingerprint = http_validator_cache.get_zip_fingerprint(
+            entity_code, url, known_sha1_hashes
+        )
+
+    telemetry = DownloadTelemetry(entity_code, url)
+    with host_semaphore:
+        if download_report is not None:
+            telemetry.dns_time_estimate = estimate_dns_time(url)
+        telemetry.start()
+        if previous_zip_fingerprint is not None:
+            print(f"--------------- Probing URL : {url} ---------------\n")
+            if probe_remote_zip_fingerprint(session, url) == previous_zip_fingerprint:
+                print(
+                    f"{entity_code}_{zip_name} has the same zip members as its last download\n"
+                )
+                return report_download(
+                    download_report,
+                    telemetry,
+                    SAME_ZIP_MEMBERS_RESULT,
+                    reuse_stored_dataset(
+                        dataset_infos,
+                        download_date_func,
+                        stored_sha1_hash,
+                        dataset_store,
+                    ),
+                )
 
-    for dataset_infos in datasets_infos:
-        url = dataset_infos.url
-        entity_code = dataset_infos.entity_code
         print(f"--------------- Downloading URL : {url} ---------------\n")
-        slash_index = url.rfind("/")
-        zip_name = url[slash_index + 1 :]
-        zip_path = os.path.join(path_to_data, f"{entity_code}_{zip_name}")
         try:
-            zip_file_req = requests.get(url, allow_redirects=True)
-            zip_file_req.raise_for_status()
+            zip_file_req, sha1_hash, downloaded_url = download_file_hedged(
+                session,
+                [url] + list(dataset_infos.mirror_urls),
+                zip_path,
+                headers,
+                hedge_delay,
+                telemetry,
+            )
         except HTTPError as http_error:
-            print(f'Exception "{http_error}" occurred when downloading URL\n')
-            continue
+            print(f'Exception "{http_error}" occurred when downloading URL {url}\n')
+            return report_download(download_report, telemetry, FAILED_RESULT)
         except SSLError as ssl_error:
-            print(f'Exception "{ssl_error}" occurred when downloading URL\n')
-            continue
+            print(f'Exception "{ssl_error}" occurred when downloading URL {url}\n')
+            return report_download(download_report, telemetry, FAILED_RESULT)
+        except DownloadRejected as rejected_error:
+            print(f'Download rejected: "{rejected_error}", dataset discarded\n')
+            return report_download(download_report, telemetry, REJECTED_RESULT)
+        except RequestException as request_error:
+            print(
+                f'Exception "{request_error}" occurred when downloading URL {url}, '
+                f"the partial download is kept to be resumed\n"
+            )
+            return report_download(download_report, telemetry, FAILED_RESULT)
 
-        zip_file = zip_file_req.content
-        with open(zip_path, "wb") as file:
-            file.write(zip_file)
+    if sha1_hash is None:
+        print(f"{entity_code}_{zip_name} not modified since its last download\n")
+        return report_download(
+            download_report,
+            telemetry,
+            NOT_MODIFIED_RESULT,
+            reuse_stored_dataset(
+                dataset_infos, download_date_func, stored_sha1_hash, dataset_store
+            ),
+        )
 
-        dataset_infos.zip_path = zip_path
-        dataset_infos = download_date_func(dataset_infos)
-        print(f"Success : {entity_code}_{zip_name} downloaded in {path_to_data}\n")
-        updated_datasets_infos.append(dataset_infos)
+    # The validators of a mirror response do not apply to the dataset URL
+    if http_validator_cache is not None and downloaded_url == url:
+        http_validator_cache.set_validators(
+            entity_code,
+            url,
+            zip_file_req.headers,
+            sha1_hash,
+            compute_zip_file_fingerprint(zip_path),
+        )
+    elif http_validator_cache is not None:
+        http_validator_cache.remove_validators(entity_code, url)
 
-    return updated_datasets_infos
+    if sha1_hash in previous_sha1_hashes:
+        os.remove(zip_path)
+        print(
+            f"SHA-1 hash {sha1_hash} already exists for {entity_code}_{zip_name}, dataset discarded\n"
+        )
+        return report_download(download_report, telemetry, EXISTING_SHA1_RESULT)
+
+    if dataset_store is not None:
+        zip_path = dataset_store.add(entity_code, zip_path, sha1_hash)
+
+    dataset_infos.zip_path = zip_path
+    dataset_infos.sha1_hash = sha1_hash
+    dataset_infos = download_date_func(dataset_infos)
+    print(f"Success : {entity_code}_{zip_name} downloaded in {path_to_data}\n")
+    return report_download(download_report, telemetry, DOWNLOADED_RESULT, dataset_infos)
+
+
+def report_download(download_report, telemetry, result, dataset_infos=None):
+    """Stop the telemetry of a download and add it to the download report.
+    :param download_report: The DownloadReport where to add the telemetry, if any.
+    :param telemetry: The DownloadTelemetry of the download.
+    :param result: The result of the download.
+    :param dataset_infos: The DatasetInfos to return.
+    :return: The given DatasetInfos.
+    """
+    telemetry.stop(result)
+    if download_report is not None:
+        download_report.add_download(telemetry)
+    return dataset_infos
+
+
+def reuse_stored_dataset(
+    dataset_infos, download_date_func, stored_sha1_hash, dataset_store
+):
+    """Reuse the last dataset downloaded for the given dataset infos, when the remote dataset did not change.
+    :param dataset_infos: The dataset infos for which the remote dataset did not change.
+    :param download_date_func: The function to add the download date to a dataset infos.
+    :param stored_sha1_hash: The SHA-1 hash of the last dataset downloaded if it is in the dataset store, None otherwise.
+    :param dataset_store: The DatasetStore containing the last dataset downloaded, if any.
+    :return: The DatasetInfos referencing the stored dataset zip file if the last dataset downloaded
+    is not in the database, None otherwise.
+    """
+    if (
+        stored_sha1_hash is None
+        or stored_sha1_hash in dataset_infos.previous_sha1_hashes
+    ):
+        print(f"Dataset of {dataset_infos.entity_code} discarded\n")
+        return None
+
+    zip_path = dataset_store.add_reference(dataset_infos.entity_code, stored_sha1_hash)
+    if zip_path is None:
+        return None
+    dataset_infos.zip_path = zip_path
+    dataset_infos.sha1_hash = stored_sha1_hash
+    dataset_infos = download_date_func(dataset_infos)
+    print(f"Success : {zip_path} reused from the dataset store\n")
+    return dataset_infos
@@ -1,4 +1,8 @@
+import asyncio
+from datetime import datetime, timedelta
 import os
+from repository.catalog_snapshot import CatalogSnapshot
+from repository.sha1_index import Sha1Index
 from representation.dataset_infos import DatasetInfos
 from utilities.constants import (
     VALUE,
@@ -11,93 +15,290 @@ from utilities.constants import (
     GBFS_CATALOG_OF_SOURCES_CODE,
     SHA1_HASH_PROP,
     STABLE_URL_PROP,
+    CATALOG_PROP,
+    SOURCE_ENTITY_PROP,
+    DATASET_PROP,
+    ID,
+    LASTREVID,
+    SPARQL_VAR_LABEL,
+    SPARQL_VAR_URL,
+    SPARQL_VAR_SHA1,
 )
 from utilities.request_utils import (
-    extract_dataset_version_codes,
+    extract_catalog_infos,
+    extract_dataset_version_sha1_hashes,
+    extract_entities_json,
+    extract_recent_changes,
     extract_source_entity_codes,
-    wbi_core,
 )
 
 OPEN_MOBILITY_DATA_URL = "openmobilitydata.org"
 
+# The recent changes are kept 90 days by default by MediaWiki, older snapshots are fully refreshed
+MAX_SNAPSHOT_AGE = timedelta(days=30)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+# The refresh timestamp comes from the local clock but is compared with the timestamps of the database,
+# the overlap covers a local clock ahead of the database server
+REFRESH_OVERLAP = timedelta(minutes=10)
 
-def extract_gtfs_datasets_infos_from_database():
-    return extract_datasets_infos_from_database(
-        os.environ[GTFS_CATALOG_OF_SOURCES_CODE]
+
+def extract_gtfs_datasets_infos_from_database(catalog_snapshot=None, read_client=None):
+    return extract_datasets_infos_from_catalog(
+        os.environ[GTFS_CATALOG_OF_SOURCES_CODE], catalog_snapshot, read_client
     )
 
 
-def extract_gbfs_datasets_infos_from_database():
-    return extract_datasets_infos_from_database(
-        os.environ[GBFS_CATALOG_OF_SOURCES_CODE]
+def extract_gbfs_datasets_infos_from_database(catalog_snapshot=None, read_client=None):
+    return extract_datasets_infos_from_catalog(
+        os.environ[GBFS_CATALOG_OF_SOURCES_CODE], catalog_snapshot, read_client
     )
 
 
-def extract_datasets_infos_from_database(catalog_code):
-    """Extract the stable URLs and MD5 hashes from previous dataset versions
+def extract_datasets_infos_from_catalog(
+    catalog_code, catalog_snapshot=None, read_client=None
+):
+    """Extract the stable URLs and SHA-1 hashes from previous dataset versions
     for each dataset of a data type in the database.
+    With a catalog snapshot, as in the pipeline, only the items changed since the last run are fetched.
+    Without one, e.g. for a one-off extraction, the whole catalog is fetched with a single SPARQL query.
     :param catalog_code: Either GTFS_CATALOG_OF_SOURCES_CODE or GBFS_CATALOG_OF_SOURCES_CODE.
+    :param catalog_snapshot: The CatalogSnapshot of the database, if any.
+    :param read_client: The WikibaseReadClient fetching the changed items of the snapshot concurrently, if any.
     :return: A list of DatasetInfos, each containing the URL and SHA-1 hashes of a dataset in the database.
     """
-    datasets_infos = []
+    if catalog_snapshot is None:
+        return extract_datasets_infos_from_catalog_query(catalog_code)
+    return extract_datasets_infos_from_catalog_snapshot(
+        catalog_code, catalog_snapshot, read_client
+    )
 
-    entity_codes = extract_source_entity_codes(catalog_code)
 
-    # Retrieves the sources' stable URL for the entity codes found
-    for entity_code in entity_codes:
+def extract_datasets_infos_from_catalog_query(catalog_code):
+    """Extract the stable URLs and SHA-1 hashes from previous dataset versions
+    for each dataset of a data type in the database, with a single catalog-wide SPARQL query
+    instead of one query and one entity fetch per source and per dataset version.
+    :param catalog_code: Either GTFS_CATALOG_OF_SOURCES_CODE or GBFS_CATALOG_OF_SOURCES_CODE.
+    :return: A list of DatasetInfos, each containing the URL and SHA-1 hashes of a dataset in the database.
+    """
+    catalog_infos = extract_catalog_infos(catalog_code)
 
-        dataset_infos = DatasetInfos()
-        dataset_infos.entity_code = entity_code
+    return build_datasets_infos(
+        {
+            entity_code: (
+                source_infos[SPARQL_VAR_LABEL],
+                source_infos[SPARQL_VAR_URL],
+                source_infos[SPARQL_VAR_SHA1],
+            )
+            for entity_code, source_infos in catalog_infos.items()
+        }
+    )
 
-        url, name = extract_source_infos(entity_code)
-        if not url or not name:
+
+def extract_datasets_infos_from_catalog_snapshot(
+    catalog_code, catalog_snapshot, read_client=None
+):
+    """Extract the stable URLs and SHA-1 hashes from previous dataset versions
+    for each dataset of a data type from a local catalog snapshot.
+    The snapshot is first refreshed with the items changed in the database since its last refresh,
+    or fully loaded if it was never refreshed or its last refresh is older than MAX_SNAPSHOT_AGE.
+    :param catalog_code: Either GTFS_CATALOG_OF_SOURCES_CODE or GBFS_CATALOG_OF_SOURCES_CODE.
+    :param catalog_snapshot: The CatalogSnapshot of the database.
+    :param read_client: The WikibaseReadClient fetching the changed items concurrently, if any.
+    :return: A list of DatasetInfos, each containing the URL and SHA-1 hashes of a dataset in the database.
+    """
+    if not isinstance(catalog_snapshot, CatalogSnapshot):
+        raise TypeError("Catalog snapshot must be a valid CatalogSnapshot.")
+
+    refresh_catalog_snapshot(catalog_code, catalog_snapshot, read_client)
+
+    return build_datasets_infos(catalog_snapshot.get_sources(catalog_code))
+
+
+def refresh_catalog_snapshot(catalog_code, catalog_snapshot, read_client=None):
+    """Refresh the sources of a catalog in the snapshot with the items whose revision changed since the last refresh.
+    :param catalog_code: The entity code of the catalog of sources.
+    :param catalog_snapshot: The CatalogSnapshot of the database.
+    :param read_client: The WikibaseReadClient fetching the changed items concurrently, if any.
+    :return: The entity codes of the items refreshed.
+    """
+    # The refresh timestamp is taken before the extraction, minus an overlap. The changes made during
+    # the overlap and the extraction are found again by the next refresh, and skipped if their revision
+    # is already in the snapshot
+    refreshed_at = datetime.utcnow() - REFRESH_OVERLAP
+    previous_refreshed_at = catalog_snapshot.get_refreshed_at(catalog_code)
+
+    if (
+        previous_refreshed_at is None
+        or refreshed_at - datetime.strptime(previous_refreshed_at, TIMESTAMP_FORMAT)
+        > MAX_SNAPSHOT_AGE
+    ):
+        print(f"Loading the catalog {catalog_code} in the catalog snapshot\n")
+        entity_codes = extract_source_entity_codes(catalog_code)
+        for entity_code in catalog_snapshot.get_source_entity_codes(catalog_code):
+            if entity_code not in entity_codes:
+                catalog_snapshot.remove_source(entity_code)
+    else:
+        revisions = extract_recent_changes(previous_refreshed_at)
+        entity_codes = [
+            entity_code
+            for entity_code, revid in revisions.items()
+            if revid > (catalog_snapshot.get_lastrevid(entity_code) or 0)
+        ]
+        print(
+            f"Refreshing {len(entity_codes)} items changed since {previous_refreshed_at} "
+            f"in the catalog snapshot\n"
+        )
+
+    entities_json = fetch_entities_json(entity_codes, read_client)
+
+    # Refresh the sources first, so the dataset versions of new sources are recognized
+    catalog_source_codes = set(catalog_snapshot.get_source_entity_codes(catalog_code))
+    version_codes = set()
+    for entity_code, json_response in entities_json.items():
+        if catalog_code in get_claim_entity_codes(json_response, CATALOG_PROP):
+            refresh_source(catalog_code, catalog_snapshot, entity_code, json_response)
+            version_codes.update(
+                version_code
+                for version_code in get_claim_entity_codes(json_response, DATASET_PROP)
+                if catalog_snapshot.get_lastrevid(version_code) is None
+            )
+        elif entity_code in catalog_source_codes:
+            # The source was removed from the catalog, or deleted
+            catalog_snapshot.remove_source(entity_code)
+        elif catalog_snapshot.is_source(entity_code):
+            # The source of another catalog is refreshed with its own catalog
             continue
-        dataset_infos.url = url
-        dataset_infos.source_name = name
+        elif get_claim_values(
+            json_response, SHA1_HASH_PROP
+        ) or catalog_snapshot.is_dataset_version(entity_code):
+            version_codes.add(entity_code)
 
-        dataset_infos.previous_sha1_hashes = extract_previous_sha1_hashes(entity_code)
+    # Fetch the new dataset versions of the sources which were not already fetched as changed items
+    entities_json.update(
+        fetch_entities_json(
+            [
+                version_code
+                for version_code in version_codes
+                if version_code not in entities_json
+            ],
+            read_client,
+        )
+    )
+    for version_code in version_codes:
+        refresh_dataset_version(
+            catalog_snapshot, version_code, entities_json.get(version_code, {})
+        )
 
-        datasets_infos.append(dataset_infos)
+    catalog_snapshot.set_refreshed_at(
+        catalog_code, refreshed_at.strftime(TIMESTAMP_FORMAT)
+    )
+    catalog_snapshot.save()
+
+    return entity_codes
+
+
+def fetch_entities_json(entity_codes, read_client=None):
+    if read_client is None:
+        return extract_entities_json(entity_codes)
+    return asyncio.run(read_client.get_entities_json(entity_codes))
+
+
+def refresh_source(catalog_code, catalog_snapshot, entity_code, json_response):
+    catalog_snapshot.set_source(
+        entity_code,
+        catalog_code,
+        json_response.get(LABELS, {}).get(ENGLISH, {}).get(VALUE),
+        list(dict.fromkeys(get_claim_values(json_response, STABLE_URL_PROP))),
+        json_response.get(LASTREVID, 0),
+    )
 
-    return datasets_infos
 
+def refresh_dataset_version(catalog_snapshot, version_code, json_response):
+    # Only the dataset versions with a SHA-1 hash of the sources in the snapshot are kept
+    sha1_hashes = set(get_claim_values(json_response, SHA1_HASH_PROP))
+    for source_entity_code in get_claim_entity_codes(json_response, SOURCE_ENTITY_PROP):
+        if sha1_hashes and catalog_snapshot.is_source(source_entity_code):
+            catalog_snapshot.set_dataset_version(
+                version_code,
+                source_entity_code,
+                sha1_hashes,
+                json_response.get(LASTREVID, 0),
+            )
+            return
+    # The dataset version was deleted, lost its SHA-1 hash or is no longer linked to a source in the snapshot
+    catalog_snapshot.remove_dataset_version(version_code)
 
-def extract_previous_sha1_hashes(entity_code):
-    entity_previous_sha1_hashes = set()
-    entity_sha1_hashes = set()
 
-    # Retrieves the entity dataset version codes for which we want to extract the SHA-1 hashes.
-    dataset_version_codes = extract_dataset_version_codes(entity_code)
+def get_claim_values(json_response, prop):
+    values = []
+    for row in json_response.get(CLAIMS, {}).get(os.environ[prop], []):
+        value = row.get(MAINSNAK, {}).get(DATAVALUE, {}).get(VALUE)
+        if value is not None:
+            values.append(value)
+    return values
 
-    # Retrieves the SHA-1 hashes for the dataset version codes found.
-    for version_code in dataset_version_codes:
-        # Export entity related to the version code from database
-        json_response = wbi_core.ItemEngine(
-            item_id=version_code
-        ).get_json_representation()
 
-        for row in json_response.get(CLAIMS, {}).get(os.environ[SHA1_HASH_PROP], []):
-            sha1 = row.get(MAINSNAK, {}).get(DATAVALUE, {}).get(VALUE)
-            if sha1 is None:
-                continue
-            entity_sha1_hashes.add(sha1)
-        # Add the SHA-1 hashes found for an entity to the SHA-1 hashes dictionary.
-        entity_previous_sha1_hashes.update(entity_sha1_hashes)
+def get_claim_entity_codes(json_response, prop):
+    return [
+        value.get(ID)
+        for value in get_claim_values(json_response, prop)
+        if isinstance(value, dict)
+    ]
 
-    return entity_previous_sha1_hashes
 
+def build_datasets_infos(sources):
+    """Build the DatasetInfos of the sources with a stable URL and a name.
+    :param sources: A dictionary with the name, the stable URLs and the set of dataset version SHA-1 hashes,
+    by source entity code.
+    :return: A list of DatasetInfos, each containing the URL and SHA-1 hashes of a dataset in the database.
+    """
+    datasets_infos = []
 
-def extract_source_infos(entity_code):
-    # Export entity related to the entity code from database
-    json_response = wbi_core.ItemEngine(item_id=entity_code).get_json_representation()
+    for entity_code, (name, urls, sha1_hashes) in sources.items():
+        url, mirror_urls = select_source_urls(urls)
+        if not url or not name:
+            continue
 
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = entity_code
+        dataset_infos.url = url
+        dataset_infos.mirror_urls = mirror_urls
+        dataset_infos.source_name = name
+        dataset_infos.previous_sha1_hashes = sha1_hashes
+
+        datasets_infos.append(dataset_infos)
+
+    return datasets_infos
+
+
+def extract_sha1_index_from_database(catalog_snapshot=None):
+    """Extract the catalog-wide index of the SHA-1 hashes of the dataset versions in the database,
+    from the catalog snapshot if any, otherwise with a single SPARQL query.
+    :param catalog_snapshot: The refreshed CatalogSnapshot of the database, if any.
+    :return: The Sha1Index of the dataset versions in the database.
+    """
+    if catalog_snapshot is None:
+        dataset_version_sha1_hashes = extract_dataset_version_sha1_hashes()
+    else:
+        dataset_version_sha1_hashes = catalog_snapshot.get_dataset_versions()
+
+    sha1_index = Sha1Index()
+    for (
+        sha1_hash,
+        source_entity_code,
+        version_entity_code,
+    ) in dataset_version_sha1_hashes:
+        sha1_index.add(sha1_hash, source_entity_code, version_entity_code)
+    return sha1_index
+
+
+def select_source_urls(urls):
+    # The source stable URL is the last URL which is not an openmobilitydata.org mirror,
+    # the other URLs are kept as mirrors of the source stable URL.
     url = None
-    # Extract source stable URL
-    for link in json_response.get(CLAIMS, {}).get(os.environ[STABLE_URL_PROP], []):
-        tmp_url = link.get(MAINSNAK, {}).get(DATAVALUE, {}).get(VALUE)
+    for tmp_url in urls:
         if OPEN_MOBILITY_DATA_URL not in tmp_url:
             url = tmp_url
+    mirror_urls = [tmp_url for tmp_url in urls if tmp_url != url]
 
-    name = json_response.get(LABELS, {}).get(ENGLISH, {}).get(VALUE)
-
-    return url, name
+    return url, mirror_urls
@@ -1,3 +1,4 @@
+import os
 from repository.data_repository import DataRepository
 from representation.dataset_representation_factory import build_representation
 from utilities.validators import validate_datasets_infos
@@ -6,11 +7,14 @@ GTFS_TYPE = "GTFS"
 GBFS_TYPE = "GBFS"
 
 
-def load_dataset(data_repository, datasets_infos, dataset_type):
+def load_dataset(data_repository, datasets_infos, dataset_type, dataset_store=None):
     """Load the datasets in memory in the data repository.
+    If a dataset store is given, a dataset which zip file is missing is loaded from the store
+    when a zip file with its SHA-1 hash is stored, instead of being downloaded again.
     :param data_repository: Data repository containing the dataset representations.
     :param datasets_infos: A list of dataset infos, for the datasets to load.
     :param dataset_type: URLs of the datasets to download.
+    :param dataset_store: The DatasetStore containing the downloaded datasets, if any.
     :return: The data repository containing the loaded dataset representations.
     """
     if not isinstance(data_repository, DataRepository):
@@ -23,6 +27,14 @@ def load_dataset(data_repository, datasets_infos, dataset_type):
 
     # Load the datasets indicated in datasets_infos
     for dataset_infos in datasets_infos:
+        if (
+            dataset_store is not None
+            and not os.path.isfile(dataset_infos.zip_path)
+            and dataset_store.contains(dataset_infos.sha1_hash)
+        ):
+            dataset_infos.zip_path = dataset_store.add_reference(
+                dataset_infos.entity_code, dataset_infos.sha1_hash
+            )
         print(
             f"--------------- Loading dataset : {dataset_infos.zip_path} ---------------\n"
         )
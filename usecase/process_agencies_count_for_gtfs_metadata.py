@@ -1,7 +1,11 @@
 from utilities.validators import validate_gtfs_representation
-from utilities.constants import AGENCY_NAME
+from utilities.decorators import gtfs_metadata_processor
+from utilities.constants import AGENCY_NAME, AGENCY_FILE
 
 
+@gtfs_metadata_processor(
+    input_tables=[AGENCY_FILE], metadata_attributes=["agencies_count"]
+)
 def process_agencies_count_for_gtfs_metadata(gtfs_representation):
     """Process and count all the agencies in the `agency` file from the GTFS dataset of the representation.
     Add the agencies count to the representation metadata once processed.
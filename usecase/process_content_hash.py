@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from zipfile import BadZipFile
+from repository.dataset_version_history import DatasetVersionHistory, SHA1_HASH
+from utilities.constants import DEFAULT_MAX_HASHING_WORKERS
+from utilities.hash_utils import compute_gtfs_content_hash
+from utilities.validators import validate_datasets_infos
+
+
+def process_content_hash(
+    datasets_infos, version_history, max_workers=DEFAULT_MAX_HASHING_WORKERS
+):
+    """Computes the content hash of the datasets. Removes the datasets for which a version with the same content
+    was already processed for their source, e.g. the same GTFS content zipped again with new timestamps.
+    :param datasets_infos: A list of DatasetInfos containing the path to the dataset needing a content verification.
+    :param version_history: The DatasetVersionHistory of the dataset versions processed.
+    :param max_workers: The maximum number of datasets hashed concurrently.
+    :return: A list of DatasetInfos for which the content was not already processed.
+    """
+    validate_datasets_infos(datasets_infos)
+    if not isinstance(version_history, DatasetVersionHistory):
+        raise TypeError("Version history must be a valid DatasetVersionHistory.")
+    if not isinstance(max_workers, int) or max_workers < 1:
+        raise TypeError("Max workers must be a valid positive integer.")
+    updated_datasets_infos = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(compute_gtfs_content_hash, dataset_infos.zip_path)
+            for dataset_infos in datasets_infos
+        ]
+
+    for dataset_infos, future in zip(datasets_infos, futures):
+        path_to_dataset = dataset_infos.zip_path
+        print(
+            f"--------------- Processing content hash : {path_to_dataset} ---------------\n"
+        )
+        try:
+            content_hash, table_digests = future.result()
+        except (OSError, BadZipFile) as error:
+            # The dataset is kept, it will fail to load like before the content hash was introduced
+            print(f'Exception "{error}" occurred when processing content hash\n')
+            updated_datasets_infos.append(dataset_infos)
+            continue
+
+        dataset_infos.content_hash = content_hash
+        dataset_infos.table_digests = table_digests
+        same_version = version_history.find_version_by_content_hash(
+            dataset_infos.entity_code, content_hash
+        )
+        if same_version is None:
+            updated_datasets_infos.append(dataset_infos)
+            print(
+                f"Success : new content hash {content_hash} for {path_to_dataset}, dataset kept for further processing\n"
+            )
+        else:
+            print(
+                f"Content hash {content_hash} already exists for {path_to_dataset} "
+                f"with SHA-1 hash {same_version[SHA1_HASH]}, dataset discarded\n"
+            )
+
+    return updated_datasets_infos
+
+
+def add_datasets_to_version_history(datasets_infos, version_history):
+    """Add the processed datasets to the version history of their source with their processed metadata,
+    and save the history.
+    :param datasets_infos: A list of DatasetInfos of the processed datasets.
+    :param version_history: The DatasetVersionHistory of the dataset versions processed.
+    :return: The version history.
+    """
+    validate_datasets_infos(datasets_infos)
+    if not isinstance(version_history, DatasetVersionHistory):
+        raise TypeError("Version history must be a valid DatasetVersionHistory.")
+
+    for dataset_infos in datasets_infos:
+        if not dataset_infos.content_hash:
+            continue
+        version_history.add_version(
+            dataset_infos.entity_code,
+            dataset_infos.sha1_hash,
+            dataset_infos.content_hash,
+            dataset_infos.table_digests,
+            dataset_infos.metadata,
+        )
+    version_history.save()
+    return version_history
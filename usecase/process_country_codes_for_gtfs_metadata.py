@@ -1,10 +1,14 @@
 import reverse_geocoder as rg
-from utilities.constants import STOP_LAT, STOP_LON
+from utilities.constants import STOP_LAT, STOP_LON, STOPS_FILE
 from utilities.validators import validate_gtfs_representation
+from utilities.decorators import gtfs_metadata_processor
 
 RG_COUNTRY_CODE_KEY = "cc"
 
 
+@gtfs_metadata_processor(
+    input_tables=[STOPS_FILE], metadata_attributes=["country_codes"]
+)
 def process_country_codes_for_gtfs_metadata(gtfs_representation):
     """Process the country codes of a GTFS dataset using the latitude and longitude pairs
     from `stops` file from the GTFS dataset of the representation.
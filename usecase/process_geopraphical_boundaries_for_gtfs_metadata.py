@@ -3,7 +3,8 @@ from utilities.geographical_utils import (
     process_bounding_octagon_corner_floats,
 )
 from utilities.validators import validate_gtfs_representation
-from utilities.constants import STOP_LAT, STOP_LON
+from utilities.decorators import gtfs_metadata_processor
+from utilities.constants import STOP_LAT, STOP_LON, STOPS_FILE
 
 GEO_BOUNDARIES_UTILS = "geo_boundaries_utils"
 GEO_BOUNDARIES_ATTR = "geo_boundaries_attr"
@@ -22,12 +23,18 @@ BOUNDING_OCTAGON_MAP = {
 }
 
 
+@gtfs_metadata_processor(
+    input_tables=[STOPS_FILE], metadata_attributes=["bounding_box"]
+)
 def process_bounding_box_for_gtfs_metadata(gtfs_representation):
     return process_geographical_boundaries_for_gtfs_metadata(
         gtfs_representation, BOUNDING_BOX_MAP
     )
 
 
+@gtfs_metadata_processor(
+    input_tables=[STOPS_FILE], metadata_attributes=["bounding_octagon"]
+)
 def process_bounding_octagon_for_gtfs_metadata(gtfs_representation):
     return process_geographical_boundaries_for_gtfs_metadata(
         gtfs_representation, BOUNDING_OCTAGON_MAP
@@ -0,0 +1,133 @@
+import os
+from repository.dataset_version_history import TABLE_DIGESTS, METADATA
+from usecase.process_agencies_count_for_gtfs_metadata import (
+    process_agencies_count_for_gtfs_metadata,
+)
+from usecase.process_country_codes_for_gtfs_metadata import (
+    process_country_codes_for_gtfs_metadata,
+)
+from usecase.process_geopraphical_boundaries_for_gtfs_metadata import (
+    process_bounding_box_for_gtfs_metadata,
+    process_bounding_octagon_for_gtfs_metadata,
+)
+from usecase.process_main_language_code_for_gtfs_metadata import (
+    process_main_language_code_for_gtfs_metadata,
+)
+from usecase.process_routes_count_by_type_for_gtfs_metadata import (
+    process_routes_count_by_type_for_gtfs_metadata,
+)
+from usecase.process_service_date_for_gtfs_metadata import (
+    process_start_service_date_for_gtfs_metadata,
+    process_end_service_date_for_gtfs_metadata,
+)
+from usecase.process_stops_count_by_type_for_gtfs_metadata import (
+    process_stops_count_by_type_for_gtfs_metadata,
+)
+from usecase.process_timestamp_for_gtfs_metadata import (
+    process_start_timestamp_for_gtfs_metadata,
+    process_end_timestamp_for_gtfs_metadata,
+)
+from usecase.process_timezones_for_gtfs_metadata import (
+    process_timezones_for_gtfs_metadata,
+)
+from utilities.validators import validate_gtfs_representation
+
+GTFS_METADATA_PROCESSORS = [
+    process_country_codes_for_gtfs_metadata,
+    process_start_service_date_for_gtfs_metadata,
+    process_end_service_date_for_gtfs_metadata,
+    process_start_timestamp_for_gtfs_metadata,
+    process_end_timestamp_for_gtfs_metadata,
+    process_main_language_code_for_gtfs_metadata,
+    process_timezones_for_gtfs_metadata,
+    process_bounding_box_for_gtfs_metadata,
+    process_bounding_octagon_for_gtfs_metadata,
+    process_agencies_count_for_gtfs_metadata,
+    process_routes_count_by_type_for_gtfs_metadata,
+    process_stops_count_by_type_for_gtfs_metadata,
+]
+
+
+def process_gtfs_metadata(
+    gtfs_representation,
+    table_digests=None,
+    previous_version=None,
+    processors=None,
+):
+    """Process the metadata of a GTFS dataset representation, reusing the metadata of the previous dataset version.
+    A processor is only executed if one of the GTFS files it reads changed since the previous version,
+    otherwise the metadata attributes it sets are copied from the previous version.
+    All the processors are executed if the table digests or the previous version metadata are unknown.
+    :param gtfs_representation: The representation of the GTFS dataset to process.
+    :param table_digests: The digest of each GTFS file of the dataset by member name, if known.
+    :param previous_version: The previous dataset version of the source in the DatasetVersionHistory, if any.
+    :param processors: The metadata processors declared with `gtfs_metadata_processor`,
+    GTFS_METADATA_PROCESSORS if None.
+    :return: The representation of the GTFS dataset post-execution.
+    """
+    validate_gtfs_representation(gtfs_representation)
+    if processors is None:
+        processors = GTFS_METADATA_PROCESSORS
+
+    changed_tables = None
+    previous_metadata = {}
+    if table_digests and previous_version is not None:
+        changed_tables = get_changed_tables(
+            table_digests, previous_version.get(TABLE_DIGESTS) or {}
+        )
+        previous_metadata = previous_version.get(METADATA) or {}
+
+    metadata = gtfs_representation.metadata
+    for processor in processors:
+        can_reuse_previous_metadata = (
+            changed_tables is not None
+            and changed_tables.isdisjoint(processor.input_tables)
+            and all(
+                attribute in previous_metadata
+                for attribute in processor.metadata_attributes
+            )
+        )
+        if can_reuse_previous_metadata:
+            for attribute in processor.metadata_attributes:
+                setattr(metadata, attribute, previous_metadata[attribute])
+            print(f"{processor.__name__} skipped, its input tables did not change\n")
+        else:
+            gtfs_representation = processor(gtfs_representation)
+
+    return gtfs_representation
+
+
+def get_changed_tables(table_digests, previous_table_digests):
+    """Compare the GTFS files of a dataset version with the ones of the previous version.
+    :param table_digests: The digest of each GTFS file of the dataset by member name.
+    :param previous_table_digests: The digest of each GTFS file of the previous version by member name.
+    :return: The names of the GTFS files added, removed or changed since the previous version.
+    """
+    # The GTFS files are compared by file name, they can be in a folder of the zip file
+    digests = {os.path.basename(name): digest for name, digest in table_digests.items()}
+    previous_digests = {
+        os.path.basename(name): digest
+        for name, digest in previous_table_digests.items()
+    }
+    return {
+        name
+        for name in set(digests) | set(previous_digests)
+        if digests.get(name) != previous_digests.get(name)
+    }
+
+
+def get_processed_metadata(gtfs_representation, processors=None):
+    """Get the metadata attributes set by the metadata processors, to be kept with the dataset version.
+    :param gtfs_representation: The representation of the processed GTFS dataset.
+    :param processors: The metadata processors declared with `gtfs_metadata_processor`,
+    GTFS_METADATA_PROCESSORS if None.
+    :return: The metadata attribute values by attribute name.
+    """
+    validate_gtfs_representation(gtfs_representation)
+    if processors is None:
+        processors = GTFS_METADATA_PROCESSORS
+    return {
+        attribute: getattr(gtfs_representation.metadata, attribute)
+        for processor in processors
+        for attribute in processor.metadata_attributes
+    }
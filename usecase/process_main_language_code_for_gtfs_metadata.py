@@ -1,9 +1,13 @@
 from utilities.validators import validate_gtfs_representation
-from utilities.constants import AGENCY_LANG
+from utilities.decorators import gtfs_metadata_processor
+from utilities.constants import AGENCY_LANG, AGENCY_FILE
 
 AGENCY_LANG_IDX = 0
 
 
+@gtfs_metadata_processor(
+    input_tables=[AGENCY_FILE], metadata_attributes=["main_language_code"]
+)
 def process_main_language_code_for_gtfs_metadata(gtfs_representation):
     """Process the main language code using the`agency` file from the GTFS dataset of the representation.
     Add the main language code to the representation metadata once processed.
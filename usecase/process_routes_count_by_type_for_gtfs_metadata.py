@@ -1,5 +1,6 @@
 import os
 from utilities.validators import validate_gtfs_representation
+from utilities.decorators import gtfs_metadata_processor
 from utilities.constants import (
     TRAM,
     SUBWAY,
@@ -22,6 +23,7 @@ from utilities.constants import (
     FUNICULAR_CODE,
     TROLLEY_BUS_CODE,
     MONORAIL_CODE,
+    ROUTES_FILE,
 )
 
 TRAM_KEY = "Tram"
@@ -36,6 +38,9 @@ TROLLEY_BUS_KEY = "Trolleybus"
 MONORAIL_KEY = "Monorail"
 
 
+@gtfs_metadata_processor(
+    input_tables=[ROUTES_FILE], metadata_attributes=["routes_count_by_type"]
+)
 def process_routes_count_by_type_for_gtfs_metadata(gtfs_representation):
     """Process and count by type all the routes in the `routes` file from the GTFS dataset of the representation.
     Add the dictionary of the routes count to the representation metadata once processed.
@@ -1,6 +1,7 @@
 import pandas as pd
 from utilities.temporal_utils import get_gtfs_dates_by_type
 from utilities.validators import validate_gtfs_representation
+from utilities.decorators import gtfs_metadata_processor
 from utilities.constants import (
     MONDAY,
     TUESDAY,
@@ -12,8 +13,22 @@ from utilities.constants import (
     DATE,
     SERVICE_ID,
     EXCEPTION_TYPE,
+    AGENCY_FILE,
+    CALENDAR_FILE,
+    CALENDAR_DATES_FILE,
+    FEED_INFO_FILE,
+    STOP_TIMES_FILE,
+    TRIPS_FILE,
 )
 
+SERVICE_DATE_INPUT_TABLES = [
+    AGENCY_FILE,
+    CALENDAR_FILE,
+    CALENDAR_DATES_FILE,
+    FEED_INFO_FILE,
+    STOP_TIMES_FILE,
+    TRIPS_FILE,
+]
 PD_DATE_FORMAT = "%Y%m%d"
 SERVICE_DATE_FORMAT = "%Y-%m-%d"
 DATE_KEY = "date"
@@ -58,10 +73,16 @@ CALENDAR_REQUIRED_COLUMNS = {
 }
 
 
+@gtfs_metadata_processor(
+    input_tables=SERVICE_DATE_INPUT_TABLES, metadata_attributes=["start_service_date"]
+)
 def process_start_service_date_for_gtfs_metadata(gtfs_representation):
     return process_service_date_for_gtfs_metadata(gtfs_representation, START_DATE_MAP)
 
 
+@gtfs_metadata_processor(
+    input_tables=SERVICE_DATE_INPUT_TABLES, metadata_attributes=["end_service_date"]
+)
 def process_end_service_date_for_gtfs_metadata(gtfs_representation):
     return process_service_date_for_gtfs_metadata(gtfs_representation, END_DATE_MAP)
 
@@ -1,44 +1,89 @@
 from hashlib import sha1
-from utilities.validators import validate_datasets_infos
+import os
+import time
+from utilities.hash_utils import compute_file_sha1
+from utilities.validators import validate_datasets_infos, is_valid_instance
 
-DATA_CHUNK_BYTE_SIZE = 4096
+BYTES_PER_MEGABYTE = 1024 * 1024
 
 
-def process_sha1(datasets_infos):
+def process_sha1(datasets_infos, dataset_store=None, sha1_index=None):
     """Computes the SHA-1 hash of the datasets. Removes the datasets for which the SHA-1 hash is already in the database.
     N.B.: a dataset for which the SHA-1 hash is not in the database represents a new dataset version.
+    The SHA-1 hash of a dataset is only computed if it was not already computed during its download,
+    and if the dataset is not a file of the dataset store, which is named after its SHA-1 hash.
+    If a SHA-1 index is given, the SHA-1 hashes are also checked against the dataset versions of the whole catalog,
+    to discard the datasets already published for their source and report the ones published under another source.
     :param datasets_infos: A list of DatasetInfos containing to path to the dataset needing a SHA-1 hash verification,
     and the previous SHA-1 hashes.
+    :param dataset_store: The DatasetStore containing the downloaded datasets, if any.
+    :param sha1_index: The Sha1Index of the dataset versions in the database, if any.
     :return: A list of DatasetInfos for which the SHA-1 hashes are not in the database.
     """
     validate_datasets_infos(datasets_infos)
     updated_datasets_infos = []
 
     for dataset_infos in datasets_infos:
-        sha1_hash = sha1()
         path_to_dataset = dataset_infos.zip_path
         previous_sha1_hashes = dataset_infos.previous_sha1_hashes
+        if is_valid_instance(dataset_infos.sha1_hash, str):
+            # The SHA-1 hash was computed while streaming the dataset download
+            sha1_hash = dataset_infos.sha1_hash
+        elif (
+            dataset_store is not None
+            and dataset_store.find_sha1_hash(path_to_dataset) is not None
+        ):
+            sha1_hash = dataset_store.find_sha1_hash(path_to_dataset)
+        else:
+            sha1_hash = compute_sha1(path_to_dataset)
 
         print(f"--------------- Processing SHA-1 : {path_to_dataset} ---------------\n")
-        try:
-            with open(path_to_dataset, "rb") as f:
-                while data := f.read(DATA_CHUNK_BYTE_SIZE):
-                    sha1_hash.update(data)
-        except OSError:
-            print(
-                "OSError occurred when processing SHA-1 hash: could not open or read file.\n"
-            )
-
-        sha1_hash = sha1_hash.hexdigest()
-        if sha1_hash not in previous_sha1_hashes:
+        if sha1_hash not in previous_sha1_hashes and not (
+            sha1_index is not None
+            and sha1_index.contains(sha1_hash, dataset_infos.entity_code)
+        ):
             dataset_infos.sha1_hash = sha1_hash
             updated_datasets_infos.append(dataset_infos)
             print(
                 f"Success : new SHA-1 hash {sha1_hash} for {path_to_dataset}, dataset kept for further processing\n"
             )
+            if sha1_index is not None:
+                other_source_entity_codes = sha1_index.get_source_entity_codes(
+                    sha1_hash
+                )
+                if other_source_entity_codes:
+                    print(
+                        f"Duplicate : SHA-1 hash {sha1_hash} of {path_to_dataset} is also published "
+                        f"under the sources {sorted(other_source_entity_codes)}\n"
+                    )
+                # Index the new dataset version to detect the duplicates within the run
+                sha1_index.add(sha1_hash, dataset_infos.entity_code)
         else:
             print(
                 f"SHA-1 hash {sha1_hash} already exists for {path_to_dataset}, dataset discarded\n"
             )
 
     return updated_datasets_infos
+
+
+def compute_sha1(path_to_dataset):
+    """Computes the SHA-1 hash of a dataset file, and prints the hashing throughput.
+    :param path_to_dataset: The path to the dataset file.
+    :return: The SHA-1 hash of the dataset file.
+    """
+    start_time = time.perf_counter()
+    try:
+        sha1_hash = compute_file_sha1(path_to_dataset)
+    except OSError:
+        print(
+            "OSError occurred when processing SHA-1 hash: could not open or read file.\n"
+        )
+        return sha1().hexdigest()
+    elapsed_time = time.perf_counter() - start_time
+    size = os.path.getsize(path_to_dataset)
+    throughput = size / BYTES_PER_MEGABYTE / elapsed_time if elapsed_time else 0
+    print(
+        f"SHA-1 hash of {path_to_dataset} computed in {elapsed_time:.3f} seconds, "
+        f"{size} bytes at {throughput:.1f} MB/s\n"
+    )
+    return sha1_hash
@@ -6,10 +6,15 @@ from utilities.constants import (
     STATION,
     ENTRANCE,
     LOCATION_TYPE,
+    STOPS_FILE,
 )
 from utilities.validators import validate_gtfs_representation
+from utilities.decorators import gtfs_metadata_processor
 
 
+@gtfs_metadata_processor(
+    input_tables=[STOPS_FILE], metadata_attributes=["stops_count_by_type"]
+)
 def process_stops_count_by_type_for_gtfs_metadata(gtfs_representation):
     """Process and count by type all the stops in the `stops` file from the GTFS dataset of the representation.
     Add the dictionary of the stops count to the representation metadata once processed.
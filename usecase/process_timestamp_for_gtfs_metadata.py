@@ -1,5 +1,6 @@
 import pandas as pd
 from utilities.validators import validate_gtfs_representation
+from utilities.decorators import gtfs_metadata_processor
 from utilities.temporal_utils import (
     get_gtfs_dates_by_type,
     get_gtfs_timezone_utc_offset,
@@ -18,9 +19,20 @@ from utilities.constants import (
     EXCEPTION_TYPE,
     TRIP_ID,
     AGENCY_TIMEZONE,
+    AGENCY_FILE,
+    CALENDAR_FILE,
+    CALENDAR_DATES_FILE,
+    STOP_TIMES_FILE,
+    TRIPS_FILE,
 )
 
-
+TIMESTAMP_INPUT_TABLES = [
+    AGENCY_FILE,
+    CALENDAR_FILE,
+    CALENDAR_DATES_FILE,
+    STOP_TIMES_FILE,
+    TRIPS_FILE,
+]
 PD_DATE_FORMAT = "%Y%m%d"
 TIMESTAMP_FORMAT = "%Y-%m-%d"
 DATE_KEY = "date"
@@ -65,10 +77,16 @@ CALENDAR_REQUIRED_COLUMNS = {
 }
 
 
+@gtfs_metadata_processor(
+    input_tables=TIMESTAMP_INPUT_TABLES, metadata_attributes=["start_timestamp"]
+)
 def process_start_timestamp_for_gtfs_metadata(gtfs_representation):
     return process_timestamp_for_gtfs_metadata(gtfs_representation, START_TIMESTAMP_MAP)
 
 
+@gtfs_metadata_processor(
+    input_tables=TIMESTAMP_INPUT_TABLES, metadata_attributes=["end_timestamp"]
+)
 def process_end_timestamp_for_gtfs_metadata(gtfs_representation):
     return process_timestamp_for_gtfs_metadata(gtfs_representation, END_TIMESTAMP_MAP)
 
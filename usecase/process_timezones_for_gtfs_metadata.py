@@ -1,9 +1,14 @@
 from utilities.validators import validate_gtfs_representation
-from utilities.constants import STOP_TIMEZONE, AGENCY_TIMEZONE
+from utilities.decorators import gtfs_metadata_processor
+from utilities.constants import STOP_TIMEZONE, AGENCY_TIMEZONE, AGENCY_FILE, STOPS_FILE
 
 AGENCY_TIMEZONE_IDX = 0
 
 
+@gtfs_metadata_processor(
+    input_tables=[AGENCY_FILE, STOPS_FILE],
+    metadata_attributes=["main_timezone", "other_timezones"],
+)
 def process_timezones_for_gtfs_metadata(gtfs_representation):
     """Process all the timezones using the `stops` and the `agency` files from the GTFS dataset of the representation.
     Add the list of all the timezones to the representation metadata once processed.
@@ -0,0 +1,69 @@
+from repository.entity_export import (
+    SOURCE_ENTITY_CODE,
+    DATASET_VERSION,
+    DATASET_VERSION_ENTITY_CODE,
+)
+from usecase.create_dataset_entity_for_gtfs_metadata import (
+    link_dataset_version_to_source,
+)
+from utilities.wikibase_write_queue import (
+    WikibaseWriteQueue,
+    DEFAULT_MAX_QUEUE_SIZE,
+    DEFAULT_MAX_WRITERS,
+)
+
+
+def replay_entity_export(
+    entity_export,
+    write_session,
+    max_writers=DEFAULT_MAX_WRITERS,
+    max_size=DEFAULT_MAX_QUEUE_SIZE,
+):
+    """Create on the Database the dataset versions of an entity export, and link them to their source.
+    The dataset versions are written from a WikibaseWriteQueue, with `max_writers` writes in flight.
+    Each dataset version written is recorded in the export, so an interrupted replay does not write it again.
+    The export is then replaced by the dataset versions which could not be written, with the entity code
+    of the ones already created, so replaying the export again does not create the written ones twice.
+    :param entity_export: The EntityExport of the dataset versions to create.
+    :param write_session: The WikibaseWriteSession shared by the writes.
+    :param max_writers: The number of concurrent writers.
+    :param max_size: The maximum number of dataset versions waiting to be written.
+    :return: The dataset versions of the export which could not be written.
+    """
+
+    def write(dataset_version):
+        entity_code = write_exported_dataset_version(dataset_version, write_session)
+        entity_export.set_written(dataset_version)
+        return entity_code
+
+    write_queue = WikibaseWriteQueue(write, max_size=max_size, max_writers=max_writers)
+    for dataset_version in entity_export.get_pending_dataset_versions():
+        write_queue.put(dataset_version)
+    failed_dataset_versions = write_queue.close()
+    entity_export.replace_dataset_versions(failed_dataset_versions)
+    print(
+        f"{write_queue.get_written_count()} dataset versions replayed, "
+        f"{len(failed_dataset_versions)} failed\n"
+    )
+    return failed_dataset_versions
+
+
+def write_exported_dataset_version(dataset_version, write_session):
+    """Create a dataset version of an entity export and link it to its source.
+    The entity code of the dataset version is kept in the dataset version,
+    so the dataset version entity is only created once when the write is retried.
+    :param dataset_version: The dataset version, with the entity code of its source
+    and its labels and claims in the Wikibase JSON format.
+    :param write_session: The WikibaseWriteSession shared by the writes.
+    :return: The entity code of the dataset version.
+    """
+    if dataset_version.get(DATASET_VERSION_ENTITY_CODE) is None:
+        dataset_version[DATASET_VERSION_ENTITY_CODE] = write_session.edit_entity(
+            dataset_version[DATASET_VERSION]
+        )
+    link_dataset_version_to_source(
+        dataset_version[SOURCE_ENTITY_CODE],
+        dataset_version[DATASET_VERSION_ENTITY_CODE],
+        write_session,
+    )
+    return dataset_version[DATASET_VERSION_ENTITY_CODE]
@@ -21,7 +21,7 @@ class TestCreateDatasetEntity(TestCase):
 
     @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.os.environ")
     @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.wbi_core")
-    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.import_entity")
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.import_entity_claims")
     def test_create_dataset_entity_with_valid_parameter(
         self, mock_importer, mock_wbi_core, mock_env
     ):
@@ -44,3 +44,92 @@ class TestCreateDatasetEntity(TestCase):
         self.assertEqual(
             under_test.metadata.source_entity_code, "test_source_entity_code"
         )
+
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.os.environ")
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.wbi_core")
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.import_entity_claims")
+    def test_create_dataset_entity_should_share_write_session(
+        self, mock_importer, mock_wbi_core, mock_env
+    ):
+        mock_importer.side_effect = [
+            "test_dataset_version_code",
+            "test_source_entity_code",
+        ]
+        mock_write_session = MagicMock()
+
+        mock_gtfs_representation = MagicMock()
+        mock_gtfs_representation.__class__ = GtfsRepresentation
+        mock_gtfs_metadata = MagicMock()
+        mock_gtfs_metadata.__class__ = GtfsMetadata
+        type(mock_gtfs_representation).metadata = mock_gtfs_metadata
+
+        create_dataset_entity_for_gtfs_metadata(
+            mock_gtfs_representation, write_session=mock_write_session
+        )
+        self.assertEqual(mock_importer.call_count, 2)
+        for call in mock_importer.call_args_list:
+            self.assertIs(call.kwargs["write_session"], mock_write_session)
+
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.os.environ")
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.wbi_core")
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.import_entity_claims")
+    def test_create_dataset_entity_retry_should_only_link_dataset_version(
+        self, mock_importer, mock_wbi_core, mock_env
+    ):
+        mock_importer.return_value = "test_source_entity_code"
+
+        mock_gtfs_representation = MagicMock()
+        mock_gtfs_representation.__class__ = GtfsRepresentation
+        mock_gtfs_metadata = MagicMock()
+        mock_gtfs_metadata.__class__ = GtfsMetadata
+        mock_gtfs_metadata.source_entity_code = "test_source_entity_code"
+        mock_gtfs_metadata.dataset_version_entity_code = "test_dataset_version_code"
+        type(mock_gtfs_representation).metadata = mock_gtfs_metadata
+
+        create_dataset_entity_for_gtfs_metadata(mock_gtfs_representation)
+        create_dataset_entity_for_gtfs_metadata(mock_gtfs_representation)
+        self.assertEqual(mock_importer.call_count, 2)
+        for call in mock_importer.call_args_list:
+            self.assertEqual(call.kwargs["item_id"], "test_source_entity_code")
+        statement_ids = [
+            call.args[0]
+            for call in mock_wbi_core.ItemID.return_value.set_id.call_args_list
+        ]
+        self.assertEqual(len(statement_ids), 2)
+        self.assertEqual(statement_ids[0], statement_ids[1])
+
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.os.environ")
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.wbi_core")
+    @mock.patch("usecase.create_dataset_entity_for_gtfs_metadata.import_entity_claims")
+    def test_create_dataset_entity_with_entity_export_should_not_write(
+        self, mock_importer, mock_wbi_core, mock_env
+    ):
+        mock_entity_export = MagicMock()
+
+        mock_gtfs_representation = MagicMock()
+        mock_gtfs_representation.__class__ = GtfsRepresentation
+        mock_gtfs_metadata = MagicMock()
+        mock_gtfs_metadata.__class__ = GtfsMetadata
+        mock_gtfs_metadata.source_entity_code = "test_source_entity_code"
+        mock_gtfs_metadata.dataset_version_name = "test_dataset_version_name"
+        mock_gtfs_metadata.sha1_hash = "test_sha1_hash"
+        type(mock_gtfs_representation).metadata = mock_gtfs_metadata
+
+        under_test = create_dataset_entity_for_gtfs_metadata(
+            mock_gtfs_representation, entity_export=mock_entity_export
+        )
+        self.assertEqual(under_test, mock_gtfs_representation)
+        mock_importer.assert_not_called()
+        mock_entity_export.add_dataset_version.assert_called_once()
+        (
+            source_entity_code,
+            dataset_version_json,
+        ) = mock_entity_export.add_dataset_version.call_args.args
+        self.assertEqual(source_entity_code, "test_source_entity_code")
+        self.assertEqual(
+            dataset_version_json["labels"]["en"]["value"], "test_dataset_version_name"
+        )
+        self.assertEqual(
+            mock_entity_export.add_dataset_version.call_args.kwargs["sha1_hash"],
+            "test_sha1_hash",
+        )
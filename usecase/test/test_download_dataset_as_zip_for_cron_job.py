@@ -1,15 +1,41 @@
 from unittest import TestCase, mock
 from unittest.mock import MagicMock
+from tempfile import TemporaryDirectory
+from hashlib import sha1
+from zipfile import ZipFile, ZipInfo
+from threading import Lock
 import datetime
+import io
+import json
 import os
+import time
+from requests.exceptions import ChunkedEncodingError, ConnectionError, HTTPError
+from repository.dataset_store import DatasetStore
+from repository.download_report import DownloadReport
+from repository.http_validator_cache import HttpValidatorCache
+from utilities.download_utils import DownloadSession
 from representation.dataset_infos import DatasetInfos
 from usecase.download_dataset_as_zip import (
     download_dataset_as_zip_for_cron_job,
     add_download_date_for_cron_job,
+    count_download_hosts,
 )
 from utilities.decorators import ignore_resource_warnings
 
 
+def create_test_zip(content="stop_id\n1\n"):
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr(
+            ZipInfo("stops.txt", date_time=(2021, 1, 1, 0, 0, 0)), content
+        )
+    return buffer.getvalue()
+
+
+TEST_ZIP_CONTENT = create_test_zip()
+TEST_ZIP_SHA1_HASH = sha1(TEST_ZIP_CONTENT).hexdigest()
+
+
 class TestAddDownloadDateForCronJob(TestCase):
     @mock.patch("usecase.download_dataset_as_zip.date")
     def test_add_download_date_for_cron_job(self, mock_date):
@@ -22,6 +48,23 @@ class TestAddDownloadDateForCronJob(TestCase):
         self.assertEqual(under_test.download_date, "2021-01-01")
 
 
+class TestCountDownloadHosts(TestCase):
+    def test_count_download_hosts_should_count_urls_and_mirror_urls(self):
+        test_datasets_infos = []
+        for url, mirror_urls in [
+            ("http://test.com/a.zip", ["http://mirror.com/a.zip"]),
+            ("http://test.com/b.zip", []),
+            ("https://other.com/c.zip", ["http://mirror.com/c.zip"]),
+        ]:
+            dataset_infos = DatasetInfos()
+            dataset_infos.url = url
+            dataset_infos.mirror_urls = mirror_urls
+            test_datasets_infos.append(dataset_infos)
+
+        self.assertEqual(count_download_hosts(test_datasets_infos), 3)
+        self.assertEqual(count_download_hosts([]), 1)
+
+
 class TestDownloadDatasetAsZipForCronJob(TestCase):
     def test_download_dataset_with_none_path_to_data(self):
         mock_dataset_infos = MagicMock()
@@ -92,7 +135,11 @@ class TestDownloadDatasetAsZipForCronJob(TestCase):
 
     @ignore_resource_warnings
     @mock.patch("usecase.download_dataset_as_zip.add_download_date_for_cron_job")
-    def test_download_dataset_with_dataset_url(self, mock_date_func):
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_with_dataset_url(self, mock_get, mock_date_func):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
         test_entity_code = "test_entity_code"
         test_url = "http://test.com/url_value.zip"
         test_zip_path = "./test_entity_code_url_value.zip"
@@ -119,3 +166,441 @@ class TestDownloadDatasetAsZipForCronJob(TestCase):
         self.assertEqual(under_test_dataset_info.zip_path, test_zip_path)
         self.assertTrue(os.path.exists("./test_entity_code_url_value.zip"))
         os.remove("./test_entity_code_url_value.zip")
+        self.assertEqual(mock_get.call_args[0][0], test_url)
+
+    def test_download_dataset_with_invalid_max_workers(self):
+        mock_datasets_infos = []
+        self.assertRaises(
+            TypeError,
+            download_dataset_as_zip_for_cron_job,
+            "./",
+            mock_datasets_infos,
+            max_workers=0,
+        )
+        self.assertRaises(
+            TypeError,
+            download_dataset_as_zip_for_cron_job,
+            "./",
+            mock_datasets_infos,
+            max_workers_per_host=None,
+        )
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_concurrently_should_limit_host_and_keep_order(
+        self, mock_get
+    ):
+        test_max_workers_per_host = 2
+        lock = Lock()
+        in_progress_by_host = {}
+        max_in_progress_by_host = {}
+
+        def get(url, **kwargs):
+            host = url.split("/")[2]
+            with lock:
+                in_progress_by_host[host] = in_progress_by_host.get(host, 0) + 1
+                max_in_progress_by_host[host] = max(
+                    max_in_progress_by_host.get(host, 0), in_progress_by_host[host]
+                )
+            time.sleep(0.01)
+            with lock:
+                in_progress_by_host[host] -= 1
+            response = MagicMock()
+            response.status_code = 200
+            response.headers = {}
+            response.iter_content.return_value = [create_test_zip(url)]
+            return response
+
+        mock_get.side_effect = get
+
+        mock_datasets_infos = []
+        for index in range(12):
+            dataset_infos = DatasetInfos()
+            dataset_infos.entity_code = f"Q{index}"
+            dataset_infos.url = f"http://host{index % 3}.com/dataset_{index}.zip"
+            mock_datasets_infos.append(dataset_infos)
+
+        with TemporaryDirectory() as path_to_data:
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data,
+                mock_datasets_infos,
+                max_workers=6,
+                max_workers_per_host=test_max_workers_per_host,
+            )
+            self.assertEqual(
+                [dataset_infos.entity_code for dataset_infos in under_test],
+                [f"Q{index}" for index in range(12)],
+            )
+            for dataset_infos in under_test:
+                self.assertTrue(os.path.exists(dataset_infos.zip_path))
+
+        self.assertEqual(len(max_in_progress_by_host), 3)
+        for max_in_progress in max_in_progress_by_host.values():
+            self.assertLessEqual(max_in_progress, test_max_workers_per_host)
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_should_stream_and_compute_sha1(self, mock_get):
+        test_sha1_hash = TEST_ZIP_SHA1_HASH
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.iter_content.return_value = [
+            TEST_ZIP_CONTENT[:4],
+            b"",
+            TEST_ZIP_CONTENT[4:],
+        ]
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = "http://test.com/url_value.zip"
+
+        with TemporaryDirectory() as path_to_data:
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data, [dataset_infos]
+            )
+            self.assertEqual(len(under_test), 1)
+            with open(under_test[0].zip_path, "rb") as f:
+                self.assertEqual(f.read(), TEST_ZIP_CONTENT)
+
+        self.assertEqual(under_test[0].sha1_hash, test_sha1_hash)
+        mock_get.assert_called_once_with(
+            "http://test.com/url_value.zip",
+            allow_redirects=True,
+            stream=True,
+            headers={},
+            timeout=(10, 60),
+        )
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_with_existing_sha1_should_discard_dataset(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = "http://test.com/url_value.zip"
+        dataset_infos.previous_sha1_hashes = {TEST_ZIP_SHA1_HASH}
+
+        with TemporaryDirectory() as path_to_data:
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data, [dataset_infos]
+            )
+            self.assertEqual(len(under_test), 0)
+            self.assertEqual(os.listdir(path_to_data), [])
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_not_modified_should_discard_dataset(self, mock_get):
+        test_url = "http://test.com/url_value.zip"
+        test_sha1_hash = TEST_ZIP_SHA1_HASH
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {"ETag": '"test_etag"'}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = test_url
+
+        with TemporaryDirectory() as path_to_data:
+            test_cache = HttpValidatorCache(os.path.join(path_to_data, "cache.json"))
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data, [dataset_infos], http_validator_cache=test_cache
+            )
+            self.assertEqual(len(under_test), 1)
+            self.assertTrue(os.path.exists(os.path.join(path_to_data, "cache.json")))
+
+            # The dataset version is now in the database
+            dataset_infos.previous_sha1_hashes = {test_sha1_hash}
+            mock_get.return_value.status_code = 304
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data, [dataset_infos], http_validator_cache=test_cache
+            )
+            self.assertEqual(len(under_test), 0)
+            mock_get.assert_called_with(
+                test_url,
+                allow_redirects=True,
+                stream=True,
+                headers={"If-None-Match": '"test_etag"'},
+                timeout=(10, 60),
+            )
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_from_mirror_should_not_cache_mirror_validators(
+        self, mock_get
+    ):
+        test_url = "http://test.com/url_value.zip"
+        test_mirror_url = "http://mirror.com/url_value.zip"
+        error_response = MagicMock()
+        error_response.status_code = 404
+        error_response.raise_for_status.side_effect = HTTPError("404")
+        mirror_response = MagicMock()
+        mirror_response.status_code = 200
+        mirror_response.headers = {"ETag": '"mirror_etag"'}
+        mirror_response.iter_content.return_value = [TEST_ZIP_CONTENT]
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = test_url
+        dataset_infos.mirror_urls = [test_mirror_url]
+
+        with TemporaryDirectory() as path_to_data:
+            test_cache = HttpValidatorCache(os.path.join(path_to_data, "cache.json"))
+            test_cache.set_validators(
+                "Q80", test_url, {"ETag": '"test_etag"'}, "old_sha1_hash"
+            )
+            mock_get.side_effect = lambda url, **kwargs: (
+                error_response if url == test_url else mirror_response
+            )
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data, [dataset_infos], http_validator_cache=test_cache
+            )
+            self.assertEqual(len(under_test), 1)
+            self.assertIsNone(test_cache.get_validators("Q80", test_url))
+
+            # The next download of the dataset URL is not conditional
+            dataset_infos.previous_sha1_hashes = {TEST_ZIP_SHA1_HASH}
+            self.assertEqual(
+                test_cache.get_conditional_headers(
+                    "Q80", test_url, dataset_infos.previous_sha1_hashes
+                ),
+                {},
+            )
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_not_modified_in_dataset_store_should_reuse_dataset(
+        self, mock_get
+    ):
+        test_url = "http://test.com/url_value.zip"
+        test_sha1_hash = TEST_ZIP_SHA1_HASH
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {"ETag": '"test_etag"'}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = test_url
+
+        with TemporaryDirectory() as path_to_data:
+            test_cache = HttpValidatorCache(os.path.join(path_to_data, "cache.json"))
+            test_store = DatasetStore(os.path.join(path_to_data, "store"))
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data,
+                [dataset_infos],
+                http_validator_cache=test_cache,
+                dataset_store=test_store,
+            )
+            self.assertEqual(len(under_test), 1)
+            self.assertEqual(
+                under_test[0].zip_path,
+                test_store.get_reference_path("Q80", test_sha1_hash),
+            )
+            self.assertFalse(
+                os.path.exists(os.path.join(path_to_data, "Q80_url_value.zip"))
+            )
+
+            # The dataset version failed to be processed, it is not in the database
+            mock_get.return_value.status_code = 304
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data,
+                [dataset_infos],
+                http_validator_cache=test_cache,
+                dataset_store=test_store,
+            )
+            self.assertEqual(len(under_test), 1)
+            self.assertEqual(under_test[0].sha1_hash, test_sha1_hash)
+            with open(under_test[0].zip_path, "rb") as f:
+                self.assertEqual(f.read(), TEST_ZIP_CONTENT)
+            mock_get.assert_called_with(
+                test_url,
+                allow_redirects=True,
+                stream=True,
+                headers={"If-None-Match": '"test_etag"'},
+                timeout=(10, 60),
+            )
+
+    @mock.patch("usecase.download_dataset_as_zip.probe_remote_zip_fingerprint")
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_with_same_zip_fingerprint_should_discard_dataset(
+        self, mock_get, mock_probe
+    ):
+        test_url = "http://test.com/url_value.zip"
+        test_sha1_hash = "test_sha1_hash"
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = test_url
+        dataset_infos.previous_sha1_hashes = {test_sha1_hash}
+
+        with TemporaryDirectory() as path_to_data:
+            test_cache = HttpValidatorCache(os.path.join(path_to_data, "cache.json"))
+            test_cache.set_validators(
+                "Q80",
+                test_url,
+                {"Accept-Ranges": "bytes"},
+                test_sha1_hash,
+                "test_fingerprint",
+            )
+
+            mock_probe.return_value = "test_fingerprint"
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data, [dataset_infos], http_validator_cache=test_cache
+            )
+            self.assertEqual(len(under_test), 0)
+            mock_probe.assert_called_once()
+            mock_get.assert_not_called()
+
+            mock_probe.return_value = "other_fingerprint"
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
+            mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data, [dataset_infos], http_validator_cache=test_cache
+            )
+            self.assertEqual(len(under_test), 1)
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_interrupted_should_resume_on_next_download(
+        self, mock_get
+    ):
+        test_url = "http://test.com/url_value.zip"
+        test_headers = {"ETag": '"test_etag"'}
+
+        def interrupted_content(chunk_size):
+            yield TEST_ZIP_CONTENT[:4]
+            raise ChunkedEncodingError("Connection dropped")
+
+        interrupted_response = MagicMock()
+        interrupted_response.status_code = 200
+        interrupted_response.headers = test_headers
+        interrupted_response.iter_content.side_effect = interrupted_content
+
+        resumed_response = MagicMock()
+        resumed_response.status_code = 206
+        resumed_response.headers = {
+            "Content-Range": f"bytes 4-{len(TEST_ZIP_CONTENT) - 1}/{len(TEST_ZIP_CONTENT)}",
+            **test_headers,
+        }
+        resumed_response.iter_content.return_value = [TEST_ZIP_CONTENT[4:]]
+        mock_get.side_effect = [interrupted_response, resumed_response]
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = test_url
+
+        with TemporaryDirectory() as path_to_data:
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data,
+                [dataset_infos],
+                download_session=DownloadSession(max_retries=0),
+            )
+            self.assertEqual(len(under_test), 0)
+            self.assertEqual(
+                sorted(os.listdir(path_to_data)),
+                ["Q80_url_value.zip.part", "Q80_url_value.zip.part.json"],
+            )
+
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data, [dataset_infos]
+            )
+            self.assertEqual(len(under_test), 1)
+            self.assertEqual(os.listdir(path_to_data), ["Q80_url_value.zip"])
+            with open(under_test[0].zip_path, "rb") as f:
+                self.assertEqual(f.read(), TEST_ZIP_CONTENT)
+
+        self.assertEqual(under_test[0].sha1_hash, TEST_ZIP_SHA1_HASH)
+        mock_get.assert_called_with(
+            test_url,
+            allow_redirects=True,
+            stream=True,
+            headers={"Range": "bytes=4-", "If-Range": '"test_etag"'},
+            timeout=(10, 60),
+        )
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_with_server_errors_should_retry(self, mock_get):
+        error_response = MagicMock()
+        error_response.status_code = 503
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {}
+        response.iter_content.return_value = [TEST_ZIP_CONTENT]
+        mock_get.side_effect = [
+            ConnectionError("Connection reset"),
+            error_response,
+            response,
+        ]
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = "http://test.com/url_value.zip"
+
+        with TemporaryDirectory() as path_to_data:
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data,
+                [dataset_infos],
+                download_session=DownloadSession(max_retries=2, backoff_factor=0),
+            )
+        self.assertEqual(len(under_test), 1)
+        self.assertEqual(mock_get.call_count, 3)
+        error_response.close.assert_called_once()
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_with_too_many_server_errors_should_skip_dataset(
+        self, mock_get
+    ):
+        mock_get.return_value.status_code = 503
+        mock_get.return_value.raise_for_status.side_effect = HTTPError("503")
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = "http://test.com/url_value.zip"
+
+        with TemporaryDirectory() as path_to_data:
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data,
+                [dataset_infos],
+                download_session=DownloadSession(max_retries=2, backoff_factor=0),
+            )
+        self.assertEqual(len(under_test), 0)
+        self.assertEqual(mock_get.call_count, 3)
+
+    @mock.patch("usecase.download_dataset_as_zip.estimate_dns_time")
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_with_download_report_should_record_telemetry(
+        self, mock_get, mock_estimate_dns_time
+    ):
+        error_response = MagicMock()
+        error_response.status_code = 503
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {}
+        response.elapsed = datetime.timedelta(milliseconds=100)
+        response.iter_content.return_value = [TEST_ZIP_CONTENT]
+        mock_get.side_effect = [error_response, response]
+        mock_estimate_dns_time.return_value = 0.01
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.url = "http://test.com/url_value.zip"
+
+        with TemporaryDirectory() as path_to_data:
+            test_path = os.path.join(path_to_data, "report.json")
+            under_test = download_dataset_as_zip_for_cron_job(
+                path_to_data,
+                [dataset_infos],
+                download_session=DownloadSession(max_retries=1, backoff_factor=0),
+                download_report=DownloadReport(test_path),
+            )
+            self.assertEqual(len(under_test), 1)
+            with open(test_path) as f:
+                test_report = json.load(f)
+
+        test_download = test_report["downloads"][0]
+        self.assertEqual(test_download["entity_code"], "Q80")
+        self.assertEqual(test_download["dns_time_estimate"], 0.01)
+        self.assertIsNone(test_download["connect_time"])
+        self.assertEqual(test_download["time_to_first_byte"], 0.1)
+        self.assertEqual(test_download["bytes"], len(TEST_ZIP_CONTENT))
+        self.assertEqual(test_download["status_code"], 200)
+        self.assertEqual(test_download["retries"], 1)
+        self.assertEqual(test_download["result"], "downloaded")
+        self.assertIsNotNone(test_download["total_time"])
+        self.assertEqual(test_report["summary"]["downloads_count"], 1)
@@ -1,5 +1,7 @@
 from unittest import TestCase, mock
 from unittest.mock import MagicMock
+from zipfile import ZipFile, ZipInfo
+import io
 import os
 from representation.dataset_infos import DatasetInfos
 from usecase.download_dataset_as_zip import (
@@ -9,6 +11,18 @@ from usecase.download_dataset_as_zip import (
 from utilities.decorators import ignore_resource_warnings
 
 
+def create_test_zip():
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr(
+            ZipInfo("stops.txt", date_time=(2021, 1, 1, 0, 0, 0)), "stop_id\n1\n"
+        )
+    return buffer.getvalue()
+
+
+TEST_ZIP_CONTENT = create_test_zip()
+
+
 class TestAddDownloadDateForCronJob(TestCase):
     def test_add_download_date_for_cron_job(self):
         test_url = "https://transitfeeds.com/p/source-id/000/20210101/download"
@@ -93,7 +107,11 @@ class TestDownloadDatasetAsZipForOmdHarvesting(TestCase):
 
     @ignore_resource_warnings
     @mock.patch("usecase.download_dataset_as_zip.add_download_date_for_omd_harvesting")
-    def test_download_dataset_with_dataset_url(self, mock_date_func):
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_dataset_with_dataset_url(self, mock_get, mock_date_func):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
         test_entity_code = "test_entity_code"
         test_url = "http://test.com/url_value.zip"
         test_zip_path = "./test_entity_code_url_value.zip"
@@ -120,3 +138,4 @@ class TestDownloadDatasetAsZipForOmdHarvesting(TestCase):
         self.assertEqual(under_test_dataset_info.zip_path, test_zip_path)
         self.assertTrue(os.path.exists("./test_entity_code_url_value.zip"))
         os.remove("./test_entity_code_url_value.zip")
+        self.assertEqual(mock_get.call_args[0][0], test_url)
@@ -1,10 +1,16 @@
 from unittest import TestCase, mock
+from tempfile import TemporaryDirectory
+from datetime import datetime
+import os
+from repository.catalog_snapshot import CatalogSnapshot
 
 from usecase.extract_datasets_infos_from_database import (
     extract_gtfs_datasets_infos_from_database,
     extract_gbfs_datasets_infos_from_database,
-    extract_previous_sha1_hashes,
-    extract_source_infos,
+    extract_datasets_infos_from_catalog_snapshot,
+    extract_sha1_index_from_database,
+    TIMESTAMP_FORMAT,
+    REFRESH_OVERLAP,
 )
 from utilities.constants import (
     CLAIMS,
@@ -17,170 +23,324 @@ from utilities.constants import (
     SHA1_HASH_PROP,
     GTFS_CATALOG_OF_SOURCES_CODE,
     GBFS_CATALOG_OF_SOURCES_CODE,
+    SPARQL_VAR_LABEL,
+    SPARQL_VAR_URL,
+    SPARQL_VAR_SHA1,
+    CATALOG_PROP,
+    SOURCE_ENTITY_PROP,
+    DATASET_PROP,
+    ID,
+    LASTREVID,
 )
 
 
-class TestExtractDatabaseSha1(TestCase):
+class TestExtractDatasetsInfosFromDatabase(TestCase):
     @mock.patch("usecase.extract_datasets_infos_from_database.os.environ")
-    @mock.patch("usecase.extract_datasets_infos_from_database.wbi_core.ItemEngine")
-    @mock.patch(
-        "usecase.extract_datasets_infos_from_database.extract_dataset_version_codes"
-    )
-    def test_extract_database_sha1_with_existing_entity_codes_should_return_sha1_dict(
-        self, mock_versions_extractor, mock_item_engine, mock_env
+    @mock.patch("usecase.extract_datasets_infos_from_database.extract_catalog_infos")
+    def test_extract_gtfs_with_valid_parameters_should_return_dataset_infos(
+        self,
+        mock_catalog_infos_extractor,
+        mock_env,
     ):
         test_env = {
-            SHA1_HASH_PROP: "test_sha1_prop",
+            GTFS_CATALOG_OF_SOURCES_CODE: "test_gtfs_catalog",
         }
         mock_env.__getitem__.side_effect = test_env.__getitem__
-        mock_versions_extractor.return_value = {"Q81"}
-
-        test_entity = ["Q80"]
-        test_sha1 = {"sha1_hash"}
-
-        mock_item_engine.return_value.get_json_representation.return_value = {
-            CLAIMS: {"test_sha1_prop": [{MAINSNAK: {DATAVALUE: {VALUE: "sha1_hash"}}}]}
+        mock_catalog_infos_extractor.return_value = {
+            "Q80": {
+                SPARQL_VAR_LABEL: "test_name",
+                SPARQL_VAR_URL: [
+                    "https://openmobilitydata.org/p/test/1/latest/download",
+                    "test_url",
+                ],
+                SPARQL_VAR_SHA1: {"test_sha1_hash"},
+            },
+            "Q81": {
+                SPARQL_VAR_LABEL: None,
+                SPARQL_VAR_URL: ["test_url_without_name"],
+                SPARQL_VAR_SHA1: set(),
+            },
         }
 
-        under_test = extract_previous_sha1_hashes(test_entity)
-        self.assertEqual(under_test, test_sha1)
+        under_test = extract_gtfs_datasets_infos_from_database()
+        mock_catalog_infos_extractor.assert_called_once_with("test_gtfs_catalog")
+        self.assertEqual(len(under_test), 1)
+
+        under_test_dataset_info = under_test[0]
+        self.assertEqual(under_test_dataset_info.entity_code, "Q80")
+        self.assertEqual(under_test_dataset_info.url, "test_url")
+        self.assertEqual(
+            under_test_dataset_info.mirror_urls,
+            ["https://openmobilitydata.org/p/test/1/latest/download"],
+        )
+        self.assertEqual(under_test_dataset_info.source_name, "test_name")
+        self.assertEqual(
+            under_test_dataset_info.previous_sha1_hashes, {"test_sha1_hash"}
+        )
 
     @mock.patch("usecase.extract_datasets_infos_from_database.os.environ")
-    @mock.patch("usecase.extract_datasets_infos_from_database.wbi_core.ItemEngine")
-    @mock.patch(
-        "usecase.extract_datasets_infos_from_database.extract_dataset_version_codes"
-    )
-    def test_extract_database_sha1_with_None_sha1(
-        self, mock_versions_extractor, mock_item_engine, mock_env
+    @mock.patch("usecase.extract_datasets_infos_from_database.extract_catalog_infos")
+    def test_extract_gbfs_with_valid_parameters_should_return_dataset_infos(
+        self,
+        mock_catalog_infos_extractor,
+        mock_env,
     ):
         test_env = {
-            SHA1_HASH_PROP: "test_sha1_prop",
+            GBFS_CATALOG_OF_SOURCES_CODE: "test_gbfs_catalog",
         }
         mock_env.__getitem__.side_effect = test_env.__getitem__
-        mock_versions_extractor.return_value = {"Q81"}
+        mock_catalog_infos_extractor.return_value = {
+            "Q80": {
+                SPARQL_VAR_LABEL: "test_name",
+                SPARQL_VAR_URL: ["test_url"],
+                SPARQL_VAR_SHA1: {"test_sha1_hash"},
+            },
+        }
 
-        test_entity = ["Q80"]
+        under_test = extract_gbfs_datasets_infos_from_database()
+        mock_catalog_infos_extractor.assert_called_once_with("test_gbfs_catalog")
+        self.assertEqual(len(under_test), 1)
 
-        mock_item_engine.return_value.get_json_representation.return_value = {
-            CLAIMS: {"test_sha1_prop": [{MAINSNAK: {DATAVALUE: {VALUE: None}}}]}
-        }
+        under_test_dataset_info = under_test[0]
+        self.assertEqual(under_test_dataset_info.url, "test_url")
+        self.assertEqual(under_test_dataset_info.mirror_urls, [])
+        self.assertEqual(under_test_dataset_info.source_name, "test_name")
+        self.assertEqual(
+            under_test_dataset_info.previous_sha1_hashes, {"test_sha1_hash"}
+        )
 
-        under_test = extract_previous_sha1_hashes(test_entity)
-        self.assertEqual(under_test, set())
 
-    @mock.patch(
-        "usecase.extract_datasets_infos_from_database.extract_dataset_version_codes"
-    )
-    def test_extract_database_sha1_with_non_existing_entity_should_return_empty_sha1_dict(
-        self, mock_versions_extractor
-    ):
-        test_entity = ["mock"]
-        test_sha1 = set()
+def create_test_claims(prop, values):
+    return {prop: [{MAINSNAK: {DATAVALUE: {VALUE: value}}} for value in values]}
 
-        mock_versions_extractor.return_value = set()
 
-        under_test = extract_previous_sha1_hashes(test_entity)
-        self.assertEqual(under_test, test_sha1)
+TEST_ENV = {
+    CATALOG_PROP: "test_catalog_prop",
+    SOURCE_ENTITY_PROP: "test_source_entity_prop",
+    DATASET_PROP: "test_dataset_prop",
+    STABLE_URL_PROP: "test_url_prop",
+    SHA1_HASH_PROP: "test_sha1_prop",
+}
+TEST_SOURCE_JSON = {
+    LASTREVID: 10,
+    LABELS: {ENGLISH: {VALUE: "test_name"}},
+    CLAIMS: {
+        **create_test_claims("test_catalog_prop", [{ID: "Q1"}]),
+        **create_test_claims("test_url_prop", ["test_url"]),
+        **create_test_claims("test_dataset_prop", [{ID: "Q81"}]),
+    },
+}
+TEST_VERSION_JSON = {
+    LASTREVID: 11,
+    CLAIMS: {
+        **create_test_claims("test_source_entity_prop", [{ID: "Q80"}]),
+        **create_test_claims("test_sha1_prop", ["test_sha1_hash"]),
+    },
+}
 
 
-class TestExtractInfosTest(TestCase):
-    @mock.patch("usecase.extract_datasets_infos_from_database.os.environ")
-    @mock.patch("usecase.extract_datasets_infos_from_database.wbi_core.ItemEngine")
-    def test_extract_source_infos_with_default_parameters_should_return_dataset_infos(
-        self, mock_item_engine, mock_env
+class TestExtractDatasetsInfosFromCatalogSnapshot(TestCase):
+    def test_extract_from_catalog_snapshot_with_invalid_snapshot_should_raise_exception(
+        self,
     ):
-        test_env = {
-            STABLE_URL_PROP: "test_url_prop",
-        }
-        mock_env.__getitem__.side_effect = test_env.__getitem__
-        mock_item_engine.return_value.get_json_representation.return_value = {
-            CLAIMS: {
-                "test_url_prop": [
-                    {
-                        MAINSNAK: {
-                            DATAVALUE: {
-                                VALUE: "http://www.stl.laval.qc.ca/opendata/GTF_STL.zip"
-                            }
-                        }
-                    }
-                ],
-            },
-            LABELS: {ENGLISH: {VALUE: "test_name"}},
-        }
-
-        (
-            under_test_url,
-            under_test_name,
-        ) = extract_source_infos("Q82")
-        self.assertEqual(
-            under_test_url, "http://www.stl.laval.qc.ca/opendata/GTF_STL.zip"
+        self.assertRaises(
+            TypeError, extract_datasets_infos_from_catalog_snapshot, "Q1", None
         )
-        self.assertEqual(under_test_name, "test_name")
-
 
-class TestExtractDatasetsInfosFromDatabase(TestCase):
     @mock.patch("usecase.extract_datasets_infos_from_database.os.environ")
+    @mock.patch("usecase.extract_datasets_infos_from_database.extract_recent_changes")
+    @mock.patch("usecase.extract_datasets_infos_from_database.extract_entities_json")
     @mock.patch(
         "usecase.extract_datasets_infos_from_database.extract_source_entity_codes"
     )
-    @mock.patch("usecase.extract_datasets_infos_from_database.extract_source_infos")
-    @mock.patch(
-        "usecase.extract_datasets_infos_from_database.extract_previous_sha1_hashes"
-    )
-    def test_extract_gtfs_with_valid_parameters_should_return_dataset_infos(
+    def test_extract_from_catalog_snapshot_should_load_then_refresh_changed_items(
         self,
-        mock_sha1_extractor,
-        mock_source_infos_extractor,
         mock_entity_codes_extractor,
+        mock_entities_extractor,
+        mock_recent_changes_extractor,
         mock_env,
     ):
-        test_env = {
-            GTFS_CATALOG_OF_SOURCES_CODE: "test_gtfs_catalog",
+        mock_env.__getitem__.side_effect = TEST_ENV.__getitem__
+        test_entities_json = {"Q80": TEST_SOURCE_JSON, "Q81": TEST_VERSION_JSON}
+        mock_entities_extractor.side_effect = lambda entity_codes: {
+            entity_code: test_entities_json[entity_code] for entity_code in entity_codes
         }
-        mock_env.__getitem__.side_effect = test_env.__getitem__
         mock_entity_codes_extractor.return_value = ["Q80"]
-        mock_source_infos_extractor.return_value = "test_url", "test_name"
-        mock_sha1_extractor.return_value = {"test_sha1_hash"}
 
-        under_test = extract_gtfs_datasets_infos_from_database()
-        self.assertEqual(len(under_test), 1)
+        with TemporaryDirectory() as path_to_data:
+            test_snapshot = CatalogSnapshot(
+                os.path.join(path_to_data, "catalog.sqlite")
+            )
 
-        under_test_dataset_info = under_test[0]
-        self.assertEqual(under_test_dataset_info.url, "test_url")
-        self.assertEqual(under_test_dataset_info.source_name, "test_name")
-        self.assertEqual(
-            under_test_dataset_info.previous_sha1_hashes, {"test_sha1_hash"}
-        )
+            under_test = extract_datasets_infos_from_catalog_snapshot(
+                "Q1", test_snapshot
+            )
+            self.assertEqual(len(under_test), 1)
+            self.assertEqual(under_test[0].entity_code, "Q80")
+            self.assertEqual(under_test[0].url, "test_url")
+            self.assertEqual(under_test[0].source_name, "test_name")
+            self.assertEqual(under_test[0].previous_sha1_hashes, {"test_sha1_hash"})
+            mock_recent_changes_extractor.assert_not_called()
+
+            # A new dataset version of the source, and a change already in the snapshot
+            test_entities_json["Q82"] = {
+                LASTREVID: 13,
+                CLAIMS: {
+                    **create_test_claims("test_source_entity_prop", [{ID: "Q80"}]),
+                    **create_test_claims("test_sha1_prop", ["new_sha1_hash"]),
+                },
+            }
+            mock_recent_changes_extractor.return_value = {"Q81": 11, "Q82": 13}
+            mock_entities_extractor.reset_mock()
+
+            under_test = extract_datasets_infos_from_catalog_snapshot(
+                "Q1", test_snapshot
+            )
+            mock_entity_codes_extractor.assert_called_once()
+            mock_entities_extractor.assert_any_call(["Q82"])
+            # The changes are requested since before the last refresh, in case the local clock is ahead
+            self.assertLessEqual(
+                datetime.strptime(
+                    mock_recent_changes_extractor.call_args[0][0], TIMESTAMP_FORMAT
+                ),
+                datetime.utcnow() - REFRESH_OVERLAP,
+            )
+            self.assertEqual(
+                under_test[0].previous_sha1_hashes,
+                {"test_sha1_hash", "new_sha1_hash"},
+            )
+            test_snapshot.close()
 
     @mock.patch("usecase.extract_datasets_infos_from_database.os.environ")
+    @mock.patch("usecase.extract_datasets_infos_from_database.extract_recent_changes")
+    @mock.patch("usecase.extract_datasets_infos_from_database.extract_entities_json")
     @mock.patch(
         "usecase.extract_datasets_infos_from_database.extract_source_entity_codes"
     )
-    @mock.patch("usecase.extract_datasets_infos_from_database.extract_source_infos")
+    def test_refresh_catalog_snapshot_should_keep_sources_of_other_catalog(
+        self,
+        mock_entity_codes_extractor,
+        mock_entities_extractor,
+        mock_recent_changes_extractor,
+        mock_env,
+    ):
+        mock_env.__getitem__.side_effect = TEST_ENV.__getitem__
+        test_gbfs_source_json = {
+            LASTREVID: 20,
+            LABELS: {ENGLISH: {VALUE: "test_gbfs_name"}},
+            CLAIMS: {
+                **create_test_claims("test_catalog_prop", [{ID: "Q2"}]),
+                **create_test_claims("test_url_prop", ["test_gbfs_url"]),
+            },
+        }
+        test_entities_json = {
+            "Q80": TEST_SOURCE_JSON,
+            "Q81": TEST_VERSION_JSON,
+            "Q90": test_gbfs_source_json,
+        }
+        mock_entities_extractor.side_effect = lambda entity_codes: {
+            entity_code: test_entities_json[entity_code] for entity_code in entity_codes
+        }
+        mock_entity_codes_extractor.side_effect = lambda catalog_code: (
+            ["Q80"] if catalog_code == "Q1" else ["Q90"]
+        )
+
+        with TemporaryDirectory() as path_to_data:
+            test_snapshot = CatalogSnapshot(
+                os.path.join(path_to_data, "catalog.sqlite")
+            )
+            extract_datasets_infos_from_catalog_snapshot("Q1", test_snapshot)
+            extract_datasets_infos_from_catalog_snapshot("Q2", test_snapshot)
+
+            # The GBFS source changed, and the GTFS catalog is refreshed first
+            test_entities_json["Q90"] = {**test_gbfs_source_json, LASTREVID: 21}
+            mock_recent_changes_extractor.return_value = {"Q90": 21}
+            under_test = extract_datasets_infos_from_catalog_snapshot(
+                "Q1", test_snapshot
+            )
+            self.assertEqual(
+                [dataset_infos.entity_code for dataset_infos in under_test], ["Q80"]
+            )
+            self.assertEqual(test_snapshot.get_source_entity_codes("Q2"), ["Q90"])
+
+            under_test = extract_datasets_infos_from_catalog_snapshot(
+                "Q2", test_snapshot
+            )
+            self.assertEqual(
+                [dataset_infos.entity_code for dataset_infos in under_test], ["Q90"]
+            )
+            test_snapshot.close()
+
+    @mock.patch("usecase.extract_datasets_infos_from_database.os.environ")
+    @mock.patch("usecase.extract_datasets_infos_from_database.extract_recent_changes")
+    @mock.patch("usecase.extract_datasets_infos_from_database.extract_entities_json")
     @mock.patch(
-        "usecase.extract_datasets_infos_from_database.extract_previous_sha1_hashes"
+        "usecase.extract_datasets_infos_from_database.extract_source_entity_codes"
     )
-    def test_extract_gbfs_with_valid_parameters_should_return_dataset_infos(
+    def test_refresh_catalog_snapshot_should_remove_dataset_version_without_sha1_hash(
         self,
-        mock_sha1_extractor,
-        mock_source_infos_extractor,
         mock_entity_codes_extractor,
+        mock_entities_extractor,
+        mock_recent_changes_extractor,
         mock_env,
     ):
-        test_env = {
-            GBFS_CATALOG_OF_SOURCES_CODE: "test_gbfs_catalog",
+        mock_env.__getitem__.side_effect = TEST_ENV.__getitem__
+        test_entities_json = {"Q80": TEST_SOURCE_JSON, "Q81": TEST_VERSION_JSON}
+        mock_entities_extractor.side_effect = lambda entity_codes: {
+            entity_code: test_entities_json.get(entity_code, {})
+            for entity_code in entity_codes
         }
-        mock_env.__getitem__.side_effect = test_env.__getitem__
         mock_entity_codes_extractor.return_value = ["Q80"]
-        mock_source_infos_extractor.return_value = "test_url", "test_name"
-        mock_sha1_extractor.return_value = {"test_sha1_hash"}
 
-        under_test = extract_gbfs_datasets_infos_from_database()
-        self.assertEqual(len(under_test), 1)
+        with TemporaryDirectory() as path_to_data:
+            test_snapshot = CatalogSnapshot(
+                os.path.join(path_to_data, "catalog.sqlite")
+            )
+            extract_datasets_infos_from_catalog_snapshot("Q1", test_snapshot)
+            test_snapshot.set_dataset_version("Q82", "Q80", {"deleted_sha1_hash"}, 12)
 
-        under_test_dataset_info = under_test[0]
-        self.assertEqual(under_test_dataset_info.url, "test_url")
-        self.assertEqual(under_test_dataset_info.source_name, "test_name")
-        self.assertEqual(
-            under_test_dataset_info.previous_sha1_hashes, {"test_sha1_hash"}
-        )
+            # The SHA-1 hash claim of a dataset version is removed, and another dataset version is deleted
+            test_entities_json["Q81"] = {
+                LASTREVID: 14,
+                CLAIMS: create_test_claims("test_source_entity_prop", [{ID: "Q80"}]),
+            }
+            mock_recent_changes_extractor.return_value = {"Q81": 14, "Q82": 15}
+            under_test = extract_datasets_infos_from_catalog_snapshot(
+                "Q1", test_snapshot
+            )
+            self.assertEqual(under_test[0].previous_sha1_hashes, set())
+            self.assertFalse(test_snapshot.is_dataset_version("Q81"))
+            self.assertFalse(test_snapshot.is_dataset_version("Q82"))
+            self.assertEqual(test_snapshot.get_dataset_versions(), [])
+            test_snapshot.close()
+
+
+class TestExtractSha1IndexFromDatabase(TestCase):
+    @mock.patch(
+        "usecase.extract_datasets_infos_from_database.extract_dataset_version_sha1_hashes"
+    )
+    def test_extract_sha1_index_without_snapshot_should_query_database(
+        self, mock_sha1_hashes_extractor
+    ):
+        mock_sha1_hashes_extractor.return_value = [("test_sha1_hash", "Q80", "Q81")]
+
+        under_test = extract_sha1_index_from_database()
+        self.assertEqual(under_test.get_entries("test_sha1_hash"), [("Q80", "Q81")])
+
+    @mock.patch(
+        "usecase.extract_datasets_infos_from_database.extract_dataset_version_sha1_hashes"
+    )
+    def test_extract_sha1_index_with_snapshot_should_not_query_database(
+        self, mock_sha1_hashes_extractor
+    ):
+        with TemporaryDirectory() as path_to_data:
+            test_snapshot = CatalogSnapshot(
+                os.path.join(path_to_data, "catalog.sqlite")
+            )
+            test_snapshot.set_source("Q80", "Q1", "test_name", ["test_url"], 10)
+            test_snapshot.set_dataset_version("Q81", "Q80", {"test_sha1_hash"}, 11)
+
+            under_test = extract_sha1_index_from_database(test_snapshot)
+            self.assertEqual(under_test.get_entries("test_sha1_hash"), [("Q80", "Q81")])
+            mock_sha1_hashes_extractor.assert_not_called()
+            test_snapshot.close()
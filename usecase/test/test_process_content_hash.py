@@ -0,0 +1,70 @@
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+from tempfile import TemporaryDirectory
+import os
+from repository.dataset_version_history import DatasetVersionHistory
+from representation.dataset_infos import DatasetInfos
+from usecase.process_content_hash import (
+    process_content_hash,
+    add_datasets_to_version_history,
+)
+
+
+class TestProcessContentHash(TestCase):
+    def test_process_content_hash_with_invalid_parameters_should_raise_exception(
+        self,
+    ):
+        self.assertRaises(TypeError, process_content_hash, None, MagicMock())
+        self.assertRaises(TypeError, process_content_hash, [], None)
+
+    @mock.patch("usecase.process_content_hash.compute_gtfs_content_hash")
+    def test_process_content_hash_should_discard_same_content(
+        self, mock_compute_gtfs_content_hash
+    ):
+        mock_compute_gtfs_content_hash.side_effect = lambda path: (
+            f"content_hash_{path}",
+            {"stops.txt": f"digest_{path}"},
+        )
+
+        with TemporaryDirectory() as path_to_data:
+            test_history = DatasetVersionHistory(
+                os.path.join(path_to_data, "history.json")
+            )
+            test_history.add_version("Q80", "old_sha1", "content_hash_q80.zip", {})
+
+            datasets_infos = []
+            for entity_code in ["Q80", "Q81"]:
+                dataset_infos = DatasetInfos()
+                dataset_infos.entity_code = entity_code
+                dataset_infos.zip_path = f"{entity_code.lower()}.zip"
+                dataset_infos.sha1_hash = f"new_sha1_{entity_code}"
+                datasets_infos.append(dataset_infos)
+
+            under_test = process_content_hash(datasets_infos, test_history)
+            self.assertEqual(len(under_test), 1)
+            self.assertEqual(under_test[0].entity_code, "Q81")
+            self.assertEqual(under_test[0].content_hash, "content_hash_q81.zip")
+            self.assertEqual(
+                under_test[0].table_digests, {"stops.txt": "digest_q81.zip"}
+            )
+
+            add_datasets_to_version_history(under_test, test_history)
+            self.assertEqual(
+                DatasetVersionHistory(
+                    os.path.join(path_to_data, "history.json")
+                ).get_latest_version("Q81")["sha1_hash"],
+                "new_sha1_Q81",
+            )
+
+    def test_process_content_hash_with_invalid_zip_should_keep_dataset(self):
+        dataset_infos = DatasetInfos()
+        dataset_infos.entity_code = "Q80"
+        dataset_infos.zip_path = "./missing_file.zip"
+
+        with TemporaryDirectory() as path_to_data:
+            test_history = DatasetVersionHistory(
+                os.path.join(path_to_data, "history.json")
+            )
+            under_test = process_content_hash([dataset_infos], test_history)
+        self.assertEqual(under_test, [dataset_infos])
+        self.assertEqual(under_test[0].content_hash, "")
@@ -0,0 +1,116 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+from representation.gtfs_metadata import GtfsMetadata
+from representation.gtfs_representation import GtfsRepresentation
+from usecase.process_gtfs_metadata import (
+    process_gtfs_metadata,
+    get_changed_tables,
+    get_processed_metadata,
+)
+from utilities.decorators import gtfs_metadata_processor
+
+TEST_TABLE_DIGESTS = {
+    "agency.txt": "agency_digest",
+    "stops.txt": "stops_digest",
+}
+
+
+@gtfs_metadata_processor(["agency.txt"], ["agencies_count"])
+def process_test_agencies_count(gtfs_representation):
+    gtfs_representation.metadata.agencies_count = 1
+    return gtfs_representation
+
+
+@gtfs_metadata_processor(["stops.txt"], ["country_codes"])
+def process_test_country_codes(gtfs_representation):
+    gtfs_representation.metadata.country_codes = ["CA"]
+    return gtfs_representation
+
+
+TEST_PROCESSORS = [process_test_agencies_count, process_test_country_codes]
+
+
+class TestProcessGtfsMetadata(TestCase):
+    def setUp(self):
+        self.mock_metadata = MagicMock()
+        self.mock_metadata.__class__ = GtfsMetadata
+        self.mock_metadata.agencies_count = None
+        self.mock_metadata.country_codes = None
+
+        self.mock_gtfs_representation = MagicMock()
+        self.mock_gtfs_representation.__class__ = GtfsRepresentation
+        self.mock_gtfs_representation.metadata = self.mock_metadata
+
+    def test_process_gtfs_metadata_with_none(self):
+        self.assertRaises(TypeError, process_gtfs_metadata, None)
+
+    def test_get_changed_tables_should_compare_tables_by_file_name(self):
+        under_test = get_changed_tables(
+            {
+                "feed/agency.txt": "agency_digest",
+                "feed/stops.txt": "new_stops_digest",
+                "feed/trips.txt": "trips_digest",
+            },
+            {
+                "agency.txt": "agency_digest",
+                "stops.txt": "stops_digest",
+                "routes.txt": "routes_digest",
+            },
+        )
+        self.assertEqual(under_test, {"stops.txt", "trips.txt", "routes.txt"})
+
+    def test_process_gtfs_metadata_without_previous_version_should_run_all_processors(
+        self,
+    ):
+        under_test = process_gtfs_metadata(
+            self.mock_gtfs_representation,
+            table_digests=TEST_TABLE_DIGESTS,
+            previous_version=None,
+            processors=TEST_PROCESSORS,
+        )
+        self.assertEqual(under_test.metadata.agencies_count, 1)
+        self.assertEqual(under_test.metadata.country_codes, ["CA"])
+
+    def test_process_gtfs_metadata_should_reuse_metadata_of_unchanged_tables(self):
+        previous_version = {
+            "table_digests": {
+                "agency.txt": "agency_digest",
+                "stops.txt": "old_stops_digest",
+            },
+            "metadata": {"agencies_count": 3, "country_codes": ["US"]},
+        }
+
+        under_test = process_gtfs_metadata(
+            self.mock_gtfs_representation,
+            table_digests=TEST_TABLE_DIGESTS,
+            previous_version=previous_version,
+            processors=TEST_PROCESSORS,
+        )
+        self.assertEqual(under_test.metadata.agencies_count, 3)
+        self.assertEqual(under_test.metadata.country_codes, ["CA"])
+
+    def test_process_gtfs_metadata_with_missing_previous_metadata_should_run_processor(
+        self,
+    ):
+        previous_version = {
+            "table_digests": TEST_TABLE_DIGESTS,
+            "metadata": {"country_codes": ["US"]},
+        }
+
+        under_test = process_gtfs_metadata(
+            self.mock_gtfs_representation,
+            table_digests=TEST_TABLE_DIGESTS,
+            previous_version=previous_version,
+            processors=TEST_PROCESSORS,
+        )
+        self.assertEqual(under_test.metadata.agencies_count, 1)
+        self.assertEqual(under_test.metadata.country_codes, ["US"])
+
+    def test_get_processed_metadata_should_return_processor_attributes(self):
+        self.mock_metadata.agencies_count = 2
+        self.mock_metadata.country_codes = ["CA"]
+
+        under_test = get_processed_metadata(
+            self.mock_gtfs_representation, TEST_PROCESSORS
+        )
+        self.assertEqual(under_test, {"agencies_count": 2, "country_codes": ["CA"]})
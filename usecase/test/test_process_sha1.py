@@ -1,5 +1,7 @@
 from unittest import TestCase
+from unittest import mock
 from unittest.mock import MagicMock
+from repository.sha1_index import Sha1Index
 from usecase.process_sha1 import process_sha1
 from representation.dataset_infos import DatasetInfos
 
@@ -50,3 +52,66 @@ class TestProcessSha1(TestCase):
 
         under_test = process_sha1(mock_datasets_infos)
         self.assertEqual(len(under_test), 0)
+
+    @mock.patch("usecase.process_sha1.compute_sha1")
+    def test_process_sha1_with_sha1_computed_on_download_should_not_read_dataset(
+        self, mock_compute_sha1
+    ):
+        test_sha1_hash = "test_sha1_hash"
+
+        mock_dataset_infos = MagicMock()
+        mock_dataset_infos.__class__ = DatasetInfos
+        type(mock_dataset_infos).zip_path = "./usecase/test/resources/test.zip"
+        type(mock_dataset_infos).sha1_hash = test_sha1_hash
+        type(mock_dataset_infos).previous_sha1_hashes = {"previous_sha1_hash"}
+        mock_datasets_infos = [mock_dataset_infos]
+
+        under_test = process_sha1(mock_datasets_infos)
+        self.assertEqual(len(under_test), 1)
+        self.assertEqual(under_test[0].sha1_hash, test_sha1_hash)
+        mock_compute_sha1.assert_not_called()
+
+    @mock.patch("usecase.process_sha1.compute_sha1")
+    def test_process_sha1_with_dataset_in_dataset_store_should_not_read_dataset(
+        self, mock_compute_sha1
+    ):
+        test_sha1_hash = "test_sha1_hash"
+        test_zip_path = f"./data/store/references/Q80/{test_sha1_hash}.zip"
+        mock_dataset_store = MagicMock()
+        mock_dataset_store.find_sha1_hash.return_value = test_sha1_hash
+
+        dataset_infos = DatasetInfos()
+        dataset_infos.zip_path = test_zip_path
+        dataset_infos.sha1_hash = None
+        dataset_infos.previous_sha1_hashes = {"previous_sha1_hash"}
+
+        under_test = process_sha1([dataset_infos], mock_dataset_store)
+        self.assertEqual(len(under_test), 1)
+        self.assertEqual(under_test[0].sha1_hash, test_sha1_hash)
+        mock_dataset_store.find_sha1_hash.assert_called_with(test_zip_path)
+        mock_compute_sha1.assert_not_called()
+
+    def test_process_sha1_with_sha1_index_should_discard_source_versions_and_keep_duplicates(
+        self,
+    ):
+        test_sha1_index = Sha1Index()
+        test_sha1_index.add("test_sha1_hash", "Q80", "Q81")
+        test_sha1_index.add("other_sha1_hash", "Q90", "Q91")
+
+        datasets_infos = []
+        for entity_code, sha1_hash in [
+            ("Q80", "test_sha1_hash"),
+            ("Q82", "other_sha1_hash"),
+        ]:
+            dataset_infos = DatasetInfos()
+            dataset_infos.entity_code = entity_code
+            dataset_infos.zip_path = f"{entity_code}.zip"
+            dataset_infos.sha1_hash = sha1_hash
+            datasets_infos.append(dataset_infos)
+
+        under_test = process_sha1(datasets_infos, sha1_index=test_sha1_index)
+        self.assertEqual(len(under_test), 1)
+        self.assertEqual(under_test[0].entity_code, "Q82")
+        self.assertEqual(
+            test_sha1_index.get_source_entity_codes("other_sha1_hash"), {"Q90", "Q82"}
+        )
@@ -0,0 +1,90 @@
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+from usecase.replay_entity_export import (
+    replay_entity_export,
+    write_exported_dataset_version,
+)
+
+
+class TestReplayEntityExport(TestCase):
+    @mock.patch("usecase.replay_entity_export.link_dataset_version_to_source")
+    def test_write_exported_dataset_version(self, mock_link):
+        mock_write_session = MagicMock()
+        mock_write_session.edit_entity.return_value = "Q90"
+        test_dataset_version = {
+            "source_entity_code": "Q80",
+            "dataset_version": {"claims": []},
+        }
+
+        under_test = write_exported_dataset_version(
+            test_dataset_version, mock_write_session
+        )
+        self.assertEqual(under_test, "Q90")
+        self.assertEqual(test_dataset_version["dataset_version_entity_code"], "Q90")
+        mock_write_session.edit_entity.assert_called_once_with({"claims": []})
+        mock_link.assert_called_once_with("Q80", "Q90", mock_write_session)
+
+    @mock.patch("usecase.replay_entity_export.link_dataset_version_to_source")
+    def test_write_exported_dataset_version_already_created_should_only_link(
+        self, mock_link
+    ):
+        mock_write_session = MagicMock()
+        test_dataset_version = {
+            "source_entity_code": "Q80",
+            "dataset_version": {"claims": []},
+            "dataset_version_entity_code": "Q90",
+        }
+
+        under_test = write_exported_dataset_version(
+            test_dataset_version, mock_write_session
+        )
+        self.assertEqual(under_test, "Q90")
+        mock_write_session.edit_entity.assert_not_called()
+        mock_link.assert_called_once_with("Q80", "Q90", mock_write_session)
+
+    @mock.patch("utilities.wikibase_write_queue.time.sleep")
+    @mock.patch("usecase.replay_entity_export.link_dataset_version_to_source")
+    def test_replay_entity_export_should_return_failed_dataset_versions(
+        self, mock_link, mock_sleep
+    ):
+        def link_dataset_version_to_source(source, version, write_session):
+            if source == "Q81":
+                raise ConnectionError("test_error")
+            return source
+
+        mock_link.side_effect = link_dataset_version_to_source
+        mock_write_session = MagicMock()
+        mock_write_session.edit_entity.side_effect = lambda json: json["code"]
+        mock_entity_export = MagicMock()
+        mock_entity_export.get_pending_dataset_versions.return_value = iter(
+            [
+                {"source_entity_code": "Q80", "dataset_version": {"code": "Q90"}},
+                {"source_entity_code": "Q81", "dataset_version": {"code": "Q91"}},
+            ]
+        )
+
+        under_test = replay_entity_export(
+            mock_entity_export, mock_write_session, max_writers=1
+        )
+        self.assertEqual(
+            under_test,
+            [
+                {
+                    "source_entity_code": "Q81",
+                    "dataset_version": {"code": "Q91"},
+                    "dataset_version_entity_code": "Q91",
+                }
+            ],
+        )
+        # The failed dataset version is only created once, its link is retried
+        self.assertEqual(mock_write_session.edit_entity.call_count, 2)
+        # Only the failed dataset version is kept in the export for the next replay
+        mock_entity_export.replace_dataset_versions.assert_called_once_with(under_test)
+        # Only the written dataset version is recorded as written
+        mock_entity_export.set_written.assert_called_once_with(
+            {
+                "source_entity_code": "Q80",
+                "dataset_version": {"code": "Q90"},
+                "dataset_version_entity_code": "Q90",
+            }
+        )
@@ -1,5 +1,9 @@
 # Project constants
 ID = "id"
+ENTITY = "entity"
+ENTITIES = "entities"
+MISSING = "missing"
+LASTREVID = "lastrevid"
 CLAIMS = "claims"
 MAINSNAK = "mainsnak"
 DATAVALUE = "datavalue"
@@ -7,6 +11,7 @@ VALUE = "value"
 RESULTS = "results"
 BINDINGS = "bindings"
 LABELS = "labels"
+LANGUAGE = "language"
 ENGLISH = "en"
 DATATYPE = "datatype"
 RANK = "rank"
@@ -26,8 +31,28 @@ IS_MAXIMUM = "is_maximum"
 
 SPARQL_A = "a"
 SVC_PROP_URL_PATH = "/prop/statement/"
+SVC_CLAIM_URL_PATH = "/prop/"
 SVC_ENTITY_URL_PATH = "/entity/"
 SVC_URL = "http://wikibase.svc"
+RDFS_LABEL_URL = "http://www.w3.org/2000/01/rdf-schema#label"
+
+# SPARQL variables of the catalog query
+SPARQL_VAR_SOURCE = "source"
+SPARQL_VAR_URL = "url"
+SPARQL_VAR_LABEL = "label"
+SPARQL_VAR_SHA1 = "sha1"
+SPARQL_VAR_VERSION = "version"
+
+# GTFS files constants
+
+AGENCY_FILE = "agency.txt"
+STOPS_FILE = "stops.txt"
+ROUTES_FILE = "routes.txt"
+TRIPS_FILE = "trips.txt"
+STOP_TIMES_FILE = "stop_times.txt"
+CALENDAR_FILE = "calendar.txt"
+CALENDAR_DATES_FILE = "calendar_dates.txt"
+FEED_INFO_FILE = "feed_info.txt"
 
 # GTFS columns constants
 
@@ -77,6 +102,13 @@ TRIP_ID = "trip_id"
 
 # Define regex pattern for dataset version entity code in response retrieved by SPARQL query
 SPARQL_ENTITY_CODE_REGEX = "/(Q.+?)-"
+# Define regex pattern for item entity code in response retrieved by SPARQL query
+SPARQL_ITEM_CODE_REGEX = "/entity/(Q[0-9]+)$"
+# Define regex pattern for item entity code in the page title of a recent change, e.g. "Item:Q80"
+RECENT_CHANGES_TITLE_REGEX = "^(?:[^:]+:)?(Q[0-9]+)$"
+
+# Maximum number of datasets hashed concurrently
+DEFAULT_MAX_HASHING_WORKERS = 4
 
 # Possible URLs for SPARQL and API
 STAGING_SPARQL_URL = (
@@ -10,3 +10,18 @@ def ignore_resource_warnings(test_func):
             test_func(self, *args, **kwargs)
 
     return test
+
+
+def gtfs_metadata_processor(input_tables, metadata_attributes):
+    """Declares the GTFS files a metadata processor reads and the metadata attributes it sets,
+    so its result can be copied from the previous dataset version when none of these files changed.
+    :param input_tables: The names of the GTFS files read by the processor.
+    :param metadata_attributes: The names of the GtfsMetadata attributes set by the processor.
+    """
+
+    def decorator(process_func):
+        process_func.input_tables = input_tables
+        process_func.metadata_attributes = metadata_attributes
+        return process_func
+
+    return decorator
@@ -0,0 +1,117 @@
+from urllib.parse import urlparse
+import socket
+import time
+
+HTTP_DEFAULT_PORT = 80
+HTTPS_DEFAULT_PORT = 443
+HTTPS_SCHEME = "https"
+
+
+class DownloadTelemetry:
+    def __init__(self, entity_code, url):
+        """Constructor for ``DownloadTelemetry``.
+        The telemetry of a download records its timings, size, status and retries.
+        The time to first byte is measured from the request to the response headers,
+        so it includes the time to connect to the server.
+        The connect time is measured on the connection of the download, it includes the resolution of the host
+        and is None if a connection to the server was reused. The DNS time is only an estimate, measured with
+        a separate resolution of the host before the download, which can be answered from a resolver cache.
+        :param entity_code: The source entity code.
+        :param url: The URL of the downloaded dataset.
+        """
+        self.entity_code = entity_code
+        self.url = url
+        self.dns_time_estimate = None
+        self.connect_time = None
+        self.time_to_first_byte = None
+        self.total_time = None
+        self.bytes = 0
+        self.status_code = None
+        self.retries = 0
+        self.result = None
+        self.__start_time = None
+
+    def start(self):
+        """Start measuring the total time of the download."""
+        self.__start_time = time.perf_counter()
+
+    def stop(self, result):
+        """Stop measuring the total time of the download.
+        :param result: The result of the download, e.g. downloaded, not modified or failed.
+        """
+        if self.__start_time is not None:
+            self.total_time = time.perf_counter() - self.__start_time
+        self.result = result
+
+    def record_response(self, response):
+        """Record the status, the connect time and the time to first byte of a download response.
+        :param response: The HTTP response of the download.
+        """
+        self.status_code = response.status_code
+        elapsed = getattr(response, "elapsed", None)
+        if elapsed is not None and hasattr(elapsed, "total_seconds"):
+            self.time_to_first_byte = elapsed.total_seconds()
+        # The connect time is only recorded for the first response of a connection
+        connection = getattr(getattr(response, "raw", None), "connection", None)
+        connect_time = getattr(connection, "connect_time", None)
+        self.connect_time = connect_time if isinstance(connect_time, float) else None
+        if self.connect_time is not None:
+            connection.connect_time = None
+
+    def replace_with(self, other):
+        """Replace the measures of the download by the ones of another download of the same dataset,
+        e.g. the download from a mirror URL which completed first.
+        :param other: The DownloadTelemetry of the other download.
+        """
+        self.url = other.url
+        self.dns_time_estimate = other.dns_time_estimate
+        self.connect_time = other.connect_time
+        self.time_to_first_byte = other.time_to_first_byte
+        self.bytes = other.bytes
+        self.status_code = other.status_code
+        self.retries += other.retries
+
+    def get_throughput(self):
+        """
+        :return: The throughput of the download in bytes per second, None if the download was not timed.
+        """
+        if not self.total_time:
+            return None
+        return self.bytes / self.total_time
+
+    def to_dict(self):
+        """
+        :return: The telemetry of the download as a dictionary, to be serialized in JSON.
+        """
+        return {
+            "entity_code": self.entity_code,
+            "url": self.url,
+            "dns_time_estimate": self.dns_time_estimate,
+            "connect_time": self.connect_time,
+            "time_to_first_byte": self.time_to_first_byte,
+            "total_time": self.total_time,
+            "bytes": self.bytes,
+            "throughput": self.get_throughput(),
+            "status_code": self.status_code,
+            "retries": self.retries,
+            "result": self.result,
+        }
+
+
+def estimate_dns_time(url):
+    """Estimate the time to resolve the host of a URL, with a resolution separate from the download.
+    :param url: The URL.
+    :return: The number of seconds to resolve the host, None if the host could not be resolved.
+    """
+    parsed_url = urlparse(url)
+    if not parsed_url.hostname:
+        return None
+    port = parsed_url.port or (
+        HTTPS_DEFAULT_PORT if parsed_url.scheme == HTTPS_SCHEME else HTTP_DEFAULT_PORT
+    )
+    start_time = time.perf_counter()
+    try:
+        socket.getaddrinfo(parsed_url.hostname, port, proto=socket.IPPROTO_TCP)
+    except (OSError, UnicodeError):
+        return None
+    return time.perf_counter() - start_time
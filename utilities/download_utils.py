@@ -0,0 +1,706 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from hashlib import sha1
+from threading import Event, Lock
+from zipfile import BadZipFile
+import json
+import os
+import random
+import re
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from requests.exceptions import (
+    RequestException,
+    ConnectionError,
+    ChunkedEncodingError,
+    HTTPError,
+    SSLError,
+    Timeout,
+)
+from utilities.download_telemetry import DownloadTelemetry
+from utilities.zip_utils import (
+    ZIP_SIGNATURE_SIZE,
+    ZIP_TAIL_BYTE_SIZE,
+    ZIP64_END_OF_CENTRAL_DIRECTORY_SIZE,
+    find_central_directory,
+    find_zip64_central_directory,
+    parse_central_directory,
+    compute_zip_fingerprint,
+    has_zip_signature,
+    validate_zip_file,
+)
+
+DOWNLOAD_CHUNK_BYTE_SIZE = 1024 * 1024
+PARTIAL_DOWNLOAD_EXTENSION = ".part"
+PARTIAL_DOWNLOAD_STATE_EXTENSION = ".json"
+MIRROR_DOWNLOAD_EXTENSION = ".mirror"
+DEFAULT_HEDGE_DELAY = 5
+HEDGE_POLL_INTERVAL = 0.1
+DEFAULT_MAX_DOWNLOAD_SIZE = 2 * 1024 * 1024 * 1024
+
+HTTP_PARTIAL_CONTENT = 206
+HTTP_NOT_MODIFIED = 304
+RANGE_HEADER = "Range"
+IF_RANGE_HEADER = "If-Range"
+CONTENT_RANGE_HEADER = "Content-Range"
+CONTENT_LENGTH_HEADER = "Content-Length"
+ETAG_HEADER = "ETag"
+LAST_MODIFIED_HEADER = "Last-Modified"
+CONTENT_RANGE_REGEX = r"bytes (\d+)-(\d+)/(\d+)"
+WEAK_ETAG_PREFIX = "W/"
+
+URL = "url"
+VALIDATOR = "validator"
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 1
+DEFAULT_BACKOFF_MAX = 60
+DEFAULT_POOL_CONNECTIONS = 16
+DEFAULT_POOL_MAXSIZE = 2
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+RETRY_EXCEPTIONS = (ConnectionError, ChunkedEncodingError, Timeout)
+
+# Serializes the completion of the concurrent downloads of a hedged download, so only one of them completes
+DOWNLOAD_COMPLETION_LOCK = Lock()
+
+
+class DownloadCancelled(RequestException):
+    """The download was cancelled because a concurrent download of the same file completed first."""
+
+
+class DownloadRejected(RequestException):
+    """The download was rejected because it is too large or it is not a valid zip file."""
+
+
+class DownloadInterrupted(RequestException):
+    """The connection failed or timed out while the body of the download was streamed."""
+
+
+class ConnectTimingMixin:
+    """Record the time to establish a connection, including the resolution of its host, in `connect_time`."""
+
+    connect_time = None
+
+    def _new_conn(self):
+        start_time = time.perf_counter()
+        sock = super()._new_conn()
+        self.connect_time = time.perf_counter() - start_time
+        return sock
+
+
+class TimedHTTPConnection(ConnectTimingMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(ConnectTimingMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """An HTTP adapter whose connections record the time to establish them."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class DownloadSession:
+    def __init__(
+        self,
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        backoff_max=DEFAULT_BACKOFF_MAX,
+        max_download_size=DEFAULT_MAX_DOWNLOAD_SIZE,
+        validate_zip=True,
+    ):
+        """Constructor for ``DownloadSession``.
+        The session keeps the connections alive in a pool per host, so they are reused
+        by the downloads from the same host.
+        :param pool_connections: The number of host connection pools to keep.
+        :param pool_maxsize: The maximum number of connections kept in a host connection pool.
+        :param connect_timeout: The number of seconds to wait for a connection to be established.
+        :param read_timeout: The number of seconds to wait for the server between two bytes.
+        :param max_retries: The maximum number of retries of a download failing with a 5xx status or a connection error.
+        :param backoff_factor: The number of seconds of the exponential backoff between retries.
+        :param backoff_max: The maximum number of seconds to wait between retries.
+        :param max_download_size: The maximum size in bytes of a downloaded file, None for no maximum size.
+        :param validate_zip: Whether to reject the downloaded files which are not valid zip files.
+        """
+        self.__session = requests.Session()
+        adapter = TimedHTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.max_download_size = max_download_size
+        self.validate_zip = validate_zip
+
+    def get(self, url, headers=None, telemetry=None):
+        """Send a streamed GET request.
+        The request is not retried here, the downloads are retried by `download_file`.
+        :param url: The URL to request.
+        :param headers: The request headers.
+        :param telemetry: The DownloadTelemetry recording the response, if any.
+        :return: The response, with its body not read yet.
+        """
+        response = self.__session.get(
+            url,
+            allow_redirects=True,
+            stream=True,
+            headers=headers or {},
+            timeout=self.timeout,
+        )
+        if telemetry is not None:
+            telemetry.record_response(response)
+        return response
+
+    @staticmethod
+    def is_retryable(error):
+        """Check if a failed download can be retried.
+        TLS errors are not retried, as they fail again with the same certificate or protocol.
+        :param error: The exception raised by the download.
+        :return: True if the download failed with a 5xx status, a connection error, a timeout
+        or an interruption of its body, False otherwise.
+        """
+        if isinstance(error, HTTPError):
+            return (
+                error.response is not None
+                and error.response.status_code in RETRY_STATUS_CODES
+            )
+        if isinstance(error, SSLError):
+            return False
+        return isinstance(error, (DownloadInterrupted,) + RETRY_EXCEPTIONS)
+
+    def wait_before_retry(self, attempt, url, reason, telemetry=None):
+        """Wait before retrying a request, with a jittered exponential backoff.
+        :param attempt: The number of the attempt that failed, starting at 0.
+        :param url: The URL requested.
+        :param reason: The reason of the failure.
+        :param telemetry: The DownloadTelemetry counting the retries, if any.
+        """
+        if telemetry is not None:
+            telemetry.retries += 1
+        delay = random.uniform(
+            0, min(self.backoff_max, self.backoff_factor * 2 ** attempt)
+        )
+        print(f'Retrying URL {url} in {delay:.1f} seconds after "{reason}"\n')
+        time.sleep(delay)
+
+    def close(self):
+        """Close the connections of the session."""
+        self.__session.close()
+
+
+def stream_response_to_file(
+    response,
+    file_path,
+    resume=False,
+    cancel_event=None,
+    max_size=None,
+    validate_zip=False,
+    started_event=None,
+):
+    """Write the body of a streamed HTTP response to a file, computing its SHA-1 hash in the same pass.
+    :param response: The HTTP response, requested with `stream=True`.
+    :param file_path: The path to the file where to write the response body.
+    :param resume: Whether to append the response body to the existing file content.
+    The SHA-1 hash of the existing file content is computed first, so the hash covers the whole file.
+    :param cancel_event: The event cancelling the download when it is set, if any.
+    :param max_size: The maximum size of the file in bytes, None for no maximum size.
+    :param validate_zip: Whether to check that the file starts with a zip signature.
+    :param started_event: The event to set when the first bytes of the response body are received, if any.
+    :return: The SHA-1 hash of the file.
+    :raise DownloadCancelled: If the cancel event is set during the download.
+    :raise DownloadRejected: If the file is larger than the maximum size or does not start with a zip signature.
+    """
+    sha1_hash = sha1()
+    size = 0
+    first_bytes = b""
+    if resume:
+        with open(file_path, "rb") as file:
+            while data := file.read(DOWNLOAD_CHUNK_BYTE_SIZE):
+                if size < ZIP_SIGNATURE_SIZE:
+                    first_bytes += data[: ZIP_SIGNATURE_SIZE - size]
+                sha1_hash.update(data)
+                size += len(data)
+    with open(file_path, "ab" if resume else "wb") as file:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTE_SIZE):
+            if cancel_event is not None and cancel_event.is_set():
+                raise DownloadCancelled(f"Download to {file_path} cancelled.")
+            if not chunk:
+                continue
+            if started_event is not None:
+                started_event.set()
+            if size < ZIP_SIGNATURE_SIZE:
+                first_bytes += chunk[: ZIP_SIGNATURE_SIZE - size]
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise DownloadRejected(
+                    f"Download to {file_path} exceeds the maximum size of {max_size} bytes."
+                )
+            if (
+                validate_zip
+                and len(first_bytes) == ZIP_SIGNATURE_SIZE
+                and not has_zip_signature(first_bytes)
+            ):
+                raise DownloadRejected(
+                    f"Download to {file_path} is not a zip file, it starts with {first_bytes}."
+                )
+            sha1_hash.update(chunk)
+            file.write(chunk)
+    if validate_zip and not has_zip_signature(first_bytes):
+        raise DownloadRejected(f"Download to {file_path} is not a zip file.")
+    return sha1_hash.hexdigest()
+
+
+def download_file(
+    session,
+    url,
+    file_path,
+    headers=None,
+    started_event=None,
+    cancel_event=None,
+    telemetry=None,
+    open_responses=None,
+):
+    """Download a file with a streamed HTTP GET request.
+    The file is first written to a partial file, with a state file next to it. If the download is interrupted,
+    the partial file is kept, and the download is resumed with a range request, either by a retry
+    or by the next download of the same URL.
+    :param session: The DownloadSession to use.
+    :param url: The URL of the file to download.
+    :param file_path: The path to the file where to write the download.
+    :param headers: The additional request headers, e.g. conditional request headers.
+    :param started_event: The event to set when the first bytes of the file are received, if any.
+    :param cancel_event: The event cancelling the download when it is set, if any.
+    The event is set when the download completes, so concurrent downloads sharing it are cancelled.
+    :param telemetry: The DownloadTelemetry recording the download, if any.
+    :param open_responses: The set where to keep the response while its body is streamed, if any,
+    so a concurrent download can close it to cancel the download.
+    The connection errors, timeouts, 5xx statuses and interruptions of the body are retried here, sharing
+    the `max_retries` of the session. An interrupted download is resumed from its partial download.
+    :return: The response, and the SHA-1 hash of the downloaded file or None if the response is 304 Not Modified.
+    :raise RequestException: If the download failed. The partial download is kept for a later attempt.
+    """
+    for attempt in range(session.max_retries + 1):
+        try:
+            return download_file_once(
+                session,
+                url,
+                file_path,
+                headers,
+                started_event,
+                cancel_event,
+                telemetry,
+                open_responses,
+            )
+        except RequestException as error:
+            if (
+                attempt == session.max_retries
+                or not session.is_retryable(error)
+                or (cancel_event is not None and cancel_event.is_set())
+            ):
+                raise
+            session.wait_before_retry(attempt, url, error, telemetry)
+
+
+def download_file_once(
+    session,
+    url,
+    file_path,
+    headers=None,
+    started_event=None,
+    cancel_event=None,
+    telemetry=None,
+    open_responses=None,
+):
+    """Download a file with a single streamed HTTP GET request, resuming its partial download if possible.
+    :param session: The DownloadSession to use.
+    :param url: The URL of the file to download.
+    :param file_path: The path to the file where to write the download.
+    :param headers: The additional request headers, e.g. conditional request headers.
+    :param started_event: The event to set when the first bytes of the file are received, if any.
+    :param cancel_event: The event cancelling the download when it is set, if any.
+    :param telemetry: The DownloadTelemetry recording the download, if any.
+    :param open_responses: The set where to keep the response while its body is streamed, if any.
+    :return: The response, and the SHA-1 hash of the downloaded file or None if the response is 304 Not Modified.
+    :raise DownloadInterrupted: If the connection failed while the body was streamed.
+    """
+    partial_path = f"{file_path}{PARTIAL_DOWNLOAD_EXTENSION}"
+    request_headers = dict(headers or {})
+
+    resume_validator = get_partial_download_validator(url, partial_path)
+    resume_offset = os.path.getsize(partial_path) if resume_validator else 0
+    if resume_offset:
+        request_headers[RANGE_HEADER] = f"bytes={resume_offset}-"
+        request_headers[IF_RANGE_HEADER] = resume_validator
+
+    response = session.get(url, request_headers, telemetry)
+    if open_responses is not None:
+        open_responses.add(response)
+    try:
+        if cancel_event is not None and cancel_event.is_set():
+            # A concurrent download completed while this one was waiting for the server
+            remove_partial_download(partial_path)
+            raise DownloadCancelled(f"Download to {file_path} cancelled.")
+        if response.status_code == HTTP_NOT_MODIFIED:
+            if started_event is not None:
+                started_event.set()
+            complete_download(partial_path, None, cancel_event)
+            return response, None
+        if response.status_code in RETRY_STATUS_CODES:
+            raise HTTPError(
+                f"{response.status_code} Server Error for URL {url}", response=response
+            )
+        response.raise_for_status()
+
+        resume = resume_offset > 0 and response.status_code == HTTP_PARTIAL_CONTENT
+        if resume and get_content_range_start(response) != resume_offset:
+            # The server answered with another range, the partial download can not be resumed
+            response.close()
+            remove_partial_download(partial_path)
+            return download_file_once(
+                session,
+                url,
+                file_path,
+                headers,
+                started_event,
+                cancel_event,
+                telemetry,
+                open_responses,
+            )
+        validate_download_size(session, url, response, resume_offset if resume else 0)
+        if not resume:
+            save_partial_download_state(url, partial_path, response.headers)
+
+        try:
+            sha1_hash = stream_response_to_file(
+                response,
+                partial_path,
+                resume,
+                cancel_event,
+                session.max_download_size,
+                session.validate_zip,
+                started_event,
+            )
+        except (DownloadCancelled, DownloadRejected):
+            remove_partial_download(partial_path)
+            raise
+        except RETRY_EXCEPTIONS as error:
+            if cancel_event is not None and cancel_event.is_set():
+                # The response was closed by the concurrent download which completed first
+                remove_partial_download(partial_path)
+                raise DownloadCancelled(
+                    f"Download to {file_path} cancelled."
+                ) from error
+            raise DownloadInterrupted(
+                f"Download from {url} interrupted: {error}"
+            ) from error
+        finally:
+            if telemetry is not None and os.path.isfile(partial_path):
+                telemetry.bytes += os.path.getsize(partial_path) - (
+                    resume_offset if resume else 0
+                )
+    finally:
+        if open_responses is not None:
+            open_responses.discard(response)
+        response.close()
+
+    if cancel_event is not None and cancel_event.is_set():
+        # The body ended early because the response was closed by the concurrent download which completed first
+        remove_partial_download(partial_path)
+        raise DownloadCancelled(f"Download to {file_path} cancelled.")
+
+    if session.validate_zip:
+        # Check the central directory before the file is hashed again or loaded
+        try:
+            validate_zip_file(partial_path)
+        except BadZipFile as error:
+            remove_partial_download(partial_path)
+            raise DownloadRejected(
+                f"Download from {url} is not a valid zip file: {error}"
+            )
+
+    complete_download(partial_path, file_path, cancel_event)
+    return response, sha1_hash
+
+
+def validate_download_size(session, url, response, offset=0):
+    """Reject a download before reading its body if its announced size exceeds the maximum download size.
+    :param session: The DownloadSession to use.
+    :param url: The URL of the file to download.
+    :param response: The HTTP response of the download.
+    :param offset: The number of bytes already downloaded if the download is resumed.
+    :raise DownloadRejected: If the Content-Length of the response exceeds the maximum download size.
+    """
+    content_length = response.headers.get(CONTENT_LENGTH_HEADER)
+    if session.max_download_size is None or content_length is None:
+        return
+    try:
+        size = offset + int(content_length)
+    except ValueError:
+        return
+    if size > session.max_download_size:
+        raise DownloadRejected(
+            f"Download from {url} of {size} bytes exceeds the maximum size of {session.max_download_size} bytes."
+        )
+
+
+def complete_download(partial_path, file_path, cancel_event=None):
+    """Move a completed partial download to its file path and remove its state.
+    :param partial_path: The path to the partial file.
+    :param file_path: The path to the file where to move the download, None to discard the partial download.
+    :param cancel_event: The event shared by concurrent downloads of the same file, if any.
+    Only the first download to complete sets the event and is moved, the others are cancelled.
+    :raise DownloadCancelled: If a concurrent download sharing the cancel event already completed.
+    """
+    with DOWNLOAD_COMPLETION_LOCK:
+        cancelled = cancel_event is not None and cancel_event.is_set()
+        if cancel_event is not None:
+            cancel_event.set()
+        if not cancelled and file_path is not None:
+            os.replace(partial_path, file_path)
+    remove_partial_download(partial_path)
+    if cancelled:
+        raise DownloadCancelled(f"Download to {file_path} cancelled.")
+
+
+def download_file_hedged(
+    session,
+    urls,
+    file_path,
+    headers=None,
+    hedge_delay=DEFAULT_HEDGE_DELAY,
+    telemetry=None,
+):
+    """Download a file from its URL, hedged by a download from a mirror URL.
+    If the first bytes of the file are not received from the first URL within the hedge delay, or it fails before,
+    the file is also downloaded from the first mirror URL, and the first download to complete is kept.
+    The other download is cancelled, its response is closed and its partial download is removed.
+    :param session: The DownloadSession to use.
+    :param urls: The URL of the file to download, followed by its mirror URLs.
+    :param file_path: The path to the file where to write the download.
+    :param headers: The additional request headers for the first URL, e.g. conditional request headers.
+    :param hedge_delay: The number of seconds to wait for the first URL before hedging, None to never hedge.
+    :param telemetry: The DownloadTelemetry recording the download, if any.
+    If the mirror URL download completes first, its measures replace the ones of the first URL download.
+    :return: The response, the SHA-1 hash of the downloaded file or None if the response is 304 Not Modified,
+    and the URL the file was downloaded from.
+    :raise RequestException: If all the downloads failed.
+    """
+    if len(urls) < 2 or hedge_delay is None:
+        response, sha1_hash = download_file(
+            session, urls[0], file_path, headers, telemetry=telemetry
+        )
+        return response, sha1_hash, urls[0]
+
+    started_event = Event()
+    cancel_event = Event()
+    open_responses = set()
+    mirror_path = f"{file_path}{MIRROR_DOWNLOAD_EXTENSION}"
+    mirror_future = None
+    completed_future = None
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary_future = executor.submit(
+            download_file,
+            session,
+            urls[0],
+            file_path,
+            headers,
+            started_event,
+            cancel_event,
+            telemetry,
+            open_responses,
+        )
+
+        # Wait for the first bytes of the primary download, within the hedge delay
+        deadline = time.monotonic() + hedge_delay
+        while not started_event.is_set() and not primary_future.done():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            started_event.wait(min(HEDGE_POLL_INTERVAL, remaining))
+        primary_failed = (
+            primary_future.done() and primary_future.exception() is not None
+        )
+        if not primary_failed and (started_event.is_set() or primary_future.done()):
+            completed_future = primary_future
+            return (*primary_future.result(), urls[0])
+
+        print(
+            f"--------------- Hedging URL : {urls[0]} with {urls[1]} ---------------\n"
+        )
+        mirror_telemetry = None
+        if telemetry is not None:
+            mirror_telemetry = DownloadTelemetry(telemetry.entity_code, urls[1])
+        mirror_future = executor.submit(
+            download_file,
+            session,
+            urls[1],
+            mirror_path,
+            None,
+            None,
+            cancel_event,
+            mirror_telemetry,
+            open_responses,
+        )
+        for future in as_completed([primary_future, mirror_future]):
+            if future.exception() is not None:
+                continue
+            completed_future = future
+            if future is mirror_future:
+                os.replace(mirror_path, file_path)
+                print(f"Mirror URL {urls[1]} downloaded first\n")
+                if telemetry is not None:
+                    telemetry.replace_with(mirror_telemetry)
+                return (*future.result(), urls[1])
+            return (*future.result(), urls[0])
+        raise primary_future.exception()
+    finally:
+        # Cancel the download which did not complete first, without waiting for a server which does not answer.
+        # If it receives a response later, it is cancelled before writing anything.
+        cancel_event.set()
+        for response in list(open_responses):
+            response.close()
+        executor.shutdown(wait=False)
+        if completed_future is not None:
+            loser_path = file_path if completed_future is mirror_future else mirror_path
+            remove_partial_download(f"{loser_path}{PARTIAL_DOWNLOAD_EXTENSION}")
+
+
+def get_content_range_start(response):
+    """
+    :param response: An HTTP response to a range request.
+    :return: The first byte position of the response Content-Range, None if it has no valid Content-Range.
+    """
+    content_range = re.match(
+        CONTENT_RANGE_REGEX, response.headers.get(CONTENT_RANGE_HEADER, "")
+    )
+    return int(content_range.group(1)) if content_range else None
+
+
+def save_partial_download_state(url, partial_path, response_headers):
+    """Save the state of a partial download, used to resume it.
+    Only a strong ETag or a Last-Modified date can validate that a resumed download is from the same file.
+    :param url: The URL of the file downloaded.
+    :param partial_path: The path to the partial file.
+    :param response_headers: The headers of the response the file is downloaded with.
+    """
+    validator = response_headers.get(ETAG_HEADER)
+    if not validator or validator.startswith(WEAK_ETAG_PREFIX):
+        validator = response_headers.get(LAST_MODIFIED_HEADER)
+    with open(f"{partial_path}{PARTIAL_DOWNLOAD_STATE_EXTENSION}", "w") as f:
+        json.dump({URL: url, VALIDATOR: validator}, f)
+
+
+def get_partial_download_validator(url, partial_path):
+    """Get the validator to resume a partial download.
+    :param url: The URL of the file to download.
+    :param partial_path: The path to the partial file.
+    :return: The ETag or Last-Modified date of the partial download, None if it can not be resumed.
+    """
+    state_path = f"{partial_path}{PARTIAL_DOWNLOAD_STATE_EXTENSION}"
+    if not os.path.isfile(partial_path) or not os.path.isfile(state_path):
+        return None
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get(URL) != url:
+        return None
+    return state.get(VALIDATOR)
+
+
+def remove_partial_download(partial_path):
+    """Remove a partial download and its state file, if they exist.
+    :param partial_path: The path to the partial file.
+    """
+    for path in [partial_path, f"{partial_path}{PARTIAL_DOWNLOAD_STATE_EXTENSION}"]:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def fetch_byte_range(session, url, byte_range):
+    """Fetch a byte range of a remote file with an HTTP Range request.
+    :param session: The DownloadSession to use.
+    :param url: The URL of the remote file.
+    :param byte_range: The value of the Range header, e.g. "bytes=0-99" or "bytes=-100".
+    :return: The bytes of the range and the total size of the remote file,
+    or (None, None) if the server did not answer with the requested range.
+    """
+    response = session.get(url, {RANGE_HEADER: byte_range})
+    try:
+        # A server ignoring the Range header answers with the full file, which is not read
+        if response.status_code != HTTP_PARTIAL_CONTENT:
+            return None, None
+        content_range = re.match(
+            CONTENT_RANGE_REGEX, response.headers.get(CONTENT_RANGE_HEADER, "")
+        )
+        if content_range is None:
+            return None, None
+        return response.content, int(content_range.group(3))
+    finally:
+        response.close()
+
+
+def probe_remote_zip_fingerprint(session, url):
+    """Compute the fingerprint of a remote zip file without downloading it,
+    by fetching its central directory with HTTP Range requests.
+    :param session: The DownloadSession to use.
+    :param url: The URL of the remote zip file.
+    :return: The fingerprint of the remote zip file, None if it could not be probed.
+    """
+    try:
+        zip_tail, zip_size = fetch_byte_range(
+            session, url, f"bytes=-{ZIP_TAIL_BYTE_SIZE}"
+        )
+        if zip_tail is None:
+            return None
+        tail_offset = zip_size - len(zip_tail)
+
+        def read(offset, size):
+            # Use the tail already fetched when it contains the requested bytes
+            if offset >= tail_offset and offset + size <= zip_size:
+                return zip_tail[offset - tail_offset : offset - tail_offset + size]
+            content, _ = fetch_byte_range(
+                session, url, f"bytes={offset}-{offset + size - 1}"
+            )
+            if content is None:
+                raise BadZipFile("Could not fetch the zip byte range.")
+            return content
+
+        cd_offset, cd_size = find_central_directory(zip_tail, zip_size)
+        if cd_size is None:
+            cd_offset, cd_size = find_zip64_central_directory(
+                read(cd_offset, ZIP64_END_OF_CENTRAL_DIRECTORY_SIZE)
+            )
+        entries = parse_central_directory(read(cd_offset, cd_size))
+    except (RequestException, BadZipFile) as error:
+        print(f'Exception "{error}" occurred when probing URL {url}\n')
+        return None
+    return compute_zip_fingerprint(entries)
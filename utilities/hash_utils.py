@@ -0,0 +1,82 @@
+from hashlib import sha1
+import mmap
+import os
+import zipfile
+
+HASH_CHUNK_BYTE_SIZE = 1024 * 1024
+MMAP_MIN_BYTE_SIZE = 16 * 1024 * 1024
+CARRIAGE_RETURN = b"\r"
+LINE_FEED = b"\n"
+
+
+def compute_file_sha1(file_path):
+    """Compute the SHA-1 hash of a file.
+    Large files are memory-mapped and hashed by large slices, smaller files are read in large buffers.
+    hashlib releases the GIL while hashing large slices, so several files can be hashed concurrently by threads.
+    :param file_path: The path to the file.
+    :return: The SHA-1 hash of the file.
+    :raise OSError: If the file can not be opened or read.
+    """
+    sha1_hash = sha1()
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size and size >= MMAP_MIN_BYTE_SIZE:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                with memoryview(mapped_file) as view:
+                    for offset in range(0, size, HASH_CHUNK_BYTE_SIZE):
+                        sha1_hash.update(view[offset : offset + HASH_CHUNK_BYTE_SIZE])
+        else:
+            buffer = bytearray(HASH_CHUNK_BYTE_SIZE)
+            with memoryview(buffer) as view:
+                while read_size := file.readinto(buffer):
+                    sha1_hash.update(view[:read_size])
+    return sha1_hash.hexdigest()
+
+
+def compute_member_digest(zip_file, member_name):
+    """Compute the SHA-1 digest of a zip member content with normalized line endings.
+    The member is decompressed by chunks, and its CRLF and CR line endings are replaced by LF.
+    :param zip_file: The opened ZipFile.
+    :param member_name: The name of the member in the zip file.
+    :return: The SHA-1 digest of the normalized member content.
+    """
+    digest = sha1()
+    pending_carriage_return = False
+    with zip_file.open(member_name) as member:
+        while chunk := member.read(HASH_CHUNK_BYTE_SIZE):
+            if pending_carriage_return:
+                chunk = CARRIAGE_RETURN + chunk
+            # A CR at the end of the chunk may be followed by a LF in the next chunk
+            pending_carriage_return = chunk.endswith(CARRIAGE_RETURN)
+            if pending_carriage_return:
+                chunk = chunk[:-1]
+            digest.update(
+                chunk.replace(CARRIAGE_RETURN + LINE_FEED, LINE_FEED).replace(
+                    CARRIAGE_RETURN, LINE_FEED
+                )
+            )
+    if pending_carriage_return:
+        digest.update(LINE_FEED)
+    return digest.hexdigest()
+
+
+def compute_gtfs_content_hash(zip_path):
+    """Compute the content hash of a GTFS dataset zip file, which ignores how the dataset was zipped.
+    The hash only depends on the member names and their content with normalized line endings,
+    so it does not change when the same content is zipped again with new timestamps, compression or member order.
+    :param zip_path: The path to the dataset zip file.
+    :return: The content hash of the dataset, and the digest of each table by member name.
+    :raise BadZipFile: If the file is not a valid zip file.
+    """
+    table_digests = {}
+    with zipfile.ZipFile(zip_path) as zip_file:
+        for info in zip_file.infolist():
+            if info.is_dir():
+                continue
+            table_digests[info.filename] = compute_member_digest(
+                zip_file, info.filename
+            )
+    content_hash = sha1()
+    for member_name in sorted(table_digests):
+        content_hash.update(f"{member_name}:{table_digests[member_name]}\n".encode())
+    return content_hash.hexdigest(), table_digests
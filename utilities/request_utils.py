@@ -1,39 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor
 import re
 import os
-from wikibaseintegrator import wbi_core, wbi_login
+import uuid
+from wikibaseintegrator import wbi_core
 from utilities.constants import (
     RESULTS,
     BINDINGS,
     VALUE,
     SPARQL_ENTITY_CODE_REGEX,
+    SPARQL_ITEM_CODE_REGEX,
     ENGLISH,
+    CLAIMS,
+    LABELS,
+    LANGUAGE,
     SPARQL_A,
     SVC_ENTITY_URL_PATH,
     SVC_PROP_URL_PATH,
+    SVC_CLAIM_URL_PATH,
     SVC_URL,
     GTFS_CATALOG_OF_SOURCES_CODE,
     GBFS_CATALOG_OF_SOURCES_CODE,
     SOURCE_ENTITY_PROP,
     CATALOG_PROP,
+    STABLE_URL_PROP,
+    SHA1_HASH_PROP,
+    RDFS_LABEL_URL,
+    SPARQL_VAR_SOURCE,
+    SPARQL_VAR_URL,
+    SPARQL_VAR_LABEL,
+    SPARQL_VAR_SHA1,
+    SPARQL_VAR_VERSION,
+    ENTITIES,
+    MISSING,
+    RECENT_CHANGES_TITLE_REGEX,
 )
+from utilities.wikibase_write_session import WikibaseWriteSession
 
+# Maximum number of entity IDs accepted by the wbgetentities API for a non-bot user
+WBGETENTITIES_MAX_IDS = 50
+DEFAULT_MAX_ENTITY_FETCH_WORKERS = 4
+DEFAULT_SPARQL_PAGE_SIZE = 10000
 
-def import_entity(username, password, data, label="", item_id=""):
-    login_instance = wbi_login.Login(user=username, pwd=password, use_clientlogin=True)
+
+def import_entity(username, password, data, label="", item_id="", write_session=None):
+    """Create or update an entity on the Database.
+    :param username: The username of the Wikibase account.
+    :param password: The password of the Wikibase account.
+    :param data: The claims of the entity.
+    :param label: The English label of the entity.
+    :param item_id: The entity code of the entity to update, empty to create a new entity.
+    :param write_session: The WikibaseWriteSession shared by the writes, a new one logging in if None.
+    :return: The entity code of the entity written.
+    """
+    if write_session is None:
+        write_session = WikibaseWriteSession(username, password)
 
     entity = wbi_core.ItemEngine(data=data, item_id=item_id)
     if label:
         entity.set_label(label, ENGLISH)
 
-    entity_id = entity.write(login_instance)
+    entity_id = write_session.write(entity)
     return entity_id
 
 
-def extract_source_entity_codes(catalog_code):
-    entity_codes = []
+def import_entity_claims(
+    username, password, data, label="", item_id="", write_session=None
+):
+    """Create an entity or add claims to an entity on the Database with a single wbeditentity request,
+    built from the claims in memory, without fetching the entity first.
+    :param username: The username of the Wikibase account.
+    :param password: The password of the Wikibase account.
+    :param data: The claims to add to the entity.
+    :param label: The English label of the entity.
+    :param item_id: The entity code of the entity to update, empty to create a new entity.
+    :param write_session: The WikibaseWriteSession shared by the writes, a new one logging in if None.
+    :return: The entity code of the entity written.
+    """
+    if write_session is None:
+        write_session = WikibaseWriteSession(username, password)
+    return write_session.edit_entity(create_entity_json(data, label), item_id)
+
+
+def create_entity_json(data, label=""):
+    """Create the Wikibase JSON representation of the labels and claims of an entity.
+    :param data: The claims of the entity, as Wikibase Integrator data types.
+    :param label: The English label of the entity.
+    :return: The Wikibase JSON representation of the entity.
+    """
+    entity_json = {CLAIMS: [claim.get_json_representation() for claim in data]}
+    if label:
+        entity_json[LABELS] = {ENGLISH: {LANGUAGE: ENGLISH, VALUE: label}}
+    return entity_json
+
+
+def create_statement_guid(entity_code, statement_key):
+    """Create a statement ID derived from a key, so writing the statement again replaces it
+    instead of adding a duplicate statement.
+    :param entity_code: The entity code of the entity of the statement.
+    :param statement_key: The key identifying the statement in the entity.
+    :return: The statement ID.
+    """
+    return f"{entity_code}${uuid.uuid5(uuid.NAMESPACE_URL, f'{entity_code}/{statement_key}')}"
+
 
+def execute_paginated_sparql_query(
+    sparql_query, order_by, page_size=DEFAULT_SPARQL_PAGE_SIZE
+):
+    """Execute a SPARQL query page by page with LIMIT and OFFSET, and yield the bindings of its results,
+    so only one page of results is in memory at once.
+    :param sparql_query: The SPARQL query, without ORDER BY, LIMIT and OFFSET clauses.
+    :param order_by: The variables ordering the results, which must give a total order for the pages to be stable.
+    :param page_size: The number of results requested per page.
+    :return: A generator of the bindings of the results.
+    """
+    if not isinstance(page_size, int) or page_size < 1:
+        raise TypeError("Page size must be a valid positive integer.")
+
+    offset = 0
+    while True:
+        sparql_response = wbi_core.FunctionsEngine.execute_sparql_query(
+            create_page_query(sparql_query, order_by, page_size, offset)
+        )
+        bindings = sparql_response[RESULTS][BINDINGS]
+        yield from bindings
+        if len(bindings) < page_size:
+            return
+        offset += page_size
+
+
+def create_page_query(sparql_query, order_by, page_size, offset):
+    return f"""{sparql_query}
+            ORDER BY {order_by}
+            LIMIT {page_size}
+            OFFSET {offset}"""
+
+
+def extract_source_entity_codes(catalog_code):
     # Retrieves the entity codes for which we want to download the dataset
-    sparql_query = f"""
+    sparql_query = create_source_entity_codes_query(catalog_code)
+
+    return parse_source_entity_codes(
+        execute_paginated_sparql_query(sparql_query, f"?{SPARQL_A}")
+    )
+
+
+def create_source_entity_codes_query(catalog_code):
+    return f"""
             SELECT *
             WHERE 
             {{
@@ -42,9 +154,11 @@ def extract_source_entity_codes(catalog_code):
                 <{SVC_URL}{SVC_ENTITY_URL_PATH}{catalog_code}>
             }}"""
 
-    sparql_response = wbi_core.FunctionsEngine.execute_sparql_query(sparql_query)
 
-    for result in sparql_response[RESULTS][BINDINGS]:
+def parse_source_entity_codes(bindings):
+    entity_codes = []
+
+    for result in bindings:
         entity_codes.append(
             re.search(SPARQL_ENTITY_CODE_REGEX, result[SPARQL_A][VALUE]).group(1)
         )
@@ -53,9 +167,15 @@ def extract_source_entity_codes(catalog_code):
 
 
 def extract_dataset_version_codes(entity_code):
-    dataset_version_codes = set()
+    sparql_query = create_dataset_version_codes_query(entity_code)
 
-    sparql_query = f"""
+    return parse_dataset_version_codes(
+        execute_paginated_sparql_query(sparql_query, f"?{SPARQL_A}")
+    )
+
+
+def create_dataset_version_codes_query(entity_code):
+    return f"""
             SELECT *
             WHERE 
             {{
@@ -64,9 +184,11 @@ def extract_dataset_version_codes(entity_code):
                 <{SVC_URL}{SVC_ENTITY_URL_PATH}{entity_code}>
             }}"""
 
-    sparql_response = wbi_core.FunctionsEngine.execute_sparql_query(sparql_query)
 
-    for result in sparql_response[RESULTS][BINDINGS]:
+def parse_dataset_version_codes(bindings):
+    dataset_version_codes = set()
+
+    for result in bindings:
         dataset_version_codes.add(
             re.search(SPARQL_ENTITY_CODE_REGEX, result[SPARQL_A][VALUE]).group(1)
         )
@@ -81,3 +203,208 @@ def extract_dataset_version_codes(entity_code):
         dataset_version_codes.discard(os.environ[GBFS_CATALOG_OF_SOURCES_CODE])
 
     return dataset_version_codes
+
+
+def extract_catalog_infos(catalog_code):
+    """Extract the English label, the stable URLs and the SHA-1 hashes of the dataset versions
+    of every source of a catalog with a single SPARQL query, read page by page.
+    The label, URL and SHA-1 hash patterns are joined with a UNION, so each result row binds only one of them
+    and the size of the response grows with the number of values instead of their product.
+    :param catalog_code: The entity code of the catalog of sources.
+    :return: A dictionary with the label, the stable URLs in the order they were returned,
+    and the set of dataset version SHA-1 hashes, by source entity code.
+    """
+    catalog_prop = os.environ[CATALOG_PROP]
+    source_entity_prop = os.environ[SOURCE_ENTITY_PROP]
+    stable_url_prop = os.environ[STABLE_URL_PROP]
+    sha1_hash_prop = os.environ[SHA1_HASH_PROP]
+
+    sparql_query = f"""
+            SELECT ?{SPARQL_VAR_SOURCE} ?{SPARQL_VAR_LABEL} ?{SPARQL_VAR_URL} ?{SPARQL_VAR_SHA1}
+            WHERE
+            {{
+                ?{SPARQL_VAR_SOURCE}
+                <{SVC_URL}{SVC_CLAIM_URL_PATH}{catalog_prop}>/<{SVC_URL}{SVC_PROP_URL_PATH}{catalog_prop}>
+                <{SVC_URL}{SVC_ENTITY_URL_PATH}{catalog_code}> .
+                {{
+                    ?{SPARQL_VAR_SOURCE} <{RDFS_LABEL_URL}> ?{SPARQL_VAR_LABEL} .
+                    FILTER(LANG(?{SPARQL_VAR_LABEL}) = "{ENGLISH}")
+                }}
+                UNION
+                {{
+                    ?{SPARQL_VAR_SOURCE}
+                    <{SVC_URL}{SVC_CLAIM_URL_PATH}{stable_url_prop}>/<{SVC_URL}{SVC_PROP_URL_PATH}{stable_url_prop}>
+                    ?{SPARQL_VAR_URL} .
+                }}
+                UNION
+                {{
+                    ?{SPARQL_VAR_VERSION}
+                    <{SVC_URL}{SVC_CLAIM_URL_PATH}{source_entity_prop}>/<{SVC_URL}{SVC_PROP_URL_PATH}{source_entity_prop}>
+                    ?{SPARQL_VAR_SOURCE} .
+                    ?{SPARQL_VAR_VERSION}
+                    <{SVC_URL}{SVC_CLAIM_URL_PATH}{sha1_hash_prop}>/<{SVC_URL}{SVC_PROP_URL_PATH}{sha1_hash_prop}>
+                    ?{SPARQL_VAR_SHA1} .
+                }}
+            }}"""
+
+    catalog_infos = {}
+    for result in execute_paginated_sparql_query(
+        sparql_query,
+        f"?{SPARQL_VAR_SOURCE} ?{SPARQL_VAR_LABEL} ?{SPARQL_VAR_URL} ?{SPARQL_VAR_SHA1}",
+    ):
+        match = re.search(SPARQL_ITEM_CODE_REGEX, result[SPARQL_VAR_SOURCE][VALUE])
+        if match is None:
+            continue
+        source_infos = catalog_infos.setdefault(
+            match.group(1),
+            {SPARQL_VAR_LABEL: None, SPARQL_VAR_URL: [], SPARQL_VAR_SHA1: set()},
+        )
+        if SPARQL_VAR_LABEL in result:
+            source_infos[SPARQL_VAR_LABEL] = result[SPARQL_VAR_LABEL][VALUE]
+        if SPARQL_VAR_URL in result:
+            url = result[SPARQL_VAR_URL][VALUE]
+            if url not in source_infos[SPARQL_VAR_URL]:
+                source_infos[SPARQL_VAR_URL].append(url)
+        if SPARQL_VAR_SHA1 in result:
+            source_infos[SPARQL_VAR_SHA1].add(result[SPARQL_VAR_SHA1][VALUE])
+
+    return catalog_infos
+
+
+def extract_entities_json(
+    entity_codes,
+    batch_size=WBGETENTITIES_MAX_IDS,
+    max_workers=DEFAULT_MAX_ENTITY_FETCH_WORKERS,
+):
+    """Fetch the JSON representation of entities with batched wbgetentities API calls,
+    requesting `batch_size` entities per call and running at most `max_workers` calls at once.
+    :param entity_codes: The entity codes of the entities to fetch.
+    :param batch_size: The number of entities requested per API call.
+    :param max_workers: The maximum number of API calls running concurrently.
+    :return: A dictionary with the JSON representation of each entity, in the same shape as
+    `ItemEngine.get_json_representation`, by entity code. A missing entity has an empty JSON representation.
+    """
+    if not isinstance(batch_size, int) or not 1 <= batch_size <= WBGETENTITIES_MAX_IDS:
+        raise TypeError(
+            f"Batch size must be a valid integer between 1 and {WBGETENTITIES_MAX_IDS}."
+        )
+    if not isinstance(max_workers, int) or max_workers < 1:
+        raise TypeError("Max workers must be a valid positive integer.")
+
+    # Remove the duplicated entity codes, keeping their order
+    entity_codes = list(dict.fromkeys(entity_codes))
+    batches = [
+        entity_codes[index : index + batch_size]
+        for index in range(0, len(entity_codes), batch_size)
+    ]
+
+    entities_json = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch_entities_json in executor.map(extract_entities_json_batch, batches):
+            entities_json.update(batch_entities_json)
+
+    return entities_json
+
+
+def extract_entities_json_batch(entity_codes):
+    params = create_entities_params(entity_codes)
+    json_response = wbi_core.FunctionsEngine.mediawiki_api_call_helper(
+        data=params, allow_anonymous=True
+    )
+
+    return parse_entities_json(json_response, entity_codes)
+
+
+def create_entities_params(entity_codes):
+    return {
+        "action": "wbgetentities",
+        "ids": "|".join(entity_codes),
+        "format": "json",
+    }
+
+
+def parse_entities_json(json_response, entity_codes):
+    entities_json = {}
+    for entity_code in entity_codes:
+        entity_json = json_response.get(ENTITIES, {}).get(entity_code, {})
+        entities_json[entity_code] = {} if MISSING in entity_json else entity_json
+    return entities_json
+
+
+def extract_recent_changes(since):
+    """Extract the items changed since a timestamp from the recent changes of the Wikibase instance.
+    :param since: The timestamp from which to extract the changes, in the MediaWiki API ISO 8601 format.
+    :return: A dictionary with the last revision ID of each item changed, by entity code.
+    """
+    params = {
+        "action": "query",
+        "list": "recentchanges",
+        "rcstart": since,
+        "rcdir": "newer",
+        "rcprop": "title|ids",
+        "rclimit": "max",
+        "format": "json",
+    }
+
+    revisions = {}
+    while True:
+        json_response = wbi_core.FunctionsEngine.mediawiki_api_call_helper(
+            data=params, allow_anonymous=True
+        )
+        for change in json_response.get("query", {}).get("recentchanges", []):
+            match = re.search(RECENT_CHANGES_TITLE_REGEX, change.get("title", ""))
+            if match is None:
+                continue
+            entity_code = match.group(1)
+            revisions[entity_code] = max(
+                revisions.get(entity_code, 0), change.get("revid", 0)
+            )
+        if "continue" not in json_response:
+            break
+        params.update(json_response["continue"])
+
+    return revisions
+
+
+def extract_dataset_version_sha1_hashes():
+    """Extract the SHA-1 hashes of every dataset version of the database with a single SPARQL query,
+    read page by page.
+    :return: A list of (SHA-1 hash, source entity code, dataset version entity code) triples.
+    """
+    source_entity_prop = os.environ[SOURCE_ENTITY_PROP]
+    sha1_hash_prop = os.environ[SHA1_HASH_PROP]
+
+    sparql_query = f"""
+            SELECT ?{SPARQL_VAR_VERSION} ?{SPARQL_VAR_SOURCE} ?{SPARQL_VAR_SHA1}
+            WHERE
+            {{
+                ?{SPARQL_VAR_VERSION}
+                <{SVC_URL}{SVC_CLAIM_URL_PATH}{sha1_hash_prop}>/<{SVC_URL}{SVC_PROP_URL_PATH}{sha1_hash_prop}>
+                ?{SPARQL_VAR_SHA1} .
+                ?{SPARQL_VAR_VERSION}
+                <{SVC_URL}{SVC_CLAIM_URL_PATH}{source_entity_prop}>/<{SVC_URL}{SVC_PROP_URL_PATH}{source_entity_prop}>
+                ?{SPARQL_VAR_SOURCE} .
+            }}"""
+
+    dataset_version_sha1_hashes = []
+    for result in execute_paginated_sparql_query(
+        sparql_query,
+        f"?{SPARQL_VAR_VERSION} ?{SPARQL_VAR_SOURCE} ?{SPARQL_VAR_SHA1}",
+    ):
+        source_match = re.search(
+            SPARQL_ITEM_CODE_REGEX, result[SPARQL_VAR_SOURCE][VALUE]
+        )
+        version_match = re.search(
+            SPARQL_ITEM_CODE_REGEX, result[SPARQL_VAR_VERSION][VALUE]
+        )
+        if source_match is None or version_match is None:
+            continue
+        dataset_version_sha1_hashes.append(
+            (
+                result[SPARQL_VAR_SHA1][VALUE],
+                source_match.group(1),
+                version_match.group(1),
+            )
+        )
+
+    return dataset_version_sha1_hashes
@@ -0,0 +1,74 @@
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+from datetime import timedelta
+import socket
+from utilities.download_telemetry import DownloadTelemetry, estimate_dns_time
+
+
+class TestDownloadTelemetry(TestCase):
+    def test_download_telemetry_record_response(self):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.elapsed = timedelta(milliseconds=250)
+
+        under_test = DownloadTelemetry("Q80", "http://test.com/gtfs.zip")
+        under_test.record_response(mock_response)
+
+        self.assertEqual(under_test.status_code, 200)
+        self.assertEqual(under_test.time_to_first_byte, 0.25)
+        self.assertIsNone(under_test.connect_time)
+
+    def test_download_telemetry_record_response_should_only_record_new_connection(
+        self,
+    ):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.raw.connection.connect_time = 0.05
+
+        under_test = DownloadTelemetry("Q80", "http://test.com/gtfs.zip")
+        under_test.record_response(mock_response)
+        self.assertEqual(under_test.connect_time, 0.05)
+
+        # The connection is reused by the next response
+        under_test.record_response(mock_response)
+        self.assertIsNone(under_test.connect_time)
+
+    def test_download_telemetry_to_dict_should_compute_throughput(self):
+        under_test = DownloadTelemetry("Q80", "http://test.com/gtfs.zip")
+        self.assertIsNone(under_test.to_dict()["throughput"])
+
+        under_test.start()
+        under_test.stop("downloaded")
+        under_test.bytes = 1000
+        under_test.total_time = 2
+
+        test_dict = under_test.to_dict()
+        self.assertEqual(test_dict["throughput"], 500)
+        self.assertEqual(test_dict["result"], "downloaded")
+        self.assertEqual(test_dict["entity_code"], "Q80")
+
+    def test_download_telemetry_replace_with_mirror_should_keep_retries(self):
+        under_test = DownloadTelemetry("Q80", "http://test.com/gtfs.zip")
+        under_test.retries = 2
+        test_mirror_telemetry = DownloadTelemetry("Q80", "http://mirror.com/gtfs.zip")
+        test_mirror_telemetry.bytes = 42
+        test_mirror_telemetry.retries = 1
+        test_mirror_telemetry.status_code = 200
+
+        under_test.replace_with(test_mirror_telemetry)
+
+        self.assertEqual(under_test.url, "http://mirror.com/gtfs.zip")
+        self.assertEqual(under_test.bytes, 42)
+        self.assertEqual(under_test.status_code, 200)
+        self.assertEqual(under_test.retries, 3)
+
+    @mock.patch("utilities.download_telemetry.socket.getaddrinfo")
+    def test_estimate_dns_time(self, mock_getaddrinfo):
+        self.assertIsNotNone(estimate_dns_time("https://test.com/gtfs.zip"))
+        mock_getaddrinfo.assert_called_once_with(
+            "test.com", 443, proto=socket.IPPROTO_TCP
+        )
+
+        mock_getaddrinfo.side_effect = socket.gaierror("Name or service not known")
+        self.assertIsNone(estimate_dns_time("http://test.com/gtfs.zip"))
+        self.assertIsNone(estimate_dns_time("not_a_url"))
@@ -0,0 +1,451 @@
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+from tempfile import TemporaryDirectory
+from threading import Event
+from zipfile import ZipFile, ZipInfo
+from hashlib import sha1
+import io
+import os
+import re
+from utilities.download_utils import (
+    stream_response_to_file,
+    probe_remote_zip_fingerprint,
+    download_file,
+    download_file_hedged,
+    DownloadRejected,
+    DownloadInterrupted,
+    save_partial_download_state,
+    DownloadSession,
+)
+from utilities.zip_utils import compute_zip_file_fingerprint
+from requests.exceptions import (
+    HTTPError,
+    ConnectionError,
+    ChunkedEncodingError,
+    SSLError,
+)
+
+
+def create_test_zip():
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr(
+            ZipInfo("stops.txt", date_time=(2021, 1, 1, 0, 0, 0)), "stop_id\n1\n"
+        )
+    return buffer.getvalue()
+
+
+TEST_ZIP_CONTENT = create_test_zip()
+TEST_ZIP_SHA1_HASH = sha1(TEST_ZIP_CONTENT).hexdigest()
+
+
+def create_range_response(content, range_header):
+    # Mimic a server answering a single byte range request
+    response = MagicMock()
+    response.status_code = 206
+    suffix_range = re.match(r"bytes=-(\d+)", range_header)
+    if suffix_range:
+        start = max(len(content) - int(suffix_range.group(1)), 0)
+        end = len(content) - 1
+    else:
+        start, end = [int(value) for value in range_header[6:].split("-")]
+    response.content = content[start : end + 1]
+    response.headers = {"Content-Range": f"bytes {start}-{end}/{len(content)}"}
+    return response
+
+
+class TestDownloadUtils(TestCase):
+    def test_stream_response_to_file(self):
+        mock_response = MagicMock()
+        mock_response.iter_content.return_value = [b"test", b"", b"_content"]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            under_test = stream_response_to_file(mock_response, test_file_path)
+            with open(test_file_path, "rb") as f:
+                self.assertEqual(f.read(), b"test_content")
+
+        self.assertEqual(under_test, "13ee7c643a033af3942124889d3f6b3b90c28907")
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_probe_remote_zip_fingerprint_should_match_local_fingerprint(
+        self, mock_get
+    ):
+        buffer = io.BytesIO()
+        with ZipFile(buffer, "w") as zip_file:
+            zip_file.writestr("stops.txt", "stop_id\n1\n")
+            zip_file.writestr("agency.txt", "agency_id\n1\n")
+            # A large comment pushes the central directory out of the fetched tail
+            zip_file.comment = b"c" * 65535
+        test_zip = buffer.getvalue()
+        mock_get.side_effect = lambda url, **kwargs: create_range_response(
+            test_zip, kwargs["headers"]["Range"]
+        )
+
+        with TemporaryDirectory() as path_to_data:
+            test_zip_path = os.path.join(path_to_data, "test.zip")
+            with open(test_zip_path, "wb") as f:
+                f.write(test_zip)
+            test_fingerprint = compute_zip_file_fingerprint(test_zip_path)
+
+        under_test = probe_remote_zip_fingerprint(
+            DownloadSession(), "http://test.com/gtfs.zip"
+        )
+        self.assertEqual(under_test, test_fingerprint)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_probe_remote_zip_fingerprint_without_range_support(self, mock_get):
+        mock_get.return_value.status_code = 200
+
+        under_test = probe_remote_zip_fingerprint(
+            DownloadSession(), "http://test.com/gtfs.zip"
+        )
+        self.assertIsNone(under_test)
+        mock_get.return_value.close.assert_called_once()
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_with_changed_remote_file_should_restart_download(
+        self, mock_get
+    ):
+        test_url = "http://test.com/gtfs.zip"
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {"ETag": '"new_etag"'}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            with open(f"{test_file_path}.part", "wb") as f:
+                f.write(b"old")
+            save_partial_download_state(
+                test_url, f"{test_file_path}.part", {"ETag": '"old_etag"'}
+            )
+
+            _, under_test = download_file(DownloadSession(), test_url, test_file_path)
+            with open(test_file_path, "rb") as f:
+                self.assertEqual(f.read(), TEST_ZIP_CONTENT)
+            self.assertEqual(os.listdir(path_to_data), ["test.zip"])
+
+        self.assertEqual(under_test, TEST_ZIP_SHA1_HASH)
+        mock_get.assert_called_once_with(
+            test_url,
+            allow_redirects=True,
+            stream=True,
+            headers={"Range": "bytes=3-", "If-Range": '"old_etag"'},
+            timeout=(10, 60),
+        )
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_with_weak_etag_should_not_resume(self, mock_get):
+        test_url = "http://test.com/gtfs.zip"
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            with open(f"{test_file_path}.part", "wb") as f:
+                f.write(b"old")
+            save_partial_download_state(
+                test_url, f"{test_file_path}.part", {"ETag": 'W/"weak_etag"'}
+            )
+
+            download_file(DownloadSession(), test_url, test_file_path)
+
+        mock_get.assert_called_once_with(
+            test_url, allow_redirects=True, stream=True, headers={}, timeout=(10, 60)
+        )
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_hedged_with_fast_url_should_not_use_mirror(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            _, under_test, under_test_url = download_file_hedged(
+                DownloadSession(),
+                ["http://test.com/gtfs.zip", "http://mirror.com/gtfs.zip"],
+                test_file_path,
+                hedge_delay=5,
+            )
+            self.assertEqual(os.listdir(path_to_data), ["test.zip"])
+
+        self.assertEqual(under_test, TEST_ZIP_SHA1_HASH)
+        self.assertEqual(under_test_url, "http://test.com/gtfs.zip")
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args[0][0], "http://test.com/gtfs.zip")
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_hedged_with_slow_url_should_keep_mirror_download(
+        self, mock_get
+    ):
+        release_slow_url = Event()
+
+        def get(url, **kwargs):
+            if url == "http://test.com/gtfs.zip":
+                # The server of the URL does not answer before the mirror download completes
+                release_slow_url.wait(5)
+                content = [TEST_ZIP_CONTENT[:4] + b"slow"]
+            else:
+                content = [TEST_ZIP_CONTENT]
+            response = MagicMock()
+            response.status_code = 200
+            response.headers = {}
+            response.iter_content.return_value = content
+            return response
+
+        mock_get.side_effect = get
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            _, under_test, _ = download_file_hedged(
+                DownloadSession(max_retries=0),
+                ["http://test.com/gtfs.zip", "http://mirror.com/gtfs.zip"],
+                test_file_path,
+                hedge_delay=0.1,
+            )
+            release_slow_url.set()
+            with open(test_file_path, "rb") as f:
+                self.assertEqual(f.read(), TEST_ZIP_CONTENT)
+            self.assertEqual(os.listdir(path_to_data), ["test.zip"])
+
+        self.assertEqual(under_test, TEST_ZIP_SHA1_HASH)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_hedged_with_stalled_body_should_cancel_slow_download(
+        self, mock_get
+    ):
+        closed_event = Event()
+
+        def stalled_content(chunk_size):
+            # The server of the URL answers with headers but does not send the body before being closed
+            closed_event.wait(5)
+            raise ConnectionError("Connection closed")
+
+        slow_response = MagicMock()
+        slow_response.status_code = 200
+        slow_response.headers = {"ETag": '"test_etag"'}
+        slow_response.iter_content.side_effect = stalled_content
+        slow_response.close.side_effect = closed_event.set
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {}
+        response.iter_content.return_value = [TEST_ZIP_CONTENT]
+        mock_get.side_effect = lambda url, **kwargs: (
+            slow_response if url == "http://test.com/gtfs.zip" else response
+        )
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            _, under_test, _ = download_file_hedged(
+                DownloadSession(max_retries=0),
+                ["http://test.com/gtfs.zip", "http://mirror.com/gtfs.zip"],
+                test_file_path,
+                hedge_delay=0.1,
+            )
+            self.assertTrue(closed_event.is_set())
+            self.assertEqual(os.listdir(path_to_data), ["test.zip"])
+
+        self.assertEqual(under_test, TEST_ZIP_SHA1_HASH)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_hedged_with_failing_url_should_use_mirror(self, mock_get):
+        error_response = MagicMock()
+        error_response.status_code = 404
+        error_response.raise_for_status.side_effect = HTTPError("404")
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {}
+        response.iter_content.return_value = [TEST_ZIP_CONTENT]
+        mock_get.side_effect = lambda url, **kwargs: (
+            error_response if url == "http://test.com/gtfs.zip" else response
+        )
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            _, under_test, under_test_url = download_file_hedged(
+                DownloadSession(),
+                ["http://test.com/gtfs.zip", "http://mirror.com/gtfs.zip"],
+                test_file_path,
+                hedge_delay=60,
+            )
+            self.assertEqual(sorted(os.listdir(path_to_data)), ["test.zip"])
+
+        self.assertEqual(under_test, TEST_ZIP_SHA1_HASH)
+        self.assertEqual(under_test_url, "http://mirror.com/gtfs.zip")
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_with_html_page_should_be_rejected(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.iter_content.return_value = [
+            b"<html>",
+            b"<body>Not found</body></html>",
+        ]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            self.assertRaises(
+                DownloadRejected,
+                download_file,
+                DownloadSession(),
+                "http://test.com/gtfs.zip",
+                test_file_path,
+            )
+            self.assertEqual(os.listdir(path_to_data), [])
+        # The body is rejected from its first bytes
+        self.assertEqual(mock_get.return_value.iter_content.call_count, 1)
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_with_invalid_central_directory_should_be_rejected(
+        self, mock_get
+    ):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT[:-10]]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            self.assertRaises(
+                DownloadRejected,
+                download_file,
+                DownloadSession(),
+                "http://test.com/gtfs.zip",
+                test_file_path,
+            )
+            self.assertEqual(os.listdir(path_to_data), [])
+
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_larger_than_max_size_should_be_rejected(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {"Content-Length": "1000"}
+        mock_get.return_value.iter_content.return_value = [TEST_ZIP_CONTENT]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            # The announced size is checked before the body is read
+            self.assertRaises(
+                DownloadRejected,
+                download_file,
+                DownloadSession(max_download_size=100),
+                "http://test.com/gtfs.zip",
+                test_file_path,
+            )
+            mock_get.return_value.iter_content.assert_not_called()
+
+            # The size of the body is checked while it is read
+            mock_get.return_value.headers = {}
+            self.assertRaises(
+                DownloadRejected,
+                download_file,
+                DownloadSession(max_download_size=100),
+                "http://test.com/gtfs.zip",
+                test_file_path,
+            )
+            self.assertEqual(os.listdir(path_to_data), [])
+
+    @mock.patch("utilities.download_utils.time.sleep")
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_with_failing_host_should_retry_requests_once(
+        self, mock_get, mock_sleep
+    ):
+        mock_get.side_effect = ConnectionError("Connection refused")
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            self.assertRaises(
+                ConnectionError,
+                download_file,
+                DownloadSession(max_retries=3),
+                "http://test.com/gtfs.zip",
+                test_file_path,
+            )
+        self.assertEqual(mock_get.call_count, 4)
+        self.assertEqual(mock_sleep.call_count, 3)
+
+    @mock.patch("utilities.download_utils.time.sleep")
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_with_ssl_error_should_not_retry(self, mock_get, mock_sleep):
+        mock_get.side_effect = SSLError("Certificate verify failed")
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            self.assertRaises(
+                SSLError,
+                download_file,
+                DownloadSession(max_retries=3),
+                "http://test.com/gtfs.zip",
+                test_file_path,
+            )
+        mock_get.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    @mock.patch("utilities.download_utils.time.sleep")
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_retries_should_share_max_retries(self, mock_get, mock_sleep):
+        def interrupted_content(chunk_size):
+            yield TEST_ZIP_CONTENT[:4]
+            raise ChunkedEncodingError("Connection dropped")
+
+        interrupted_response = MagicMock()
+        interrupted_response.status_code = 200
+        interrupted_response.headers = {"ETag": '"test_etag"'}
+        interrupted_response.iter_content.side_effect = interrupted_content
+        error_response = MagicMock()
+        error_response.status_code = 503
+        mock_get.side_effect = [
+            ConnectionError("Connection reset"),
+            error_response,
+            interrupted_response,
+        ]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            self.assertRaises(
+                DownloadInterrupted,
+                download_file,
+                DownloadSession(max_retries=2),
+                "http://test.com/gtfs.zip",
+                test_file_path,
+            )
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        error_response.close.assert_called_once()
+
+    @mock.patch("utilities.download_utils.time.sleep")
+    @mock.patch("utilities.download_utils.requests.Session.get")
+    def test_download_file_interrupted_should_resume_download(
+        self, mock_get, mock_sleep
+    ):
+        def interrupted_content(chunk_size):
+            yield TEST_ZIP_CONTENT[:4]
+            raise ChunkedEncodingError("Connection dropped")
+
+        interrupted_response = MagicMock()
+        interrupted_response.status_code = 200
+        interrupted_response.headers = {"ETag": '"test_etag"'}
+        interrupted_response.iter_content.side_effect = interrupted_content
+        resumed_response = MagicMock()
+        resumed_response.status_code = 206
+        resumed_response.headers = {
+            "Content-Range": f"bytes 4-{len(TEST_ZIP_CONTENT) - 1}/{len(TEST_ZIP_CONTENT)}"
+        }
+        resumed_response.iter_content.return_value = [TEST_ZIP_CONTENT[4:]]
+        mock_get.side_effect = [interrupted_response, resumed_response]
+
+        with TemporaryDirectory() as path_to_data:
+            test_file_path = os.path.join(path_to_data, "test.zip")
+            _, under_test = download_file(
+                DownloadSession(max_retries=1),
+                "http://test.com/gtfs.zip",
+                test_file_path,
+            )
+            with open(test_file_path, "rb") as f:
+                self.assertEqual(f.read(), TEST_ZIP_CONTENT)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 1)
@@ -0,0 +1,101 @@
+from unittest import TestCase, mock
+from tempfile import TemporaryDirectory
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+import os
+from utilities.hash_utils import compute_file_sha1, compute_gtfs_content_hash
+
+
+def create_test_zip(zip_path, members, date_time, compression=ZIP_STORED):
+    with ZipFile(zip_path, "w", compression=compression) as zip_file:
+        for name, content in members:
+            zip_file.writestr(ZipInfo(name, date_time=date_time), content)
+
+
+class TestHashUtils(TestCase):
+    def test_compute_file_sha1(self):
+        with TemporaryDirectory() as path_to_data:
+            test_path = os.path.join(path_to_data, "test.zip")
+            with open(test_path, "wb") as f:
+                f.write(b"test_content")
+            under_test = compute_file_sha1(test_path)
+        self.assertEqual(under_test, "13ee7c643a033af3942124889d3f6b3b90c28907")
+
+    @mock.patch("utilities.hash_utils.HASH_CHUNK_BYTE_SIZE", 4)
+    @mock.patch("utilities.hash_utils.MMAP_MIN_BYTE_SIZE", 1)
+    def test_compute_file_sha1_with_memory_mapped_file(self):
+        with TemporaryDirectory() as path_to_data:
+            test_path = os.path.join(path_to_data, "test.zip")
+            with open(test_path, "wb") as f:
+                f.write(b"test_content")
+            under_test = compute_file_sha1(test_path)
+
+            empty_test_path = os.path.join(path_to_data, "empty.zip")
+            open(empty_test_path, "wb").close()
+            empty_under_test = compute_file_sha1(empty_test_path)
+        self.assertEqual(under_test, "13ee7c643a033af3942124889d3f6b3b90c28907")
+        self.assertEqual(empty_under_test, "da39a3ee5e6b4b0d3255bfef95601890afd80709")
+
+    def test_compute_file_sha1_with_missing_file_should_raise_exception(self):
+        self.assertRaises(OSError, compute_file_sha1, "./missing_file.zip")
+
+    def test_compute_gtfs_content_hash_should_ignore_zip_packaging(self):
+        with TemporaryDirectory() as path_to_data:
+            test_path = os.path.join(path_to_data, "test.zip")
+            create_test_zip(
+                test_path,
+                [("agency.txt", "agency_id\n1\n"), ("stops.txt", "stop_id\n1\n")],
+                (2021, 1, 1, 0, 0, 0),
+            )
+            other_test_path = os.path.join(path_to_data, "other_test.zip")
+            create_test_zip(
+                other_test_path,
+                [
+                    ("stops.txt", "stop_id\r\n1\r\n"),
+                    ("agency.txt", "agency_id\r1\r"),
+                ],
+                (2022, 2, 2, 0, 0, 0),
+                ZIP_DEFLATED,
+            )
+            changed_test_path = os.path.join(path_to_data, "changed_test.zip")
+            create_test_zip(
+                changed_test_path,
+                [("agency.txt", "agency_id\n1\n"), ("stops.txt", "stop_id\n2\n")],
+                (2021, 1, 1, 0, 0, 0),
+            )
+
+            content_hash, table_digests = compute_gtfs_content_hash(test_path)
+            other_content_hash, other_table_digests = compute_gtfs_content_hash(
+                other_test_path
+            )
+            changed_content_hash, changed_table_digests = compute_gtfs_content_hash(
+                changed_test_path
+            )
+
+        self.assertEqual(content_hash, other_content_hash)
+        self.assertEqual(table_digests, other_table_digests)
+        self.assertNotEqual(content_hash, changed_content_hash)
+        self.assertEqual(
+            table_digests["agency.txt"], changed_table_digests["agency.txt"]
+        )
+        self.assertNotEqual(
+            table_digests["stops.txt"], changed_table_digests["stops.txt"]
+        )
+
+    @mock.patch("utilities.hash_utils.HASH_CHUNK_BYTE_SIZE", 8)
+    def test_compute_gtfs_content_hash_with_line_ending_across_chunks(self):
+        with TemporaryDirectory() as path_to_data:
+            test_path = os.path.join(path_to_data, "test.zip")
+            create_test_zip(
+                test_path, [("stops.txt", "stop_id\n1\n")], (2021, 1, 1, 0, 0, 0)
+            )
+            other_test_path = os.path.join(path_to_data, "other_test.zip")
+            # The CR of the first CRLF is the last byte of the first chunk
+            create_test_zip(
+                other_test_path,
+                [("stops.txt", "stop_id\r\n1\r\n")],
+                (2021, 1, 1, 0, 0, 0),
+            )
+            self.assertEqual(
+                compute_gtfs_content_hash(test_path),
+                compute_gtfs_content_hash(other_test_path),
+            )
@@ -1,9 +1,18 @@
 from unittest import TestCase, mock
+from unittest.mock import MagicMock
 
 from utilities.request_utils import (
     import_entity,
+    import_entity_claims,
+    create_entity_json,
+    create_statement_guid,
     extract_dataset_version_codes,
     extract_source_entity_codes,
+    extract_catalog_infos,
+    extract_entities_json,
+    extract_recent_changes,
+    extract_dataset_version_sha1_hashes,
+    execute_paginated_sparql_query,
 )
 from utilities.constants import (
     VALUE,
@@ -13,14 +22,22 @@ from utilities.constants import (
     GTFS_CATALOG_OF_SOURCES_CODE,
     GBFS_CATALOG_OF_SOURCES_CODE,
     CATALOG_PROP,
+    STABLE_URL_PROP,
+    SHA1_HASH_PROP,
+    SPARQL_VAR_LABEL,
+    SPARQL_VAR_URL,
+    SPARQL_VAR_SHA1,
     API_URL,
     SPARQL_BIGDATA_URL,
+    ENTITIES,
+    MISSING,
+    ID,
 )
 
 
 class TestImportEntityRequestUtils(TestCase):
     @mock.patch("utilities.request_utils.wbi_core.ItemEngine")
-    @mock.patch("utilities.request_utils.wbi_login")
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
     def test_import_entity_with_item_id(self, mock_login, mock_item_engine):
         test_username = "test_username "
         test_password = "test_password"
@@ -38,7 +55,7 @@ class TestImportEntityRequestUtils(TestCase):
         self.assertEqual(under_test, test_item_id)
 
     @mock.patch("utilities.request_utils.wbi_core.ItemEngine")
-    @mock.patch("utilities.request_utils.wbi_login")
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
     def test_import_entity_with_empty_item_id(self, mock_login, mock_item_engine):
         test_username = "test_username "
         test_password = "test_password"
@@ -56,6 +73,43 @@ class TestImportEntityRequestUtils(TestCase):
         self.assertEqual(under_test, "test_new_entity")
 
 
+class TestImportEntityClaimsRequestUtils(TestCase):
+    def test_create_entity_json_with_label(self):
+        test_claim = MagicMock()
+        test_claim.get_json_representation.return_value = {"test_key": "test_value"}
+
+        under_test = create_entity_json([test_claim], "test_label")
+        self.assertEqual(
+            under_test,
+            {
+                "claims": [{"test_key": "test_value"}],
+                "labels": {"en": {"language": "en", "value": "test_label"}},
+            },
+        )
+
+    def test_create_entity_json_without_label(self):
+        under_test = create_entity_json([])
+        self.assertEqual(under_test, {"claims": []})
+
+    def test_import_entity_claims_with_item_id(self):
+        test_claim = MagicMock()
+        test_claim.get_json_representation.return_value = {"test_key": "test_value"}
+        mock_write_session = MagicMock()
+        mock_write_session.edit_entity.return_value = "test_item_id"
+
+        under_test = import_entity_claims(
+            "test_username",
+            "test_password",
+            [test_claim],
+            item_id="test_item_id",
+            write_session=mock_write_session,
+        )
+        self.assertEqual(under_test, "test_item_id")
+        mock_write_session.edit_entity.assert_called_once_with(
+            {"claims": [{"test_key": "test_value"}]}, "test_item_id"
+        )
+
+
 class TestSparqlRequestUtils(TestCase):
     @mock.patch("utilities.request_utils.os.environ")
     @mock.patch("utilities.request_utils.wbi_core.FunctionsEngine.execute_sparql_query")
@@ -116,3 +170,207 @@ class TestSparqlRequestUtils(TestCase):
 
         under_test = extract_source_entity_codes(test_catalog_code)
         self.assertEqual(under_test, ["Q80", "Q82"])
+
+    @mock.patch("utilities.request_utils.os.environ")
+    @mock.patch("utilities.request_utils.wbi_core.FunctionsEngine.execute_sparql_query")
+    def test_extract_catalog_infos(self, mock_sparql_request, mock_env):
+        test_env = {
+            CATALOG_PROP: "test_catalog_prop",
+            SOURCE_ENTITY_PROP: "test_source_entity_prop",
+            STABLE_URL_PROP: "test_stable_url_prop",
+            SHA1_HASH_PROP: "test_sha1_hash_prop",
+        }
+        mock_env.__getitem__.side_effect = test_env.__getitem__
+
+        mock_sparql_request.return_value = {
+            RESULTS: {
+                BINDINGS: [
+                    {
+                        "source": {VALUE: "http://wikibase.svc/entity/Q80"},
+                        "label": {VALUE: "test_name"},
+                    },
+                    {
+                        "source": {VALUE: "http://wikibase.svc/entity/Q80"},
+                        "url": {VALUE: "test_url"},
+                    },
+                    {
+                        "source": {VALUE: "http://wikibase.svc/entity/Q80"},
+                        "url": {VALUE: "test_url"},
+                    },
+                    {
+                        "source": {VALUE: "http://wikibase.svc/entity/Q80"},
+                        "sha1": {VALUE: "test_sha1_hash"},
+                    },
+                    {
+                        "source": {VALUE: "http://wikibase.svc/entity/Q82"},
+                        "url": {VALUE: "other_test_url"},
+                    },
+                ]
+            }
+        }
+
+        under_test = extract_catalog_infos("test_catalog_code")
+        self.assertEqual(
+            under_test,
+            {
+                "Q80": {
+                    SPARQL_VAR_LABEL: "test_name",
+                    SPARQL_VAR_URL: ["test_url"],
+                    SPARQL_VAR_SHA1: {"test_sha1_hash"},
+                },
+                "Q82": {
+                    SPARQL_VAR_LABEL: None,
+                    SPARQL_VAR_URL: ["other_test_url"],
+                    SPARQL_VAR_SHA1: set(),
+                },
+            },
+        )
+        self.assertEqual(mock_sparql_request.call_count, 1)
+
+    @mock.patch("utilities.request_utils.os.environ")
+    @mock.patch("utilities.request_utils.wbi_core.FunctionsEngine.execute_sparql_query")
+    def test_extract_dataset_version_sha1_hashes(self, mock_sparql_request, mock_env):
+        test_env = {
+            SOURCE_ENTITY_PROP: "test_source_entity_prop",
+            SHA1_HASH_PROP: "test_sha1_hash_prop",
+        }
+        mock_env.__getitem__.side_effect = test_env.__getitem__
+
+        mock_sparql_request.return_value = {
+            RESULTS: {
+                BINDINGS: [
+                    {
+                        "version": {VALUE: "http://wikibase.svc/entity/Q81"},
+                        "source": {VALUE: "http://wikibase.svc/entity/Q80"},
+                        "sha1": {VALUE: "test_sha1_hash"},
+                    },
+                    {
+                        "version": {VALUE: "http://wikibase.svc/entity/Q91"},
+                        "source": {VALUE: "http://wikibase.svc/entity/Q90"},
+                        "sha1": {VALUE: "test_sha1_hash"},
+                    },
+                ]
+            }
+        }
+
+        under_test = extract_dataset_version_sha1_hashes()
+        self.assertEqual(
+            under_test,
+            [
+                ("test_sha1_hash", "Q80", "Q81"),
+                ("test_sha1_hash", "Q90", "Q91"),
+            ],
+        )
+
+    def test_execute_paginated_sparql_query_with_invalid_page_size_should_raise_exception(
+        self,
+    ):
+        self.assertRaises(
+            TypeError,
+            list,
+            execute_paginated_sparql_query("test_query", "?a", page_size=0),
+        )
+
+    @mock.patch("utilities.request_utils.wbi_core.FunctionsEngine.execute_sparql_query")
+    def test_execute_paginated_sparql_query_should_yield_every_page(
+        self, mock_sparql_request
+    ):
+        mock_sparql_request.side_effect = [
+            {RESULTS: {BINDINGS: [{"a": {VALUE: "1"}}, {"a": {VALUE: "2"}}]}},
+            {RESULTS: {BINDINGS: [{"a": {VALUE: "3"}}]}},
+        ]
+
+        under_test = execute_paginated_sparql_query("test_query", "?a", page_size=2)
+        mock_sparql_request.assert_not_called()
+        self.assertEqual(
+            [binding["a"][VALUE] for binding in under_test], ["1", "2", "3"]
+        )
+        self.assertEqual(mock_sparql_request.call_count, 2)
+        last_query = mock_sparql_request.call_args.args[0]
+        self.assertIn("ORDER BY ?a", last_query)
+        self.assertIn("LIMIT 2", last_query)
+        self.assertIn("OFFSET 2", last_query)
+
+
+class TestEntitiesRequestUtils(TestCase):
+    def test_extract_entities_json_with_invalid_parameters_should_raise_exception(
+        self,
+    ):
+        self.assertRaises(TypeError, extract_entities_json, ["Q80"], batch_size=0)
+        self.assertRaises(TypeError, extract_entities_json, ["Q80"], batch_size=51)
+        self.assertRaises(TypeError, extract_entities_json, ["Q80"], max_workers=0)
+
+    @mock.patch(
+        "utilities.request_utils.wbi_core.FunctionsEngine.mediawiki_api_call_helper"
+    )
+    def test_extract_entities_json_should_batch_requests(self, mock_api_call):
+        mock_api_call.side_effect = lambda data, allow_anonymous: {
+            ENTITIES: {
+                entity_code: (
+                    {ID: entity_code}
+                    if entity_code != "Q82"
+                    else {ID: entity_code, MISSING: ""}
+                )
+                for entity_code in data["ids"].split("|")
+            }
+        }
+
+        under_test = extract_entities_json(
+            ["Q80", "Q81", "Q82", "Q80", "Q83"], batch_size=2
+        )
+        self.assertEqual(
+            under_test,
+            {
+                "Q80": {ID: "Q80"},
+                "Q81": {ID: "Q81"},
+                "Q82": {},
+                "Q83": {ID: "Q83"},
+            },
+        )
+        self.assertEqual(mock_api_call.call_count, 2)
+        self.assertEqual(
+            sorted(call.kwargs["data"]["ids"] for call in mock_api_call.call_args_list),
+            ["Q80|Q81", "Q82|Q83"],
+        )
+
+    @mock.patch(
+        "utilities.request_utils.wbi_core.FunctionsEngine.mediawiki_api_call_helper"
+    )
+    def test_extract_recent_changes_should_follow_continuation(self, mock_api_call):
+        mock_api_call.side_effect = [
+            {
+                "continue": {"rccontinue": "test_continue", "continue": "-||"},
+                "query": {
+                    "recentchanges": [
+                        {"title": "Item:Q80", "revid": 10},
+                        {"title": "Property:P1", "revid": 11},
+                    ]
+                },
+            },
+            {
+                "query": {
+                    "recentchanges": [
+                        {"title": "Item:Q80", "revid": 12},
+                        {"title": "Q81", "revid": 13},
+                    ]
+                },
+            },
+        ]
+
+        under_test = extract_recent_changes("2021-06-01T00:00:00Z")
+        self.assertEqual(under_test, {"Q80": 12, "Q81": 13})
+        self.assertEqual(mock_api_call.call_count, 2)
+        self.assertEqual(
+            mock_api_call.call_args.kwargs["data"]["rccontinue"], "test_continue"
+        )
+
+
+class TestStatementGuidRequestUtils(TestCase):
+    def test_create_statement_guid_should_be_stable(self):
+        under_test = create_statement_guid("Q1", "Q2")
+        self.assertEqual(under_test, create_statement_guid("Q1", "Q2"))
+        self.assertNotEqual(under_test, create_statement_guid("Q1", "Q3"))
+        self.assertRegex(
+            under_test,
+            r"^Q1\$[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$",
+        )
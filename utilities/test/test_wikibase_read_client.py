@@ -0,0 +1,126 @@
+import asyncio
+from threading import Lock
+import time
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+from utilities.wikibase_read_client import WikibaseReadClient, WikibaseReadError
+
+TEST_API_URL = "http://test.mobilitydatabase.org/w/api.php"
+
+
+def create_test_response(status_code=200, json_response=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = json_response or {}
+    return response
+
+
+class TestWikibaseReadClient(TestCase):
+    def test_read_client_with_invalid_concurrency_should_raise_exception(self):
+        self.assertRaises(
+            TypeError,
+            WikibaseReadClient,
+            TEST_API_URL,
+            max_concurrency=0,
+        )
+
+    @mock.patch("utilities.wikibase_read_client.requests.Session")
+    def test_api_get_should_retry_after_maxlag_error(self, mock_session):
+        mock_session.return_value.get.side_effect = [
+            create_test_response(
+                json_response={"error": {"code": "maxlag"}},
+                headers={"Retry-After": "0"},
+            ),
+            create_test_response(json_response={"test_key": "test_value"}),
+        ]
+        under_test = WikibaseReadClient(TEST_API_URL, maxlag=3)
+
+        json_response = asyncio.run(under_test.api_get({"action": "query"}))
+        self.assertEqual(json_response, {"test_key": "test_value"})
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+        self.assertEqual(
+            mock_session.return_value.get.call_args.kwargs["params"],
+            {"action": "query", "format": "json", "maxlag": 3},
+        )
+        under_test.close()
+
+    @mock.patch("utilities.wikibase_read_client.requests.Session")
+    def test_api_get_should_retry_after_too_many_requests(self, mock_session):
+        mock_session.return_value.get.side_effect = [
+            create_test_response(status_code=429, headers={"Retry-After": "0"}),
+            create_test_response(json_response={"test_key": "test_value"}),
+        ]
+        under_test = WikibaseReadClient(TEST_API_URL)
+
+        json_response = asyncio.run(under_test.api_get({"action": "query"}))
+        self.assertEqual(json_response, {"test_key": "test_value"})
+        self.assertEqual(mock_session.return_value.get.call_args.args[0], TEST_API_URL)
+        under_test.close()
+
+    @mock.patch("utilities.wikibase_read_client.requests.Session")
+    def test_api_get_with_api_error_should_raise_exception(self, mock_session):
+        mock_session.return_value.get.return_value = create_test_response(
+            json_response={"error": {"code": "internal_api_error", "info": "test_info"}}
+        )
+        under_test = WikibaseReadClient(TEST_API_URL)
+
+        self.assertRaises(
+            WikibaseReadError,
+            asyncio.run,
+            under_test.get_entities_json(["Q80"]),
+        )
+        mock_session.return_value.get.assert_called_once()
+        under_test.close()
+
+    @mock.patch("utilities.wikibase_read_client.requests.Session")
+    def test_api_get_should_bound_requests_in_flight(self, mock_session):
+        lock = Lock()
+        in_flight = []
+        max_in_flight = []
+
+        def get(url, params, headers, timeout):
+            with lock:
+                in_flight.append(url)
+                max_in_flight.append(len(in_flight))
+            time.sleep(0.05)
+            with lock:
+                in_flight.pop()
+            return create_test_response(json_response={})
+
+        mock_session.return_value.get.side_effect = get
+        under_test = WikibaseReadClient(TEST_API_URL, max_concurrency=2)
+
+        async def send_requests():
+            return await asyncio.gather(
+                *[under_test.api_get({"action": "query"}) for _ in range(6)]
+            )
+
+        asyncio.run(send_requests())
+        self.assertEqual(mock_session.return_value.get.call_count, 6)
+        self.assertLessEqual(max(max_in_flight), 2)
+        under_test.close()
+
+    @mock.patch("utilities.wikibase_read_client.requests.Session")
+    def test_get_entities_json_should_batch_requests(self, mock_session):
+        mock_session.return_value.get.side_effect = (
+            lambda url, params, headers, timeout: create_test_response(
+                json_response={
+                    "entities": {
+                        entity_code: {"id": entity_code}
+                        for entity_code in params["ids"].split("|")
+                    }
+                }
+            )
+        )
+        under_test = WikibaseReadClient(TEST_API_URL)
+
+        entities_json = asyncio.run(
+            under_test.get_entities_json(["Q80", "Q81", "Q82"], batch_size=2)
+        )
+        self.assertEqual(
+            entities_json,
+            {"Q80": {"id": "Q80"}, "Q81": {"id": "Q81"}, "Q82": {"id": "Q82"}},
+        )
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+        under_test.close()
@@ -0,0 +1,77 @@
+from threading import Event, Lock, Thread
+from unittest import TestCase, mock
+from utilities.wikibase_write_queue import WikibaseWriteQueue
+
+
+class TestWikibaseWriteQueue(TestCase):
+    def test_write_queue_with_invalid_parameters_should_raise_exception(self):
+        self.assertRaises(TypeError, WikibaseWriteQueue, print, max_size=0)
+        self.assertRaises(TypeError, WikibaseWriteQueue, print, max_writers=0)
+        self.assertRaises(TypeError, WikibaseWriteQueue, print, max_retries=-1)
+
+    def test_write_queue_should_write_every_item(self):
+        lock = Lock()
+        written_items = []
+
+        def write_function(item):
+            with lock:
+                written_items.append(item)
+
+        under_test = WikibaseWriteQueue(write_function, max_size=2, max_writers=3)
+        for item in range(10):
+            under_test.put(item)
+        self.assertEqual(under_test.close(), [])
+        self.assertEqual(sorted(written_items), list(range(10)))
+        self.assertEqual(under_test.get_written_count(), 10)
+
+    def test_write_queue_should_block_when_full(self):
+        release_writer = Event()
+        under_test = WikibaseWriteQueue(
+            lambda item: release_writer.wait(), max_size=1, max_writers=1
+        )
+        # The writer holds the first item and the queue holds the second one
+        under_test.put(1)
+        under_test.put(2)
+
+        third_put_done = Event()
+
+        def put_third_item():
+            under_test.put(3)
+            third_put_done.set()
+
+        thread = Thread(target=put_third_item)
+        thread.start()
+        self.assertFalse(third_put_done.wait(0.2))
+        release_writer.set()
+        self.assertTrue(third_put_done.wait(5))
+        thread.join()
+        under_test.close()
+        self.assertEqual(under_test.get_written_count(), 3)
+
+    @mock.patch("utilities.wikibase_write_queue.time.sleep")
+    def test_write_queue_should_retry_failed_write(self, mock_sleep):
+        attempts = []
+
+        def write_function(item):
+            attempts.append(item)
+            if len(attempts) < 3:
+                raise ConnectionError("test_error")
+
+        under_test = WikibaseWriteQueue(
+            write_function, max_writers=1, max_retries=3, retry_after=1
+        )
+        under_test.put("test_item")
+        self.assertEqual(under_test.close(), [])
+        self.assertEqual(attempts, ["test_item"] * 3)
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [1, 2])
+
+    @mock.patch("utilities.wikibase_write_queue.time.sleep")
+    def test_write_queue_should_return_items_failing_every_retry(self, mock_sleep):
+        def write_function(item):
+            raise ConnectionError("test_error")
+
+        under_test = WikibaseWriteQueue(write_function, max_writers=2, max_retries=1)
+        under_test.put("test_item")
+        self.assertEqual(under_test.close(), ["test_item"])
+        self.assertEqual(under_test.get_written_count(), 0)
+        self.assertRaises(ValueError, under_test.put, "test_other_item")
@@ -0,0 +1,158 @@
+import json
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+from wikibaseintegrator.wbi_core import MWApiError
+from utilities.wikibase_write_session import WikibaseWriteSession, get_error_code
+
+TEST_API_URL = "http://test.mobilitydatabase.org/w/api.php"
+
+
+def create_test_login(edit_tokens):
+    login = MagicMock()
+    login.edit_token = edit_tokens[0]
+    login.get_edit_token.side_effect = lambda: login.edit_token
+    refreshed_tokens = iter(edit_tokens[1:])
+
+    def generate_edit_credentials():
+        login.edit_token = next(refreshed_tokens)
+
+    login.generate_edit_credentials.side_effect = generate_edit_credentials
+    return login
+
+
+class TestWikibaseWriteSession(TestCase):
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
+    def test_write_should_login_once_for_every_write(self, mock_login):
+        test_login = create_test_login(["test_token"])
+        mock_login.Login.return_value = test_login
+        test_entity = MagicMock()
+        test_entity.write.side_effect = ["Q1", "Q2", "Q3"]
+
+        under_test = WikibaseWriteSession(
+            "test_username", "test_password", TEST_API_URL
+        )
+        self.assertEqual(
+            [under_test.write(test_entity) for _ in range(3)], ["Q1", "Q2", "Q3"]
+        )
+        self.assertEqual(under_test.get_login_count(), 1)
+        mock_login.Login.assert_called_once_with(
+            user="test_username",
+            pwd="test_password",
+            mediawiki_api_url=TEST_API_URL,
+            use_clientlogin=True,
+        )
+        for call in test_entity.write.call_args_list:
+            self.assertIs(call.args[0], test_login)
+        test_login.generate_edit_credentials.assert_not_called()
+
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
+    def test_write_should_refresh_rejected_token(self, mock_login):
+        test_login = create_test_login(["test_stale_token", "test_fresh_token"])
+        mock_login.Login.return_value = test_login
+        test_entity = MagicMock()
+        test_entity.write.side_effect = [
+            MWApiError({"error": {"code": "badtoken"}}),
+            "Q1",
+        ]
+
+        under_test = WikibaseWriteSession(
+            "test_username", "test_password", TEST_API_URL
+        )
+        self.assertEqual(under_test.write(test_entity), "Q1")
+        self.assertEqual(test_login.edit_token, "test_fresh_token")
+        self.assertEqual(test_entity.write.call_count, 2)
+        self.assertEqual(under_test.get_login_count(), 1)
+
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
+    def test_write_should_login_again_when_login_expired(self, mock_login):
+        expired_login = create_test_login(["test_stale_token", "+\\"])
+        new_login = create_test_login(["test_fresh_token"])
+        mock_login.Login.side_effect = [expired_login, new_login]
+        test_entity = MagicMock()
+        test_entity.write.side_effect = [
+            MWApiError({"error": {"code": "badtoken"}}),
+            "Q1",
+        ]
+
+        under_test = WikibaseWriteSession(
+            "test_username", "test_password", TEST_API_URL
+        )
+        self.assertEqual(under_test.write(test_entity), "Q1")
+        self.assertIs(test_entity.write.call_args.args[0], new_login)
+        self.assertEqual(under_test.get_login_count(), 2)
+
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
+    def test_write_should_raise_other_errors(self, mock_login):
+        mock_login.Login.return_value = create_test_login(["test_token"])
+        test_entity = MagicMock()
+        test_entity.write.side_effect = MWApiError({"error": {"code": "failed-save"}})
+
+        under_test = WikibaseWriteSession(
+            "test_username", "test_password", TEST_API_URL
+        )
+        self.assertRaises(MWApiError, under_test.write, test_entity)
+        self.assertEqual(test_entity.write.call_count, 1)
+
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
+    def test_refresh_edit_token_should_skip_already_refreshed_token(self, mock_login):
+        test_login = create_test_login(["test_fresh_token", "test_other_token"])
+        mock_login.Login.return_value = test_login
+
+        under_test = WikibaseWriteSession(
+            "test_username", "test_password", TEST_API_URL
+        )
+        under_test.refresh_edit_token("test_stale_token")
+        test_login.generate_edit_credentials.assert_not_called()
+
+    @mock.patch(
+        "utilities.wikibase_write_session.wbi_core.FunctionsEngine.mediawiki_api_call_helper"
+    )
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
+    def test_edit_entity_should_send_minimal_payload(self, mock_login, mock_api_call):
+        test_login = create_test_login(["test_token"])
+        mock_login.Login.return_value = test_login
+        mock_api_call.return_value = {"entity": {"id": "Q2"}}
+        test_entity_json = {"claims": [{"test_key": "test_value"}]}
+
+        under_test = WikibaseWriteSession(
+            "test_username", "test_password", TEST_API_URL, maxlag=3
+        )
+        self.assertEqual(under_test.edit_entity(test_entity_json, "Q2"), "Q2")
+        payload = mock_api_call.call_args.kwargs["data"]
+        self.assertEqual(payload["action"], "wbeditentity")
+        self.assertEqual(payload["id"], "Q2")
+        self.assertNotIn("new", payload)
+        self.assertEqual(payload["token"], "test_token")
+        self.assertEqual(payload["maxlag"], 3)
+        self.assertEqual(json.loads(payload["data"]), test_entity_json)
+        self.assertIs(mock_api_call.call_args.kwargs["login"], test_login)
+
+    @mock.patch(
+        "utilities.wikibase_write_session.wbi_core.FunctionsEngine.mediawiki_api_call_helper"
+    )
+    @mock.patch("utilities.wikibase_write_session.wbi_login")
+    def test_edit_entity_should_create_item_with_refreshed_token(
+        self, mock_login, mock_api_call
+    ):
+        mock_login.Login.return_value = create_test_login(
+            ["test_stale_token", "test_fresh_token"]
+        )
+        mock_api_call.side_effect = [
+            MWApiError({"error": {"code": "badtoken"}}),
+            {"entity": {"id": "Q3"}},
+        ]
+
+        under_test = WikibaseWriteSession(
+            "test_username", "test_password", TEST_API_URL
+        )
+        self.assertEqual(under_test.edit_entity({"claims": []}), "Q3")
+        payload = mock_api_call.call_args.kwargs["data"]
+        self.assertEqual(payload["new"], "item")
+        self.assertNotIn("id", payload)
+        self.assertEqual(payload["token"], "test_fresh_token")
+
+    def test_get_error_code(self):
+        self.assertEqual(
+            get_error_code(MWApiError({"error": {"code": "badtoken"}})), "badtoken"
+        )
+        self.assertIsNone(get_error_code(MWApiError("test_error")))
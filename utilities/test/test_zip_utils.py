@@ -0,0 +1,101 @@
+from unittest import TestCase, mock
+from tempfile import TemporaryDirectory
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED, BadZipFile
+import io
+import os
+import struct
+from utilities.zip_utils import (
+    find_central_directory,
+    find_zip64_central_directory,
+    parse_central_directory,
+    compute_zip_fingerprint,
+    compute_zip_file_fingerprint,
+    NAME,
+    CRC,
+    UNCOMPRESSED_SIZE,
+)
+
+
+def create_zip(members, compression=ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w", compression=compression) as zip_file:
+        for name, content in members:
+            zip_file.writestr(name, content)
+    return buffer.getvalue()
+
+
+def read_central_directory(zip_bytes):
+    cd_offset, cd_size = find_central_directory(zip_bytes, len(zip_bytes))
+    if cd_size is None:
+        cd_offset, cd_size = find_zip64_central_directory(zip_bytes[cd_offset:])
+    return parse_central_directory(zip_bytes[cd_offset : cd_offset + cd_size])
+
+
+class TestZipUtils(TestCase):
+    def test_parse_central_directory(self):
+        test_zip = create_zip([("stops.txt", b"stop_id\n1\n"), ("agency.txt", b"a")])
+
+        under_test = read_central_directory(test_zip)
+        self.assertEqual(
+            [entry[NAME] for entry in under_test], ["stops.txt", "agency.txt"]
+        )
+        self.assertEqual(under_test[0][UNCOMPRESSED_SIZE], 10)
+        self.assertIsInstance(under_test[0][CRC], int)
+
+    def test_parse_central_directory_with_zip64(self):
+        # Lower the zip64 limit so the zip64 records are written for a small zip
+        with mock.patch("zipfile.ZIP64_LIMIT", 4):
+            test_zip = create_zip([("stops.txt", b"stop_id\n1\n")])
+        # Mask the central directory location in the end of central directory record,
+        # so it must be read from the zip64 end of central directory record
+        eocd_index = test_zip.rfind(b"PK\x05\x06")
+        test_zip = (
+            test_zip[: eocd_index + 12]
+            + struct.pack("<II", 0xFFFFFFFF, 0xFFFFFFFF)
+            + test_zip[eocd_index + 20 :]
+        )
+        self.assertIsNone(find_central_directory(test_zip, len(test_zip))[1])
+
+        under_test = read_central_directory(test_zip)
+        self.assertEqual(under_test[0][NAME], "stops.txt")
+        self.assertEqual(under_test[0][UNCOMPRESSED_SIZE], 10)
+
+    def test_find_central_directory_with_invalid_zip(self):
+        test_content = b"<html>Not found</html>"
+        self.assertRaises(
+            BadZipFile, find_central_directory, test_content, len(test_content)
+        )
+
+    def test_compute_zip_fingerprint_should_ignore_member_order(self):
+        test_members = [("stops.txt", b"stop_id\n1\n"), ("agency.txt", b"a")]
+        test_zip = create_zip(test_members)
+        test_reordered_zip = create_zip(list(reversed(test_members)))
+        test_modified_zip = create_zip([("stops.txt", b"stop_id\n2\n")])
+
+        under_test = compute_zip_fingerprint(read_central_directory(test_zip))
+        self.assertEqual(
+            under_test,
+            compute_zip_fingerprint(read_central_directory(test_reordered_zip)),
+        )
+        self.assertNotEqual(
+            under_test,
+            compute_zip_fingerprint(read_central_directory(test_modified_zip)),
+        )
+
+    def test_compute_zip_file_fingerprint_should_match_central_directory(self):
+        test_zip = create_zip([("stops.txt", b"stop_id\n1\n")], compression=ZIP_STORED)
+
+        with TemporaryDirectory() as path_to_data:
+            test_zip_path = os.path.join(path_to_data, "test.zip")
+            with open(test_zip_path, "wb") as f:
+                f.write(test_zip)
+
+            under_test = compute_zip_file_fingerprint(test_zip_path)
+
+        self.assertEqual(
+            under_test, compute_zip_fingerprint(read_central_directory(test_zip))
+        )
+
+    def test_compute_zip_file_fingerprint_with_invalid_zip(self):
+        under_test = compute_zip_file_fingerprint("./non_existing_file.zip")
+        self.assertIsNone(under_test)
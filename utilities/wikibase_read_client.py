@@ -0,0 +1,187 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ChunkedEncodingError, Timeout
+from wikibaseintegrator.wbi_config import config as wbi_config
+from utilities.request_utils import (
+    WBGETENTITIES_MAX_IDS,
+    create_entities_params,
+    parse_entities_json,
+)
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAXLAG = 5
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 5
+DEFAULT_TIMEOUT = (10, 120)
+
+HTTP_TOO_MANY_REQUESTS = 429
+HTTP_SERVICE_UNAVAILABLE = 503
+RETRY_AFTER_HEADER = "Retry-After"
+MAXLAG_ERROR_CODE = "maxlag"
+ERROR = "error"
+ERROR_CODE = "code"
+ERROR_INFO = "info"
+RETRY_EXCEPTIONS = (ConnectionError, ChunkedEncodingError, Timeout)
+
+
+class WikibaseReadRetry(Exception):
+    """The Wikibase instance asked to retry the request later, because it is overloaded or lagged."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class WikibaseReadError(Exception):
+    """The MediaWiki API answered a read request with an error."""
+
+
+class WikibaseReadClient:
+    def __init__(
+        self,
+        mediawiki_api_url=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        maxlag=DEFAULT_MAXLAG,
+        max_retries=DEFAULT_MAX_RETRIES,
+        timeout=DEFAULT_TIMEOUT,
+        user_agent=None,
+    ):
+        """Constructor for ``WikibaseReadClient``.
+        The client sends the read requests of the MediaWiki API from asyncio coroutines,
+        with at most `max_concurrency` requests in flight. The requests share a pool of kept-alive connections,
+        and are retried after the delay asked by the server when it answers with a maxlag error,
+        a 429 or a 503 status.
+        :param mediawiki_api_url: The URL of the MediaWiki API, the Wikibase Integrator config one if None.
+        :param max_concurrency: The maximum number of requests in flight.
+        :param maxlag: The maxlag parameter of the MediaWiki API requests, in seconds.
+        :param max_retries: The maximum number of retries of a request.
+        :param timeout: The connect and read timeouts of a request, in seconds.
+        :param user_agent: The user agent of the requests, the Wikibase Integrator config one if None.
+        """
+        if not isinstance(max_concurrency, int) or max_concurrency < 1:
+            raise TypeError("Max concurrency must be a valid positive integer.")
+        self.mediawiki_api_url = mediawiki_api_url or wbi_config["MEDIAWIKI_API_URL"]
+        self.max_concurrency = max_concurrency
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_concurrency)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+        self.__session.headers["User-Agent"] = (
+            user_agent or wbi_config["USER_AGENT_DEFAULT"]
+        )
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.__semaphore = None
+        self.__semaphore_loop = None
+
+    def get_semaphore(self):
+        """
+        :return: The semaphore bounding the requests in flight in the running event loop.
+        """
+        # An asyncio semaphore is bound to the event loop where it is first used
+        loop = asyncio.get_event_loop()
+        if self.__semaphore is None or self.__semaphore_loop is not loop:
+            self.__semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.__semaphore_loop = loop
+        return self.__semaphore
+
+    async def get_json(self, url, params, headers=None):
+        """Send a GET request and decode its JSON response, retrying it when the server asks to.
+        :param url: The URL to request.
+        :param params: The query parameters of the request.
+        :param headers: The headers of the request.
+        :return: The decoded JSON response.
+        """
+        loop = asyncio.get_event_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.get_semaphore():
+                    return await loop.run_in_executor(
+                        self.__executor, self.send_request, url, params, headers
+                    )
+            except WikibaseReadRetry as retry:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Retrying URL {url} in {retry.retry_after} seconds\n")
+                await asyncio.sleep(retry.retry_after)
+            except RETRY_EXCEPTIONS as error:
+                if attempt == self.max_retries:
+                    raise
+                print(f'Retrying URL {url} after "{error}"\n')
+                await asyncio.sleep(DEFAULT_RETRY_AFTER)
+
+    def send_request(self, url, params, headers=None):
+        """Send a GET request and decode its JSON response.
+        :param url: The URL to request.
+        :param params: The query parameters of the request.
+        :param headers: The headers of the request.
+        :return: The decoded JSON response.
+        :raise WikibaseReadRetry: If the server is overloaded or lagged.
+        :raise WikibaseReadError: If the MediaWiki API answered with another error,
+        so the error is not taken for an empty response.
+        """
+        response = self.__session.get(
+            url, params=params, headers=headers or {}, timeout=self.timeout
+        )
+        if response.status_code in (HTTP_TOO_MANY_REQUESTS, HTTP_SERVICE_UNAVAILABLE):
+            raise WikibaseReadRetry(get_retry_after(response))
+        response.raise_for_status()
+        json_response = response.json()
+        if ERROR in json_response:
+            error = json_response[ERROR]
+            if error.get(ERROR_CODE) == MAXLAG_ERROR_CODE:
+                raise WikibaseReadRetry(get_retry_after(response))
+            raise WikibaseReadError(
+                f"Request to {url} failed with error {error.get(ERROR_CODE)}: {error.get(ERROR_INFO)}"
+            )
+        return json_response
+
+    async def api_get(self, params):
+        """Send a read request to the MediaWiki API.
+        :param params: The query parameters of the request.
+        :return: The decoded JSON response.
+        """
+        params = {**params, "format": "json", "maxlag": self.maxlag}
+        return await self.get_json(self.mediawiki_api_url, params)
+
+    async def get_entities_json(self, entity_codes, batch_size=WBGETENTITIES_MAX_IDS):
+        """Fetch the JSON representation of entities with concurrent batched wbgetentities requests.
+        :param entity_codes: The entity codes of the entities to fetch.
+        :param batch_size: The number of entities requested per request.
+        :return: A dictionary with the JSON representation of each entity by entity code.
+        A missing entity has an empty JSON representation.
+        """
+        entity_codes = list(dict.fromkeys(entity_codes))
+        batches = [
+            entity_codes[index : index + batch_size]
+            for index in range(0, len(entity_codes), batch_size)
+        ]
+        json_responses = await asyncio.gather(
+            *[self.api_get(create_entities_params(batch)) for batch in batches]
+        )
+
+        entities_json = {}
+        for batch, json_response in zip(batches, json_responses):
+            entities_json.update(parse_entities_json(json_response, batch))
+        return entities_json
+
+    def close(self):
+        """Close the connections and the threads of the client."""
+        self.__executor.shutdown(wait=True)
+        self.__session.close()
+
+
+def get_retry_after(response):
+    """
+    :param response: A response asking to retry the request.
+    :return: The number of seconds to wait before retrying, from the Retry-After header if it is a number of seconds.
+    """
+    try:
+        return max(0, int(response.headers.get(RETRY_AFTER_HEADER)))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
@@ -0,0 +1,126 @@
+from queue import Queue
+from threading import Lock, Thread
+import time
+
+DEFAULT_MAX_QUEUE_SIZE = 16
+DEFAULT_MAX_WRITERS = 2
+DEFAULT_MAX_WRITE_RETRIES = 3
+DEFAULT_WRITE_RETRY_AFTER = 10
+
+# Sentinel put in the queue to stop a writer
+STOP_WRITER = object()
+
+
+class WikibaseWriteQueue:
+    def __init__(
+        self,
+        write_function,
+        max_size=DEFAULT_MAX_QUEUE_SIZE,
+        max_writers=DEFAULT_MAX_WRITERS,
+        max_retries=DEFAULT_MAX_WRITE_RETRIES,
+        retry_after=DEFAULT_WRITE_RETRY_AFTER,
+    ):
+        """Constructor for ``WikibaseWriteQueue``.
+        The queue writes its items to the Wikibase instance from background writer threads,
+        so the items can be prepared while the previous ones are written. The queue holds at most `max_size` items,
+        adding an item to a full queue waits for a writer to take one.
+        A failed write is retried up to `max_retries` times, with an exponential backoff from `retry_after` seconds,
+        so the write function must be safe to call again with an item it partially wrote.
+        :param write_function: The function writing an item to the Wikibase instance.
+        :param max_size: The maximum number of items waiting to be written.
+        :param max_writers: The number of writer threads.
+        :param max_retries: The maximum number of retries of a failed write.
+        :param retry_after: The number of seconds to wait before the first retry of a failed write.
+        """
+        if not isinstance(max_size, int) or max_size < 1:
+            raise TypeError("Max size must be a valid positive integer.")
+        if not isinstance(max_writers, int) or max_writers < 1:
+            raise TypeError("Max writers must be a valid positive integer.")
+        if not isinstance(max_retries, int) or max_retries < 0:
+            raise TypeError("Max retries must be a valid non-negative integer.")
+        self.write_function = write_function
+        self.max_retries = max_retries
+        self.retry_after = retry_after
+
+        self.__lock = Lock()
+        self.__queue = Queue(maxsize=max_size)
+        self.__failed_items = []
+        self.__written_count = 0
+        self.__closed = False
+        self.__writers = [
+            Thread(target=self.run_writer, daemon=True) for _ in range(max_writers)
+        ]
+        for writer in self.__writers:
+            writer.start()
+
+    def put(self, item):
+        """Add an item to write, waiting for room in the queue if it is full.
+        :param item: The item to write.
+        """
+        with self.__lock:
+            if self.__closed:
+                raise ValueError("Cannot add an item to a closed write queue.")
+        self.__queue.put(item)
+
+    def run_writer(self):
+        while True:
+            item = self.__queue.get()
+            try:
+                if item is STOP_WRITER:
+                    return
+                self.write(item)
+            finally:
+                self.__queue.task_done()
+
+    def write(self, item):
+        """Write an item, retrying the write if it fails.
+        :param item: The item to write.
+        :return: True if the item was written, False otherwise.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.write_function(item)
+                with self.__lock:
+                    self.__written_count += 1
+                return True
+            except Exception as error:
+                if attempt == self.max_retries:
+                    print(
+                        f'Exception "{error}" occurred when writing, item discarded\n'
+                    )
+                    with self.__lock:
+                        self.__failed_items.append(item)
+                    return False
+                retry_after = self.retry_after * 2 ** attempt
+                print(
+                    f'Exception "{error}" occurred when writing, retrying in {retry_after} seconds\n'
+                )
+                time.sleep(retry_after)
+
+    def get_written_count(self):
+        """
+        :return: The number of items written.
+        """
+        with self.__lock:
+            return self.__written_count
+
+    def get_failed_items(self):
+        """
+        :return: The items which could not be written.
+        """
+        with self.__lock:
+            return list(self.__failed_items)
+
+    def close(self):
+        """Wait for the items in the queue to be written, and stop the writers.
+        :return: The items which could not be written.
+        """
+        with self.__lock:
+            if self.__closed:
+                return list(self.__failed_items)
+            self.__closed = True
+        for _ in self.__writers:
+            self.__queue.put(STOP_WRITER)
+        for writer in self.__writers:
+            writer.join()
+        return self.get_failed_items()
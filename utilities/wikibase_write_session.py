@@ -0,0 +1,146 @@
+import json
+from threading import Lock
+from wikibaseintegrator import wbi_core, wbi_login
+from wikibaseintegrator.wbi_config import config as wbi_config
+from utilities.constants import ENTITY, ID
+
+BADTOKEN_ERROR_CODE = "badtoken"
+# The CSRF token MediaWiki gives to a session which is not logged in anymore
+ANONYMOUS_EDIT_TOKEN = "+\\"
+
+
+class WikibaseWriteSession:
+    def __init__(self, username, password, mediawiki_api_url=None, maxlag=None):
+        """Constructor for ``WikibaseWriteSession``.
+        The session logs in to the Wikibase instance once, on its first write, and keeps the login cookies
+        and the CSRF token for all the following writes. The token is refreshed when the Wikibase instance
+        rejects it with a badtoken error, and the session logs in again if its login expired.
+        :param username: The username of the Wikibase account.
+        :param password: The password of the Wikibase account.
+        :param mediawiki_api_url: The URL of the MediaWiki API, the Wikibase Integrator config one if None.
+        :param maxlag: The maxlag parameter of the write requests, in seconds, the Wikibase Integrator config one
+        if None. The writes wait for the replication lag of the Wikibase instance to fall below it.
+        """
+        self.username = username
+        self.mediawiki_api_url = mediawiki_api_url or wbi_config["MEDIAWIKI_API_URL"]
+        self.maxlag = maxlag if maxlag is not None else wbi_config["MAXLAG"]
+        self.__password = password
+        self.__lock = Lock()
+        self.__login = None
+        self.__login_count = 0
+
+    def get_login(self):
+        """
+        :return: The login instance of the session, logging in if the session is not logged in yet.
+        """
+        with self.__lock:
+            if self.__login is None:
+                self.__login = wbi_login.Login(
+                    user=self.username,
+                    pwd=self.__password,
+                    mediawiki_api_url=self.mediawiki_api_url,
+                    use_clientlogin=True,
+                )
+                self.__login_count += 1
+            return self.__login
+
+    def get_login_count(self):
+        """
+        :return: The number of times the session logged in.
+        """
+        with self.__lock:
+            return self.__login_count
+
+    def get_edit_token(self):
+        """
+        :return: The cached CSRF token of the session, requested if the session has none yet.
+        """
+        login = self.get_login()
+        with self.__lock:
+            return login.get_edit_token()
+
+    def refresh_edit_token(self, rejected_token):
+        """Request a new CSRF token, logging in again if the login of the session expired.
+        The token is only refreshed if it is still the rejected one,
+        so concurrent writes rejected with the same token refresh it once.
+        :param rejected_token: The CSRF token rejected by the Wikibase instance.
+        """
+        login = self.get_login()
+        with self.__lock:
+            if login is not self.__login or login.edit_token != rejected_token:
+                return
+            login.generate_edit_credentials()
+            if login.edit_token == ANONYMOUS_EDIT_TOKEN:
+                self.__login = None
+        if self.__login is None:
+            self.get_edit_token()
+
+    def write(self, entity, **kwargs):
+        """Write an entity with the login of the session, refreshing the CSRF token once if it is rejected.
+        :param entity: The wbi_core.ItemEngine of the entity to write.
+        :param kwargs: The keyword arguments of `ItemEngine.write`.
+        :return: The entity code of the entity written.
+        """
+        return self.call_with_edit_token(lambda login: entity.write(login, **kwargs))
+
+    def edit_entity(self, entity_json, entity_code="", edit_summary=""):
+        """Create or edit an entity with a single wbeditentity request, which only carries the labels
+        and the claims to add, so the entity does not have to be fetched and sent back in full.
+        The claims of the entity which are not in the request are kept.
+        :param entity_json: The labels and the claims to add, in the Wikibase JSON format.
+        :param entity_code: The entity code of the entity to edit, empty to create a new item.
+        :param edit_summary: The summary of the edit.
+        :return: The entity code of the entity written.
+        """
+
+        def send_edit(login):
+            payload = {
+                "action": "wbeditentity",
+                "data": json.dumps(entity_json),
+                "format": "json",
+                "token": login.get_edit_token(),
+                "summary": edit_summary,
+                "maxlag": self.maxlag,
+                "bot": "",
+            }
+            if entity_code:
+                payload["id"] = entity_code
+            else:
+                payload["new"] = "item"
+            return wbi_core.FunctionsEngine.mediawiki_api_call_helper(
+                data=payload, login=login, mediawiki_api_url=self.mediawiki_api_url
+            )
+
+        json_response = self.call_with_edit_token(send_edit)
+        return json_response[ENTITY][ID]
+
+    def call_with_edit_token(self, request):
+        """Send a write request with the login of the session, refreshing the CSRF token once if it is rejected.
+        :param request: The function sending the request with the login instance it is given.
+        :return: The result of the request.
+        """
+        edit_token = self.get_edit_token()
+        try:
+            return request(self.get_login())
+        except wbi_core.MWApiError as error:
+            if get_error_code(error) != BADTOKEN_ERROR_CODE:
+                raise
+        print(f"CSRF token rejected, refreshing it for user {self.username}\n")
+        self.refresh_edit_token(edit_token)
+        return request(self.get_login())
+
+    def close(self):
+        """Close the connections of the session."""
+        with self.__lock:
+            if self.__login is not None:
+                self.__login.get_session().close()
+            self.__login = None
+
+
+def get_error_code(error):
+    """
+    :param error: A MediaWiki API error.
+    :return: The code of the error, None if the error has no code.
+    """
+    error_msg = error.error_msg if isinstance(error.error_msg, dict) else {}
+    return error_msg.get("error", {}).get("code")
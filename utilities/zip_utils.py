@@ -0,0 +1,204 @@
+from hashlib import sha1
+import struct
+import zipfile
+
+LOCAL_FILE_HEADER_SIGNATURE = b"PK\x03\x04"
+ZIP_SIGNATURE_SIZE = 4
+END_OF_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x05\x06"
+END_OF_CENTRAL_DIRECTORY_SIZE = 22
+ZIP64_END_OF_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x06\x06"
+ZIP64_END_OF_CENTRAL_DIRECTORY_SIZE = 56
+ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR_SIZE = 20
+CENTRAL_DIRECTORY_FILE_HEADER_SIGNATURE = b"PK\x01\x02"
+CENTRAL_DIRECTORY_FILE_HEADER_SIZE = 46
+UTF8_NAME_FLAG = 0x0800
+ZIP64_EXTRA_FIELD_ID = 0x0001
+ZIP64_LIMIT = 0xFFFFFFFF
+MAX_ZIP_COMMENT_SIZE = 65535
+ZIP_TAIL_BYTE_SIZE = END_OF_CENTRAL_DIRECTORY_SIZE + MAX_ZIP_COMMENT_SIZE
+
+NAME = "name"
+CRC = "crc"
+COMPRESSED_SIZE = "compressed_size"
+UNCOMPRESSED_SIZE = "uncompressed_size"
+
+
+def has_zip_signature(first_bytes):
+    """Check the first bytes of a file for a zip signature, without reading the rest of the file.
+    :param first_bytes: The first bytes of the file.
+    :return: True if the file starts with a local file header, or with the end of central directory record
+    of an empty zip file, False otherwise.
+    """
+    return first_bytes[:ZIP_SIGNATURE_SIZE] in (
+        LOCAL_FILE_HEADER_SIGNATURE,
+        END_OF_CENTRAL_DIRECTORY_SIGNATURE,
+    )
+
+
+def validate_zip_file(zip_path):
+    """Validate the central directory of a local zip file, without decompressing its members.
+    :param zip_path: The path to the zip file.
+    :raise BadZipFile: If the zip file or its central directory is invalid.
+    """
+    try:
+        with zipfile.ZipFile(zip_path) as zip_file:
+            zip_file.infolist()
+    except OSError as error:
+        raise zipfile.BadZipFile(str(error))
+
+
+def find_central_directory(zip_tail, zip_size):
+    """Find the location of the central directory of a zip file from the tail of the zip file.
+    :param zip_tail: The last bytes of the zip file, containing the end of central directory record.
+    :param zip_size: The total size of the zip file in bytes.
+    :return: The offset and the size of the central directory if it can be found from the tail,
+    otherwise the offset of the zip64 end of central directory record to read with `find_zip64_central_directory`.
+    The second element of the tuple is None in the latter case.
+    """
+    eocd_index = zip_tail.rfind(END_OF_CENTRAL_DIRECTORY_SIGNATURE)
+    if eocd_index == -1 or len(zip_tail) - eocd_index < END_OF_CENTRAL_DIRECTORY_SIZE:
+        raise zipfile.BadZipFile("End of central directory record not found.")
+    cd_size, cd_offset = struct.unpack_from("<II", zip_tail, eocd_index + 12)
+
+    if cd_offset != ZIP64_LIMIT and cd_size != ZIP64_LIMIT:
+        return cd_offset, cd_size
+
+    # Zip64: the central directory location is in the zip64 end of central directory record
+    locator_index = eocd_index - ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR_SIZE
+    if (
+        locator_index < 0
+        or zip_tail[locator_index : locator_index + 4]
+        != ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR_SIGNATURE
+    ):
+        raise zipfile.BadZipFile("Zip64 end of central directory locator not found.")
+    (zip64_eocd_offset,) = struct.unpack_from("<Q", zip_tail, locator_index + 8)
+    if zip64_eocd_offset >= zip_size:
+        raise zipfile.BadZipFile("Zip64 end of central directory offset is invalid.")
+    return zip64_eocd_offset, None
+
+
+def find_zip64_central_directory(zip64_eocd):
+    """Find the location of the central directory of a zip file from its zip64 end of central directory record.
+    :param zip64_eocd: The bytes of the zip64 end of central directory record.
+    :return: The offset and the size of the central directory.
+    """
+    if (
+        len(zip64_eocd) < ZIP64_END_OF_CENTRAL_DIRECTORY_SIZE
+        or zip64_eocd[:4] != ZIP64_END_OF_CENTRAL_DIRECTORY_SIGNATURE
+    ):
+        raise zipfile.BadZipFile("Zip64 end of central directory record not found.")
+    cd_size, cd_offset = struct.unpack_from("<QQ", zip64_eocd, 40)
+    return cd_offset, cd_size
+
+
+def parse_central_directory(central_directory):
+    """Parse the entries of the central directory of a zip file.
+    :param central_directory: The bytes of the central directory.
+    :return: A list of dictionaries with the name, CRC-32, compressed size and uncompressed size of each member.
+    """
+    entries = []
+    index = 0
+    while index < len(central_directory):
+        if (
+            central_directory[index : index + 4]
+            != CENTRAL_DIRECTORY_FILE_HEADER_SIGNATURE
+            or len(central_directory) - index < CENTRAL_DIRECTORY_FILE_HEADER_SIZE
+        ):
+            raise zipfile.BadZipFile("Invalid central directory file header.")
+        (flags,) = struct.unpack_from("<H", central_directory, index + 8)
+        (
+            crc,
+            compressed_size,
+            uncompressed_size,
+            name_length,
+            extra_length,
+            comment_length,
+        ) = struct.unpack_from("<IIIHHH", central_directory, index + 16)
+        name_start = index + CENTRAL_DIRECTORY_FILE_HEADER_SIZE
+        extra_start = name_start + name_length
+        next_index = extra_start + extra_length + comment_length
+        if next_index > len(central_directory):
+            raise zipfile.BadZipFile("Truncated central directory file header.")
+
+        # Decode the member name as the zipfile module does
+        name = central_directory[name_start:extra_start].decode(
+            "utf-8" if flags & UTF8_NAME_FLAG else "cp437"
+        )
+        if ZIP64_LIMIT in (compressed_size, uncompressed_size):
+            uncompressed_size, compressed_size = parse_zip64_sizes(
+                central_directory[extra_start : extra_start + extra_length],
+                uncompressed_size,
+                compressed_size,
+            )
+
+        entries.append(
+            {
+                NAME: name,
+                CRC: crc,
+                COMPRESSED_SIZE: compressed_size,
+                UNCOMPRESSED_SIZE: uncompressed_size,
+            }
+        )
+        index = next_index
+    return entries
+
+
+def parse_zip64_sizes(extra, uncompressed_size, compressed_size):
+    """Read the member sizes from the zip64 extended information extra field.
+    :param extra: The bytes of the extra fields of a central directory file header.
+    :param uncompressed_size: The uncompressed size in the central directory file header.
+    :param compressed_size: The compressed size in the central directory file header.
+    :return: The uncompressed and compressed sizes of the member.
+    """
+    index = 0
+    while index + 4 <= len(extra):
+        field_id, field_size = struct.unpack_from("<HH", extra, index)
+        field_start = index + 4
+        if field_id == ZIP64_EXTRA_FIELD_ID:
+            # The zip64 field only contains the values overflowing in the file header, in this order
+            offset = field_start
+            if uncompressed_size == ZIP64_LIMIT:
+                (uncompressed_size,) = struct.unpack_from("<Q", extra, offset)
+                offset += 8
+            if compressed_size == ZIP64_LIMIT:
+                (compressed_size,) = struct.unpack_from("<Q", extra, offset)
+            break
+        index = field_start + field_size
+    return uncompressed_size, compressed_size
+
+
+def compute_zip_fingerprint(entries):
+    """Compute the fingerprint of a zip file from its central directory entries.
+    The fingerprint only depends on the member names, CRC-32s and sizes, so it does not change
+    when a zip file with the same content is rebuilt with different timestamps or member order.
+    :param entries: The central directory entries, as returned by `parse_central_directory`.
+    :return: The fingerprint of the zip file.
+    """
+    fingerprint = sha1()
+    for entry in sorted(entries, key=lambda item: item[NAME]):
+        fingerprint.update(
+            f"{entry[NAME]}:{entry[CRC]:08x}:{entry[COMPRESSED_SIZE]}:{entry[UNCOMPRESSED_SIZE]}\n".encode()
+        )
+    return fingerprint.hexdigest()
+
+
+def compute_zip_file_fingerprint(zip_path):
+    """Compute the fingerprint of a local zip file from its central directory.
+    :param zip_path: The path to the zip file.
+    :return: The fingerprint of the zip file, None if the file is not a valid zip file.
+    """
+    try:
+        with zipfile.ZipFile(zip_path) as zip_file:
+            entries = [
+                {
+                    NAME: info.filename,
+                    CRC: info.CRC,
+                    COMPRESSED_SIZE: info.compress_size,
+                    UNCOMPRESSED_SIZE: info.file_size,
+                }
+                for info in zip_file.infolist()
+            ]
+    except (OSError, zipfile.BadZipFile):
+        return None
+    return compute_zip_fingerprint(entries)